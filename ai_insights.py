@@ -2,19 +2,24 @@
 """AI Insights Module - Rule-based and Claude API analysis"""
 
 import os
+from importlib.util import find_spec
 from config import ANTHROPIC_API_KEY
 
-try:
-    from anthropic import Anthropic
-    HAS_ANTHROPIC = True
-except ImportError:
-    HAS_ANTHROPIC = False
+# The SDK is imported when the first Claude request is made, not at startup
+HAS_ANTHROPIC = find_spec('anthropic') is not None
 
 
 class InsightsGenerator:
     def __init__(self, lang='en'):
         self.lang = lang
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY) if HAS_ANTHROPIC and ANTHROPIC_API_KEY else None
+        self._client = None
+    
+    @property
+    def client(self):
+        if self._client is None and HAS_ANTHROPIC and ANTHROPIC_API_KEY:
+            from anthropic import Anthropic
+            self._client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        return self._client
     
     def generate_rule_based_insights(self, summary):
         insights = []
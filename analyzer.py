@@ -5,31 +5,229 @@ QFD Analyzer Module for Shila Dashboard
 
 import pandas as pd
 import numpy as np
+import functools
 from collections import Counter
 from itertools import combinations
 import re
 import datetime
-import streamlit as st
+import os
+import threading
+from importlib.util import find_spec
 
-from config import COLS, STOPWORDS, ASPECTS, EXCLUDE_PRODUCTS
+from config import COLS, STOPWORDS, EXCLUDE_PRODUCTS, EXCLUDE_BRANCHES, SENTIMENT_LEXICON, TEXT_MINING_WORKERS
+from data_loader import fill_blank
+from aspects import get_matcher
+from branches import BranchTable, get_branch_table
+from topic_model import SKLEARN_AVAILABLE, fingerprint, fit_topic_model
 
-try:
-    import arabic_reshaper
-    from bidi.algorithm import get_display
-    HAS_PERSIAN_SUPPORT = True
-except ImportError:
-    HAS_PERSIAN_SUPPORT = False
+# Optional text libraries are only probed here; hazm pulls in nltk and
+# friends, so it is imported the first time Text Mining actually needs it.
+HAS_PERSIAN_SUPPORT = find_spec('arabic_reshaper') is not None and find_spec('bidi') is not None
+HAZM_AVAILABLE = find_spec('hazm') is not None
 
-try:
-    from hazm import Normalizer, word_tokenize, stopwords_list
-    HAZM_AVAILABLE = True
-except ImportError:
-    HAZM_AVAILABLE = False
+_HAZM = {}
+
+
+def _hazm():
+    """Import hazm once and keep a shared Normalizer. Returns None if unavailable."""
+    global HAZM_AVAILABLE
+    if not HAZM_AVAILABLE:
+        return None
+    if not _HAZM:
+        try:
+            from hazm import Normalizer, word_tokenize, stopwords_list
+        except ImportError:
+            HAZM_AVAILABLE = False
+            return None
+        _HAZM.update(normalizer=Normalizer(), word_tokenize=word_tokenize, stopwords_list=stopwords_list)
+    return _HAZM
+
+
+# ==========================================
+# TEXT PREPROCESSING (module level so worker processes can run it)
+# ==========================================
+
+# Below this many distinct comments tokenization stays in-process (pool startup costs more)
+PARALLEL_MIN_COMMENTS = 5000
+
+
+def preprocess_text(text):
+    """Clean and normalize Persian text"""
+    if pd.isna(text) or not isinstance(text, str):
+        return ""
+
+    # Normalize if Hazm is available
+    hazm = _hazm()
+    if hazm:
+        text = hazm['normalizer'].normalize(text)
+
+    # Remove English characters and numbers
+    text = re.sub(r'[a-zA-Z0-9]', '', text)
+    # Remove special characters but keep Persian
+    text = re.sub(r'[^\u0600-\u06FF\s]', '', text)
+    # Remove extra whitespace
+    text = re.sub(r'\s+', ' ', text).strip()
+
+    return text
+
+
+def tokenize(text):
+    """Tokenize Persian text"""
+    if not text:
+        return []
+
+    hazm = _hazm()
+    if hazm:
+        try:
+            return hazm['word_tokenize'](text)
+        except:
+            pass
+
+    # Fallback: simple split
+    return text.split()
+
+
+def _tokenize_chunk(texts):
+    return [tokenize(preprocess_text(text)) for text in texts]
+
+
+def text_mining_workers(workers=None):
+    """Worker processes to use: TEXT_MINING_WORKERS, 0 = one per CPU core"""
+    workers = TEXT_MINING_WORKERS if workers is None else workers
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def tokenize_comments(texts, workers=None):
+    """Preprocessed tokens of every text, in order.
+
+    Large corpora are split into chunks that are normalized and tokenized in a
+    ProcessPoolExecutor (hazm is pure Python, so threads would not help) and the
+    chunk results are concatenated in order. Runs serially with one worker, for
+    small inputs, or if the pool cannot be started.
+    """
+    workers = text_mining_workers(workers)
+    if workers <= 1 or len(texts) < PARALLEL_MIN_COMMENTS:
+        return _tokenize_chunk(texts)
+
+    size = -(-len(texts) // (workers * 4))
+    chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+    try:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return [tokens for chunk in executor.map(_tokenize_chunk, chunks) for tokens in chunk]
+    except Exception as e:
+        print(f"Parallel tokenization error, running serially: {e}")
+        return _tokenize_chunk(texts)
+
+
+def _format_dates(times, fmt):
+    """dt.strftime() evaluated once per distinct day instead of once per row (NaT -> NaN)"""
+    codes, days = pd.factorize(times.dt.normalize())
+    labels = np.append(pd.DatetimeIndex(days).strftime(fmt).to_numpy(dtype=object), np.nan)
+    return pd.Series(labels[codes], index=times.index)
+
+
+def _group_sum(keys, measures, dropna=False):
+    """Sum of each measure column per distinct row of `keys` (frames on the same index).
+
+    Returns the key columns followed by the summed measures (int64 for integer /
+    boolean input, float64 otherwise), one row per group, sorted by the keys.
+    With dropna=False, groups with missing keys are kept (last).
+    """
+    if keys.empty or measures.empty:
+        return pd.DataFrame(columns=list(keys.columns) + list(measures.columns))
+    sums = measures.groupby([keys[k] for k in keys], dropna=dropna, observed=True, sort=True).sum()
+    dtypes = {c: np.dtype(getattr(measures[c].dtype, 'numpy_dtype', measures[c].dtype)) for c in measures}
+    sums = sums.astype({c: np.int64 if d.kind in 'biu' else np.float64 for c, d in dtypes.items()})
+    return sums.reset_index()
+
+
+def _numpy_column(values):
+    """Series / Index with the compact ingest dtypes (data_loader.optimize_dtypes) undone"""
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return values.astype(dtype.categories.dtype)
+    if not isinstance(dtype, pd.api.extensions.ExtensionDtype) or dtype.kind not in 'iuf':
+        return values
+    # Int8 ratings / NPS were float64 as loaded; other nullable counts are int64 unless missing
+    if dtype.kind == 'f' or dtype.name == 'Int8' or values.isna().any():
+        return values.astype(np.float64)
+    return values.astype(np.int64)
+
+
+def _numpy_dtypes(method):
+    """Return frames (also inside tuples / dicts) with numpy dtypes, as before the compact ingest
+    schema, so plotting, export and JSON code sees the same schema for any input frame"""
+    def convert(value):
+        if isinstance(value, pd.DataFrame):
+            value = value.copy(deep=False)
+            for i in range(value.shape[1]):
+                value.isetitem(i, _numpy_column(value.iloc[:, i]))
+            value.index = _numpy_column(value.index)
+            return value
+        if isinstance(value, pd.Series):
+            return _numpy_column(value)
+        if isinstance(value, tuple):
+            return tuple(convert(v) for v in value)
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        return value
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        return convert(method(*args, **kwargs))
+    return wrapper
+
+
+# Recovery segments: label -> (Persian label, emoji), in the order they are assigned
+RECOVERY_SEGMENTS = {
+    'Neutral': ('خنثی', '😐'),
+    'Happy': ('راضی', '😊'),
+    'At Risk': ('در خطر', '🚨'),
+    'Recovery': ('قابل بازیابی', '🔄'),
+    'Silent Churner': ('ریزش خاموش', '⚠️'),
+}
+
+# NPS indicator columns (see ShilaAnalyzer._nps_flags); a response is any 0-10 answer
+NPS_FLAGS = ['nps_promoter', 'nps_passive', 'nps_detractor', 'nps_response']
+
+# Additive measures of the metrics cube (see ShilaAnalyzer._metrics_cube)
+CUBE_MEASURES = ['rows', 'rating_sum', 'rating_sq_sum', 'rating_count', 'nps_sum'] + NPS_FLAGS + ['comments']
+
+
+def nps_score(promoters, detractors, responses):
+    """NPS in percent: (promoters - detractors) / responses, 0 where nobody answered.
+
+    Works on scalars and on arrays / Series of per-group counts (e.g. the sums
+    of the NPS_FLAGS columns after a groupby). Missing answers never count.
+    """
+    responses = np.asarray(responses, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = (np.asarray(promoters, dtype=float) - np.asarray(detractors, dtype=float)) / responses * 100
+    return np.where(responses > 0, score, 0.0)
+
+# Comment sentiment labels (alphabetical, the order the summaries are listed in)
+SENTIMENT_LABELS = ['mixed', 'negative', 'neutral', 'positive']
 
 class ShilaAnalyzer:
-    def __init__(self, df, cols):
-        self.df = df.copy()
+    def __init__(self, df, cols, copy=True, branch_table=None):
+        # copy=False shares the caller's column data (new columns are still added
+        # to our own frame only) - the dashboard uses it to avoid a second copy
+        self.df = df.copy() if copy else df.copy(deep=False)
         self.cols = cols
+        # Canonical branch names: a BranchTable, a JSON path, or None for the shared
+        # data/uploads table (benchmarks and one-off runs pass BranchTable(None))
+        if not isinstance(branch_table, BranchTable):
+            branch_table = get_branch_table() if branch_table is None else get_branch_table(branch_table)
+        self.branch_table = branch_table
+        self._derived = set()
+        self._token_cache = None
+        self._ngram_cache = {}
+        self._cube = None
+        # Derived columns and caches are built on first use, possibly by prefetch threads
+        self._build_locks = {}
+        self._locks_lock = threading.Lock()
+        self._publish_lock = threading.Lock()
         self._preprocess_data()
     
     def _preprocess_data(self):
@@ -45,7 +243,7 @@ class ShilaAnalyzer:
             )   
         else:
             # Create an empty column so other functions don't crash looking for the header
-            self.df['NPS_Segment'] = None
+            self.df['NPS_Segment'] = pd.Categorical([None] * len(self.df), categories=['Detractor', 'Passive', 'Promoter'], ordered=True)
         
         # 3. Handle Date and Time Processing
         date_col = self.cols.get('DATE', 'Date')
@@ -61,12 +259,8 @@ class ShilaAnalyzer:
                 self.df['parsed_date'] = self.df[date_col] # Keep original for time extraction
             
                 # Create the strings for daily/monthly grouping
-                self.df['date_str'] = self.df[date_col].dt.strftime('%Y/%m/%d')
-                self.df['year_month'] = self.df[date_col].dt.strftime('%Y/%m')
-            
-                # Ensure the Hourly Chart has access to the full datetime
-                if created_col in self.df.columns:
-                    self.df[created_col] = pd.to_datetime(self.df[created_col], errors='coerce')
+                self.df['date_str'] = _format_dates(self.df[date_col], '%Y/%m/%d')
+                self.df['year_month'] = _format_dates(self.df[date_col], '%Y/%m')
             else:
                 # ORIGINAL LOGIC: Persian Date Parsing
                 self.df['parsed_date'] = self.df[date_col].apply(self._parse_persian_date)
@@ -76,51 +270,165 @@ class ShilaAnalyzer:
                         lambda x: f"{x[0]}/{x[1]:02d}/{x[2]:02d}" if x else None)
                     self.df.loc[valid, 'year_month'] = self.df.loc[valid, 'parsed_date'].apply(
                         lambda x: f"{x[0]}/{x[1]:02d}" if x else None)
-    
+
+        # Parse the order timestamp once; the hourly/weekly/monthly views all read it
+        if created_col in self.df.columns and not pd.api.types.is_datetime64_any_dtype(self.df[created_col]):
+            self.df[created_col] = pd.to_datetime(self.df[created_col], dayfirst=True, errors='coerce')
+
+    # ==========================================
+    # SHARED DERIVED COLUMNS
+    # ==========================================
+
+    def _build_once(self, name, build):
+        """Run build() the first time `name` is needed. Threads needing the same item
+        wait for one build; other items are built meanwhile."""
+        if name in self._derived:
+            return
+        with self._locks_lock:
+            lock = self._build_locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._derived:
+                build()
+                self._derived.add(name)
+
+    def _publish(self, columns):
+        """Add derived columns {name: values}. self.df is swapped for a shallow copy holding
+        them, so methods running on other threads keep reading a complete frame."""
+        with self._publish_lock:
+            df = self.df.copy(deep=False)
+            for name, values in columns.items():
+                df[name] = values
+            self.df = df
+
+    def _column(self, name):
+        """Helper column ('hour', 'week', 'month', 'segment', 'aspects', 'sentiment') built on first use.
+
+        The column is added to self.df once and then read by every method that
+        needs it, instead of each call copying the frame to attach its own.
+        """
+        def build():
+            created = self.df[self.cols.get('CREATED_AT', 'Order Created At')] if name in ('hour', 'week', 'month') else None
+            if name == 'hour':
+                self._publish({name: created.dt.hour})
+            elif name == 'week':
+                self._publish({name: _format_dates(created, '%Y-W%V')})
+            elif name == 'month':
+                self._publish({name: _format_dates(created, '%Y-%m')})
+            elif name == 'segment':
+                self._publish({name: self._recovery_segments()})
+            elif name == 'aspects':
+                # Bitmask of the config.ASPECTS mentioned in each comment (see aspects.py)
+                self._publish({name: get_matcher().scan(self.df[self.cols.get('COMMENT')])})
+            elif name == 'sentiment':
+                # Also adds sentiment_pos / sentiment_neg (lexicon words per comment)
+                pos, neg, label = self._sentiment_scores()
+                self._publish({'sentiment_pos': pos, 'sentiment_neg': neg, name: label})
+        self._build_once(name, build)
+        return self.df[name]
+
+    def _recovery_segments(self):
+        rating, nps = self.df[COLS['RATING']], self.df[COLS['NPS']]
+        mask_happy = ((rating >= 4) & (nps >= 9)).fillna(False)
+        mask_risk = ((rating <= 2) & (nps <= 6)).fillna(False)
+        masks = {
+            'Happy': mask_happy,
+            'At Risk': mask_risk,
+            'Recovery': ((rating <= 3) & (nps >= 7) & ~mask_happy).fillna(False),
+            'Silent Churner': ((rating >= 3) & (nps <= 6) & ~mask_risk).fillna(False),
+        }
+        # Later segments win, as in the original sequential assignment
+        segment = np.full(len(self.df), 'Neutral', dtype=object)
+        for label, mask in masks.items():
+            segment[mask.to_numpy(dtype=bool)] = label
+        return pd.Categorical(segment, categories=list(RECOVERY_SEGMENTS))
+    
+    # ==========================================
+    # METRICS CUBE
+    # ==========================================
+
+    def _metrics_cube(self):
+        """Additive measures per (branch, day, order date, hour), built once per analyzer.
+
+        'day' / 'year_month' are the dashboard's date labels (Persian for survey
+        exports), 'date' is the order timestamp's calendar day and 'hour' its hour.
+        Keys may be missing; rollups drop those groups. Every time-trend method is a
+        sum over this small frame instead of a regroup of the raw rows.
+        """
+        def build():
+            df = self.df
+            index = df.index
+            missing = pd.Series(np.nan, index=index, dtype=object)
+            created_col = self.cols.get('CREATED_AT', 'Order Created At')
+            rating = df[COLS['RATING']].astype(float) if COLS['RATING'] in df.columns else pd.Series(np.nan, index=index)
+            nps = df[COLS['NPS']].astype(float) if COLS['NPS'] in df.columns else pd.Series(np.nan, index=index)
+            flags = self._nps_flags()
+            comment = df[COLS['COMMENT']] if COLS['COMMENT'] in df.columns else missing
+
+            keys = pd.DataFrame({
+                'branch': df[COLS['BRANCH']] if COLS['BRANCH'] in df.columns else missing,
+                'day': df['date_str'] if 'date_str' in df.columns else missing,
+                'year_month': df['year_month'] if 'year_month' in df.columns else missing,
+                'date': df[created_col].dt.normalize() if created_col in df.columns else pd.NaT,
+                'hour': self._column('hour') if created_col in df.columns else np.nan,
+            }, index=index)
+            measures = pd.DataFrame({
+                'rows': 1,
+                'rating_sum': rating.fillna(0),
+                'rating_sq_sum': rating.pow(2).fillna(0),
+                'rating_count': rating.notna().astype(int),
+                'nps_sum': nps.fillna(0),
+                **{flag: flags[flag] for flag in NPS_FLAGS},
+                'comments': comment.notna().astype(int),
+            }, index=index)
+            self._cube = _group_sum(keys, measures)
+        self._build_once('cube', build)
+        return self._cube
+
+    def _rollup(self, by, branches=None):
+        """Cube measures summed per `by` ('hour', 'day', 'year_month', 'week', 'month',
+        or a function of the cube frame returning labels), optionally for some branches only."""
+        cube = self._metrics_cube()
+        if branches is not None:
+            cube = cube[cube['branch'].isin(branches)]
+        if by in ('week', 'month'):
+            labels = _format_dates(cube['date'], '%Y-W%V' if by == 'week' else '%Y-%m').rename(by)
+        elif callable(by):
+            labels = by(cube)
+        else:
+            labels = cube[by]
+        return cube[CUBE_MEASURES].groupby(labels, observed=True).sum()
+
+    def _nps_flags(self):
+        """Promoter / passive / detractor / response indicators (int8 columns, added once).
+
+        Per-group NPS is nps_score() of their groupby().sum(); see NPS_FLAGS.
+        """
+        def build():
+            if COLS['NPS'] in self.df.columns:
+                nps = self.df[COLS['NPS']].astype(float)
+            else:
+                nps = pd.Series(np.nan, index=self.df.index)
+            promoter, detractor = (nps >= 9), (nps <= 6)
+            passive = (nps >= 7) & (nps <= 8)
+            self._publish({
+                'nps_promoter': promoter.astype(np.int8),
+                'nps_passive': passive.astype(np.int8),
+                'nps_detractor': detractor.astype(np.int8),
+                'nps_response': (promoter | passive | detractor).astype(np.int8),
+            })
+        self._build_once('nps_flags', build)
+        return self.df[NPS_FLAGS]
+
+    @staticmethod
+    def _nps_score(stats):
+        """nps_score() of summed NPS_FLAGS columns"""
+        return nps_score(stats['nps_promoter'], stats['nps_detractor'], stats['nps_response'])
+
     def _normalize_branch_names(self):
-        """Auto-detect and normalize branch name variations"""
+        """Map branch name variations to their canonical name (persisted table, see branches.py)"""
         if COLS['BRANCH'] not in self.df.columns:
             return
-    
-        # Get all unique branch names
-        all_branches = self.df[COLS['BRANCH']].dropna().unique()
-    
-        # Group by spaceless version
-        groups = {}
-        for branch in all_branches:
-            # Clean and create spaceless key
-            clean = str(branch).strip()
-            clean = clean.replace('ي', 'ی').replace('ك', 'ک').replace('ە', 'ه')
-            spaceless = clean.replace(' ', '').replace('\u200c', '')
-        
-            if spaceless not in groups:
-                groups[spaceless] = []
-            groups[spaceless].append(branch)
-    
-        # Create mapping: all variations → best version
-        mapping = {}
-        for spaceless, variations in groups.items():
-            # Pick the best version:
-            # - Prefer one WITH space (more readable)
-            # - If tie, pick most frequent
-        
-            best = None
-            for v in variations:
-                if ' ' in str(v) or '\u200c' in str(v):  # Has space or half-space
-                    best = v
-                    break
-        
-            # If none has space, pick most frequent
-            if best is None:
-                counts = self.df[COLS['BRANCH']].value_counts()
-                best = max(variations, key=lambda x: counts.get(x, 0))
-        
-            # Map all variations to best
-            for v in variations:
-                mapping[v] = best
-    
-        # Apply mapping
-        self.df[COLS['BRANCH']] = self.df[COLS['BRANCH']].map(mapping).fillna(self.df[COLS['BRANCH']])
+        self.df[COLS['BRANCH']] = self.branch_table.normalize(self.df[COLS['BRANCH']])
     
     def _parse_persian_date(self, date_str):
         if pd.isna(date_str): return None
@@ -131,11 +439,20 @@ class ShilaAnalyzer:
         return None
     
     def _extract_tags(self, series):
-        tags = []
-        for text in series.dropna():
+        # Split each distinct value once and weight it by its row count. Values are
+        # visited in first-appearance order so most_common() ties rank as before.
+        values = series.dropna()
+        counts = values.value_counts(sort=False)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            counts = counts.iloc[pd.unique(values.cat.codes)]
+        tags = Counter()
+        for text, n in counts.items():
             text = str(text).replace(',', '،')
-            tags.extend([t.strip() for t in text.split('،') if t.strip()])
-        return Counter(tags)
+            for t in text.split('،'):
+                t = t.strip()
+                if t:
+                    tags[t] += n
+        return tags
     
     def get_kpis(self):
         total = len(self.df)
@@ -143,23 +460,20 @@ class ShilaAnalyzer:
     
         # Check if NPS column exists AND has at least one non-null value
         if nps_col in self.df.columns and self.df[nps_col].notna().any():
-            promoters = (self.df[nps_col] >= 9).sum()
-            passives = ((self.df[nps_col] >= 7) & (self.df[nps_col] <= 8)).sum()
-            detractors = (self.df[nps_col] <= 6).sum()
-        
             # Calculate NPS based on rows that actually have NPS data
-            nps_count = promoters + passives + detractors
-            nps_score = ((promoters - detractors) / nps_count) * 100 if nps_count > 0 else 0
+            counts = self._nps_flags().sum()
+            promoters, passives, detractors = counts['nps_promoter'], counts['nps_passive'], counts['nps_detractor']
+            score = float(self._nps_score(counts))
         else:
             # Fallback for SnappFood files
-            promoters = passives = detractors = nps_score = 0
+            promoters = passives = detractors = score = 0
     
         avg_rating = self.df[rating_col].mean() if rating_col in self.df.columns else 0
         response_rate = (self.df[COLS['COMMENT']].notna().sum() / total * 100) if COLS['COMMENT'] in self.df.columns and total > 0 else 0
     
         return {
             'total_orders': total, 
-            'nps_score': round(nps_score, 1), 
+            'nps_score': round(score, 1), 
             'avg_rating': round(avg_rating, 2),
             'promoters': promoters, 
             'passives': passives, 
@@ -167,6 +481,7 @@ class ShilaAnalyzer:
             'response_rate': round(response_rate, 1)
         }
     
+    @_numpy_dtypes
     def get_rating_distribution(self):
         if COLS['RATING'] not in self.df.columns: return pd.DataFrame()
         dist = self.df[COLS['RATING']].value_counts().sort_index().reset_index()
@@ -174,6 +489,7 @@ class ShilaAnalyzer:
         dist['Percentage'] = (dist['Count'] / dist['Count'].sum() * 100).round(1)
         return dist
     
+    @_numpy_dtypes
     def get_nps_distribution(self):
         if COLS['NPS'] not in self.df.columns: return pd.DataFrame()
         dist = self.df[COLS['NPS']].value_counts().sort_index().reset_index()
@@ -184,11 +500,12 @@ class ShilaAnalyzer:
     def get_pareto_analysis(self):
         if COLS['WEAKNESS'] not in self.df.columns: return pd.DataFrame()
         records = []
-        for _, row in self.df.iterrows():
+        ratings = self.df[COLS['RATING']].astype(float)  # compact Int8 -> float, as loaded
+        for idx, row in self.df.iterrows():
             if pd.notna(row[COLS['WEAKNESS']]):
                 tags = [t.strip() for t in str(row[COLS['WEAKNESS']]).replace(',', '،').split('،') if t.strip()]
                 for tag in tags:
-                    records.append({'tag': tag, 'damage': 5 - row[COLS['RATING']], 'rating': row[COLS['RATING']]})
+                    records.append({'tag': tag, 'damage': 5 - ratings[idx], 'rating': ratings[idx]})
         if not records: return pd.DataFrame()
         df_tags = pd.DataFrame(records)
         pareto = df_tags.groupby('tag').agg(total_damage=('damage', 'sum'), frequency=('damage', 'count'), avg_rating=('rating', 'mean')).reset_index()
@@ -208,8 +525,8 @@ class ShilaAnalyzer:
         baseline = self.df[COLS['RATING']].mean()
         kano_data = []
         for attr in all_attrs:
-            s_mask = self.df[COLS['STRENGTH']].fillna('').str.contains(attr, regex=False) if COLS['STRENGTH'] in self.df.columns else pd.Series([False]*len(self.df))
-            w_mask = self.df[COLS['WEAKNESS']].fillna('').str.contains(attr, regex=False) if COLS['WEAKNESS'] in self.df.columns else pd.Series([False]*len(self.df))
+            s_mask = fill_blank(self.df[COLS['STRENGTH']]).str.contains(attr, regex=False) if COLS['STRENGTH'] in self.df.columns else pd.Series([False]*len(self.df))
+            w_mask = fill_blank(self.df[COLS['WEAKNESS']]).str.contains(attr, regex=False) if COLS['WEAKNESS'] in self.df.columns else pd.Series([False]*len(self.df))
             s_cnt, w_cnt = s_mask.sum(), w_mask.sum()
             s_rat = self.df.loc[s_mask, COLS['RATING']].mean() if s_cnt > 0 else np.nan
             w_rat = self.df.loc[w_mask, COLS['RATING']].mean() if w_cnt > 0 else np.nan
@@ -221,18 +538,20 @@ class ShilaAnalyzer:
     
     def get_branch_product_performance(self, min_orders=1):
         """Explodes SnappFood product strings to analyze individual item performance."""
-        df = self.df.copy()
-    
         # Use the column names from your config
         prod_col = self.cols.get('Items')
         branch_col = self.cols.get('BRANCH')
         rating_col = self.cols.get('RATING')
 
-        if not all(col in df.columns for col in [prod_col, branch_col, rating_col]):
+        if not all(col in self.df.columns for col in [prod_col, branch_col, rating_col]):
             return pd.DataFrame()
 
         # Split the SnappFood string (e.g., "Item 1، Item 2")
-        df[prod_col] = df[prod_col].astype(str).str.split(r'[،,]')
+        df = pd.DataFrame({
+            branch_col: self.df[branch_col],
+            prod_col: self.df[prod_col].astype(str).str.split(r'[،,]'),
+            rating_col: self.df[rating_col],
+        })
         df = df.explode(prod_col).reset_index(drop=True)
         df[prod_col] = df[prod_col].str.strip()
         
@@ -281,14 +600,23 @@ class ShilaAnalyzer:
     
         return product_stats.round(2)
     
+    @_numpy_dtypes
     def get_branch_analysis(self, min_orders=10):
         if COLS['BRANCH'] not in self.df.columns: return pd.DataFrame(), pd.DataFrame()
-        stats = self.df.groupby(COLS['BRANCH']).agg({COLS['RATING']: ['mean', 'std', 'count']}).reset_index()
-        stats.columns = ['branch', 'avg_rating', 'rating_std', 'order_count']
+        # Rating mean / sample std / count per branch from the cube's sums
+        cube = self._rollup('branch')
+        n = cube['rating_count'].to_numpy(dtype=float)
+        total, squares = cube['rating_sum'].to_numpy(), cube['rating_sq_sum'].to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.where(n > 1, (n * squares - total ** 2) / (n * (n - 1)), np.nan)
+            stats = pd.DataFrame({
+                'branch': cube.index,
+                'avg_rating': np.where(n > 0, total / n, np.nan),
+                'rating_std': np.sqrt(np.maximum(variance, 0)),
+                'order_count': cube['rating_count'].to_numpy(),
+            })
         if COLS['NPS'] in self.df.columns:
-            nps = self.df.groupby(COLS['BRANCH'])[COLS['NPS']].apply(lambda g: ((g >= 9).sum() - (g <= 6).sum()) / len(g) * 100 if len(g) > 0 else 0).reset_index()
-            nps.columns = ['branch', 'nps_score']
-            stats = stats.merge(nps, on='branch')
+            stats['nps_score'] = self._nps_score(cube)
         stats = stats[stats['order_count'] >= min_orders]
         overall = self.df[COLS['RATING']].mean()
         stats['rating_vs_avg'] = stats['avg_rating'] - overall
@@ -304,12 +632,8 @@ class ShilaAnalyzer:
     
     def get_branch_product_matrix(self):
         """Which products perform best at which branches (supports both Shila and SnappFood)"""
-        from config import COLS, EXCLUDE_PRODUCTS, EXCLUDE_BRANCHES
-        import re
         if self.df.empty:
             return pd.DataFrame()
-        
-        df = self.df.copy()
     
         # 1. Determine which column to use (Check ORDER_ITEMS first for SnappFood)
         sf_col = COLS.get('ORDER_ITEMS')
@@ -328,69 +652,57 @@ class ShilaAnalyzer:
         if branch_col not in self.df.columns:
             return pd.DataFrame()
 
-        records = []
-        # 2. Iterate and process strings (Handle both standard and Persian commas)
-        for _, row in self.df.iterrows():
-            raw_val = row.get(active_product_col)
-            branch_val = row.get(branch_col)
-            rating_val = row.get(rating_col)
-            
-            if any(keyword in branch_val for keyword in EXCLUDE_BRANCHES):
-                continue
-        
-            if pd.notna(raw_val):
-                # Split items using regex to catch both standard (,) and Persian (،) commas
-                products = re.split(r'[,،]', str(raw_val))
-            
-                for product in products:
-                    product = product.strip()
-                    # 3. Filter out excluded products (Side dishes, drinks, etc.)
-                    if product and product not in EXCLUDE_PRODUCTS:
-                        records.append({
-                            'branch': branch_val,
-                            'product': product,
-                            'rating': rating_val
-                        })
-
-        if not records:
+        # 2. One row per (order, product): split on standard (,) and Persian (،) commas
+        branch = self.df[branch_col]
+        excluded = {b for b in branch.dropna().unique() if any(keyword in b for keyword in EXCLUDE_BRANCHES)}
+        items = self.df[active_product_col]
+        keep = items.notna().to_numpy() & ~branch.isin(excluded).to_numpy()
+        products = items[keep].astype(str).str.split(r'[,،]', regex=True).explode().str.strip()
+        # 3. Filter out excluded products (Side dishes, drinks, etc.)
+        products = products[(products != '') & ~products.isin(EXCLUDE_PRODUCTS)]
+        if products.empty:
             return pd.DataFrame()
-    
-        # 4. Create the heatmap matrix
-        df_bp = pd.DataFrame(records)
-        matrix = df_bp.pivot_table(
-            values='rating',
-            index='branch',
-            columns='product',
-            aggfunc='mean'
-        ).round(2)
+
+        rating = self.df[rating_col].astype(float).reindex(products.index) if rating_col in self.df.columns \
+            else pd.Series(np.nan, index=products.index)
+        keys = pd.DataFrame({
+            'branch': branch.reindex(products.index).to_numpy(dtype=object),
+            'product': products.to_numpy(dtype=object),
+        })
+        sums = _group_sum(keys, pd.DataFrame({
+            'rating_sum': rating.fillna(0).to_numpy(),
+            'rating_count': rating.notna().to_numpy(dtype=np.int64),
+        }), dropna=True)
+
+        # 4. Create the heatmap matrix (mean rating per branch x product)
+        sums = sums[sums['rating_count'] > 0]
+        sums['rating'] = sums['rating_sum'] / sums['rating_count']
+        matrix = sums.pivot(index='branch', columns='product', values='rating').round(2)
 
         return matrix
     
+    @_numpy_dtypes
     def get_low_rating_deep_dive(self):
         """Analyzes 1-3 star reviews to find recurring themes across branches."""
         # 1. Filter for low ratings
+        self._column('aspects')
         low_df = self.df[self.df[self.cols.get('RATING')] <= 3].copy()
         if low_df.empty:
             return pd.DataFrame(), pd.DataFrame()
 
-        from config import ASPECTS
         branch_col = self.cols.get('BRANCH')
         comment_col = self.cols.get('COMMENT')
     
-        # 2. Map comments to Aspects (Topics)
-        def identify_topics(text):
-            if not text or pd.isna(text): return "Other"
-            found = []
-            for aspect, keywords in ASPECTS.items():
-                if any(kw in str(text) for kw in keywords):
-                    found.append(aspect)
-            return found if found else ["Uncategorized"]
-
-        low_df['topics'] = low_df[comment_col].apply(identify_topics)
+        # 2. Map comments to Aspects (Topics) from the shared aspect bitmask
+        matcher = get_matcher()
+        masks = low_df['aspects']
+        topics = {mask: matcher.names(mask) or ["Uncategorized"] for mask in masks.unique()}
+        empty = fill_blank(low_df[comment_col]) == ''
+        low_df['topics'] = ["Other" if blank else topics[mask] for mask, blank in zip(masks, empty)]
         exploded_low = low_df.explode('topics')
 
         # 3. Aggregate by Branch and Topic
-        topic_summary = exploded_low.groupby([branch_col, 'topics']).size().reset_index(name='count')
+        topic_summary = exploded_low.groupby([branch_col, 'topics'], observed=True).size().reset_index(name='count')
     
         # 4. Weekly Trend of Low Ratings
         date_col = self.cols.get('CREATED_AT')
@@ -400,12 +712,13 @@ class ShilaAnalyzer:
     
     def get_aspect_sentiment(self):
         if COLS['COMMENT'] not in self.df.columns: return pd.DataFrame()
-        df_v = self.df[[COLS['COMMENT'], COLS['RATING']]].dropna()
+        self._column('aspects')
+        df_v = self.df[[COLS['COMMENT'], COLS['RATING'], 'aspects']].dropna()
         if len(df_v) < 20: return pd.DataFrame()
+        matcher = get_matcher()
         results = []
-        for aspect, keywords in ASPECTS.items():
-            mask = df_v[COLS['COMMENT']].str.contains('|'.join(keywords), regex=True, na=False)
-            asp_df = df_v[mask]
+        for aspect in matcher.aspects:
+            asp_df = df_v[(df_v['aspects'] & matcher.bit(aspect)) > 0]
             n = len(asp_df)
             if n >= 5:
                 avg = asp_df[COLS['RATING']].mean()
@@ -413,60 +726,40 @@ class ShilaAnalyzer:
                 results.append({'aspect': aspect, 'mentions': n, 'avg_rating': round(avg, 2), 'positive_pct': round(pos/n*100, 1), 'negative_pct': round(neg/n*100, 1), 'sentiment_score': round((pos-neg)/n, 3)})
         return pd.DataFrame(results).sort_values('mentions', ascending=False)
     
-    def get_hourly_trends(self):
-        # Ensure the date column is datetime objects
-        df = self.df.copy()
-    
-        # Force conversion of SnappFood format: 26/12/2025 18:37:39
+    def get_hourly_trends(self, branches=None):
+        # SnappFood timestamps (26/12/2025 18:37:39) are parsed in _preprocess_data
         date_col = self.cols.get('CREATED_AT', 'Order Created At')
         rating_col = self.cols.get('RATING') # This will be the Persian string from config
         
         # 1. Validation: Check if columns exist
-        if rating_col not in df.columns:
-            st.error(f"Rating column not found. Expected: {rating_col}")
-            return pd.DataFrame()
-    
-        if date_col not in df.columns or rating_col not in df.columns:
+        if date_col not in self.df.columns or rating_col not in self.df.columns:
             return pd.DataFrame()
     
-        # 1. Convert to datetime if not already
-        if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-            df[date_col] = pd.to_datetime(df[date_col], dayfirst=True, errors='coerce')
-    
-        # 2. Extract hour
-        df['hour'] = df[date_col].dt.hour
-    
-        # 3. Group by hour - USE THE MAPPED COLUMN NAME HERE
-        hourly_stats = df.groupby('hour').agg(
-            avg_rating=(rating_col, 'mean'), # FIXED: Use rating_col variable
-            order_count=(rating_col, 'count') # FIXED: Use rating_col variable
-        ).reset_index()
+        # 2. Roll the metrics cube up to hours
+        stats = self._rollup('hour', branches)
+        hourly_stats = pd.DataFrame({
+            'avg_rating': stats['rating_sum'] / stats['rating_count'],
+            'order_count': stats['rating_count'],
+        }).reset_index()
     
         # 4. Fill in missing hours (0-23)
         all_hours = pd.DataFrame({'hour': range(24)})
         return all_hours.merge(hourly_stats, on='hour', how='left').fillna(0)
     
-    def get_peak_hour_analysis(self):
+    def get_peak_hour_analysis(self, branches=None):
         """Calculate busiest and best/worst performing hours."""
-        df = self.df.copy()
-    
         date_col = self.cols.get('CREATED_AT', 'Order Created At')
         rating_col = self.cols.get('RATING')
     
-        if date_col not in df.columns or rating_col not in df.columns:
+        if date_col not in self.df.columns or rating_col not in self.df.columns:
             return None
 
-        # Ensure datetime and extract hour
-        if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-            df[date_col] = pd.to_datetime(df[date_col], dayfirst=True, errors='coerce')
-    
-        df['hour'] = df[date_col].dt.hour
-    
         # Group stats
-        stats = df.groupby('hour').agg(
-            avg_rating=(rating_col, 'mean'),
-            order_count=(rating_col, 'count')
-        )
+        cube = self._rollup('hour', branches)
+        stats = pd.DataFrame({
+            'avg_rating': cube['rating_sum'] / cube['rating_count'],
+            'order_count': cube['rating_count'],
+        })
     
         if stats.empty:
             return None
@@ -480,24 +773,25 @@ class ShilaAnalyzer:
             'worst_rating': stats['avg_rating'].min()
         }   
 
-    def get_daily_trends(self):
+    def get_daily_trends(self, branches=None):
         if 'date_str' not in self.df.columns: return pd.DataFrame()
-        df = self.df[self.df['date_str'].notna()]
-        if len(df) < 7: return pd.DataFrame()
-        daily = df.groupby('date_str').agg({COLS['RATING']: ['mean', 'count']}).reset_index()
-        daily.columns = ['date', 'avg_rating', 'order_count']
+        stats = self._rollup('day', branches)
+        if stats['rows'].sum() < 7: return pd.DataFrame()
+        daily = pd.DataFrame({
+            'date': stats.index,
+            'avg_rating': (stats['rating_sum'] / stats['rating_count']).to_numpy(),
+            'order_count': stats['rating_count'].to_numpy(),
+        })
         daily = daily.sort_values('date')
         daily['rating_7day_avg'] = daily['avg_rating'].rolling(window=7, min_periods=1).mean()
         daily['orders_7day_avg'] = daily['order_count'].rolling(window=7, min_periods=1).mean()
         if COLS['NPS'] in self.df.columns:
-            nps = df.groupby('date_str')[COLS['NPS']].apply(lambda g: ((g >= 9).sum() - (g <= 6).sum()) / len(g) * 100 if len(g) > 0 else 0).reset_index()
-            nps.columns = ['date', 'nps_score']
-            daily = daily.merge(nps, on='date', how='left')
+            daily['nps_score'] = self._nps_score(stats)
         return daily
     
-    def get_day_of_week_analysis(self):
+    def get_day_of_week_analysis(self, branches=None):
         """Analyze patterns by day of week"""
-        if 'parsed_date' not in self.df.columns:
+        if 'parsed_date' not in self.df.columns or 'date_str' not in self.df.columns:
             return pd.DataFrame()
     
         # Persian day names
@@ -506,81 +800,77 @@ class ShilaAnalyzer:
         4: 'چهارشنبه', 5: 'پنجشنبه', 6: 'جمعه'
     }
     
-        df = self.df[self.df['parsed_date'].notna()].copy()
+        stats = self._rollup('day', branches)
+        days = stats.index.to_series()
     
-        # Convert Persian date to day of week (simplified - assumes recent dates)
-        # For accurate conversion, use jdatetime library
-        try:
-            import jdatetime
-            df['day_of_week'] = df['parsed_date'].apply(
-                lambda x: jdatetime.date(x[0], x[1], x[2]).weekday() if x else None
-            )
-        except:
-            return pd.DataFrame()
+        # Day of week (0 = Saturday) for each distinct day label
+        if pd.api.types.is_datetime64_any_dtype(self.df['parsed_date']):
+            # SnappFood: Gregorian dates, Monday = 0 -> Saturday = 0
+            weekday = (pd.to_datetime(days, format='%Y/%m/%d').dt.dayofweek + 2) % 7
+        else:
+            try:
+                import jdatetime
+                weekday = days.apply(lambda x: jdatetime.date(*map(int, x.split('/'))).weekday())
+            except:
+                return pd.DataFrame()
     
-        day_stats = df.groupby('day_of_week').agg({
-            COLS['RATING']: ['mean', 'count'],
-            COLS['NPS']: 'mean'
-        }).reset_index()
-        day_stats.columns = ['day_num', 'avg_rating', 'order_count', 'avg_nps']
+        day_stats = stats.groupby(weekday.to_numpy()).sum()
+        day_stats = pd.DataFrame({
+            'day_num': day_stats.index,
+            'avg_rating': (day_stats['rating_sum'] / day_stats['rating_count']).to_numpy(),
+            'order_count': day_stats['rating_count'].to_numpy(),
+            'avg_nps': (day_stats['nps_sum'] / day_stats['nps_response']).to_numpy(),
+        })
         day_stats['day_name'] = day_stats['day_num'].map(PERSIAN_DAYS)
     
         return day_stats.round(2)
     
-    def get_period_analysis(self):
+    def get_period_analysis(self, branches=None):
         """Analyze patterns by period of month (early/mid/late)"""
-        if 'parsed_date' not in self.df.columns:
+        if 'parsed_date' not in self.df.columns or 'date_str' not in self.df.columns:
             return pd.DataFrame()
         
-        df = self.df[self.df['parsed_date'].notna()].copy()
+        stats = self._rollup('day', branches)
         
-        if len(df) < 30:
+        if stats['rows'].sum() < 30:
             return pd.DataFrame()
         
-        df['day_of_month'] = df['parsed_date'].apply(lambda x: x[2] if x else None)
-        
-        def get_period(day):
-            if day <= 10: return ('Early', 'اول ماه (۱-۱۰)')
-            elif day <= 20: return ('Mid', 'میانه ماه (۱۱-۲۰)')
-            else: return ('Late', 'آخر ماه (۲۱-۳۱)')
-        
-        df['period'], df['period_fa'] = zip(*df['day_of_month'].apply(get_period))
-        
-        period_stats = df.groupby(['period', 'period_fa']).agg({
-            COLS['RATING']: ['mean', 'count']
-        }).reset_index()
-        period_stats.columns = ['period', 'period_fa', 'avg_rating', 'order_count']
+        # Day labels are Y/MM/DD in both the Persian and the Gregorian calendar
+        day_of_month = stats.index.str[-2:].astype(int)
+        periods = pd.DataFrame({
+            'period': ['Early', 'Mid', 'Late'],
+            'period_fa': ['اول ماه (۱-۱۰)', 'میانه ماه (۱۱-۲۰)', 'آخر ماه (۲۱-۳۱)'],
+        })
+        period_idx = np.select([day_of_month <= 10, day_of_month <= 20], [0, 1], default=2)
         
-        if COLS['NPS'] in df.columns:
-            nps_stats = df.groupby('period')[COLS['NPS']].mean().reset_index()
-            nps_stats.columns = ['period', 'avg_nps']
-            period_stats = period_stats.merge(nps_stats, on='period')
+        sums = stats.groupby(period_idx).sum()
+        period_stats = periods.loc[sums.index].reset_index(drop=True)
+        period_stats['avg_rating'] = (sums['rating_sum'] / sums['rating_count']).to_numpy()
+        period_stats['order_count'] = sums['rating_count'].to_numpy()
         
-        order = {'Early': 0, 'Mid': 1, 'Late': 2}
-        period_stats['sort_order'] = period_stats['period'].map(order)
-        period_stats = period_stats.sort_values('sort_order').drop('sort_order', axis=1)
+        if COLS['NPS'] in self.df.columns:
+            period_stats['avg_nps'] = (sums['nps_sum'] / sums['nps_response']).to_numpy()
         
         return period_stats.round(2)
     
-    def get_mom_comparison(self):
+    def get_mom_comparison(self, branches=None):
         """Month-over-month performance comparison"""
         if 'year_month' not in self.df.columns:
             return pd.DataFrame()
         
-        df = self.df[self.df['year_month'].notna()].copy()
+        stats = self._rollup('year_month', branches)
         
-        if len(df) < 30:
+        if stats['rows'].sum() < 30:
             return pd.DataFrame()
 
-        monthly_ym = df.groupby('year_month').size().reset_index(name='order_count')
-        monthly_ym['avg_rating'] = df.groupby('year_month')[COLS['RATING']].mean().values
+        monthly_ym = pd.DataFrame({
+            'year_month': stats.index,
+            'order_count': stats['rows'].to_numpy(),
+            'avg_rating': (stats['rating_sum'] / stats['rating_count']).to_numpy(),
+        })
         
-        if COLS['NPS'] in df.columns:
-            monthly_nps = df.groupby('year_month')[COLS['NPS']].apply(
-                lambda g: ((g >= 9).sum() - (g <= 6).sum()) / len(g) * 100 if len(g) > 0 else 0
-            ).reset_index()
-            monthly_nps.columns = ['year_month', 'nps_score']
-            monthly_ym = monthly_ym.merge(monthly_nps, on='year_month')        
+        if COLS['NPS'] in self.df.columns:
+            monthly_ym['nps_score'] = self._nps_score(stats)
 
         monthly_ym = monthly_ym.sort_values('year_month')
         monthly_ym['rating_change'] = monthly_ym['avg_rating'].diff()
@@ -591,6 +881,7 @@ class ShilaAnalyzer:
         
         return monthly_ym.round(2)
    
+    @_numpy_dtypes
     def get_rating_nps_correlation(self):
         """Analyze relationship between rating and NPS"""
         rating_col = COLS['RATING']
@@ -621,32 +912,28 @@ class ShilaAnalyzer:
             'anomaly_high_rating_detractors': len(high_rating_detractors)
             }
     
+    @_numpy_dtypes
     def get_low_rating_comments_by_hour(self, min_rating=1, max_rating=3):
         """Filter and return low-rating comments with their hours."""
-        df = self.df.copy()
-    
         date_col = self.cols.get('CREATED_AT', 'Order Created At')
         rating_col = self.cols.get('RATING')
         comment_col = self.cols.get('COMMENT')
     
         # Validation
-        if not all(col in df.columns for col in [date_col, rating_col]):
+        if not all(col in self.df.columns for col in [date_col, rating_col]):
             return pd.DataFrame()
 
-        # Ensure datetime
-        if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-            df[date_col] = pd.to_datetime(df[date_col], dayfirst=True, errors='coerce')
-    
-        df['hour'] = df[date_col].dt.hour
+        self._column('hour')
+        df = self.df
     
         # Filter for low ratings (1, 2, 3) and existing comments
-        low_ratings = df[
+        low_ratings = (
             (df[rating_col] >= min_rating) & 
             (df[rating_col] <= max_rating) &
             (df[comment_col].notna())
-        ].copy()
+        )
     
-        return low_ratings[[date_col, 'hour', rating_col, comment_col, self.cols.get('BRANCH', 'Branch')]]
+        return df.loc[low_ratings, [date_col, 'hour', rating_col, comment_col, self.cols.get('BRANCH', 'Branch')]]
     
     def get_issue_category_analysis(self):
         """Detailed analysis of delivery, packaging, personnel issues"""
@@ -746,37 +1033,18 @@ class ShilaAnalyzer:
     
     def get_recovery_opportunities(self):
         """Find customers who gave low ratings but high NPS (salvageable)"""
-        df = self.df.copy()
-        
-        if COLS['NPS'] not in df.columns or COLS['RATING'] not in df.columns:
+        if COLS['NPS'] not in self.df.columns or COLS['RATING'] not in self.df.columns:
             return pd.DataFrame()
         
-        df['segment'] = 'Neutral'
-        df['segment_fa'] = 'خنثی'
-        df['emoji'] = '😐'
-    
-        mask_happy = (df[COLS['RATING']] >= 4) & (df[COLS['NPS']] >= 9)
-        df.loc[mask_happy, 'segment'] = 'Happy'
-        df.loc[mask_happy, 'segment_fa'] = 'راضی'
-        df.loc[mask_happy, 'emoji'] = '😊'
-        
-        mask_risk = (df[COLS['RATING']] <= 2) & (df[COLS['NPS']] <= 6)
-        df.loc[mask_risk, 'segment'] = 'At Risk'
-        df.loc[mask_risk, 'segment_fa'] = 'در خطر'
-        df.loc[mask_risk, 'emoji'] = '🚨'
-        
-        mask_recovery = (df[COLS['RATING']] <= 3) & (df[COLS['NPS']] >= 7) & ~mask_happy
-        df.loc[mask_recovery, 'segment'] = 'Recovery'
-        df.loc[mask_recovery, 'segment_fa'] = 'قابل بازیابی'
-        df.loc[mask_recovery, 'emoji'] = '🔄'
-        
-        mask_churner = (df[COLS['RATING']] >= 3) & (df[COLS['NPS']] <= 6) & ~mask_risk
-        df.loc[mask_churner, 'segment'] = 'Silent Churner'
-        df.loc[mask_churner, 'segment_fa'] = 'ریزش خاموش'
-        df.loc[mask_churner, 'emoji'] = '⚠️'
-        
-        segment_counts = df.groupby(['segment', 'segment_fa', 'emoji']).size().reset_index(name='count')
-        segment_counts['percentage'] = (segment_counts['count'] / len(df) * 100).round(1)
+        counts = self._column('segment').value_counts(sort=False)
+        counts = counts[counts > 0].sort_index(key=lambda idx: idx.astype(str))
+        segment_counts = pd.DataFrame({
+            'segment': counts.index.astype(str),
+            'segment_fa': [RECOVERY_SEGMENTS[s][0] for s in counts.index],
+            'emoji': [RECOVERY_SEGMENTS[s][1] for s in counts.index],
+            'count': counts.to_numpy(),
+        })
+        segment_counts['percentage'] = (segment_counts['count'] / len(self.df) * 100).round(1)
         
         order = {'At Risk': 0, 'Silent Churner': 1, 'Recovery': 2, 'Neutral': 3, 'Happy': 4}
         segment_counts['sort_order'] = segment_counts['segment'].map(order)
@@ -784,33 +1052,26 @@ class ShilaAnalyzer:
         
         return segment_counts
     
+    @_numpy_dtypes
     def get_unmapped_comments(self, category_type="Other"):
         """
         Returns rows where the topic was identified as 'Other' or 'Uncategorized'.
         category_type: "Other" or "Uncategorized"
         """
-        df = self.df.copy()
         comment_col = self.cols.get('COMMENT')
         rating_col = self.cols.get('RATING')
         branch_col = self.cols.get('BRANCH')
     
         # We apply the same identification logic used in your deep dive
-        from config import ASPECTS
-        def is_other(text):
-            if not text or pd.isna(text) or len(str(text).strip()) < 5:
-                return "Uncategorized"
-        
-            text_clean = str(text).replace('ي', 'ی').replace('ك', 'ک')
-            for keywords in ASPECTS.values():
-                if any(kw in text_clean for kw in keywords):
-                    return "Mapped"
-            return "Other"
-
-        df['mapping_status'] = df[comment_col].apply(is_other)
+        comments = self.df[comment_col]
+        too_short = comments.isna() | (comments.astype(str).str.strip().str.len() < 5)
+        mapping_status = pd.Series(
+            np.where(too_short, "Uncategorized", np.where(self._column('aspects') > 0, "Mapped", "Other")),
+            index=self.df.index
+        )
     
         # Filter for the requested type and return relevant columns
-        unmapped = df[df['mapping_status'] == category_type]
-        return unmapped[[branch_col, rating_col, comment_col]]
+        return self.df.loc[mapping_status == category_type, [branch_col, rating_col, comment_col]]
     
     def get_summary_for_ai(self):
         kpis = self.get_kpis()
@@ -866,22 +1127,7 @@ class ShilaAnalyzer:
 
     def preprocess_persian_text(self, text):
         """Clean and normalize Persian text"""
-        if pd.isna(text) or not isinstance(text, str):
-            return ""
-    
-        # Normalize if Hazm is available
-        if HAZM_AVAILABLE:
-            normalizer = Normalizer()
-            text = normalizer.normalize(text)
-    
-        # Remove English characters and numbers
-        text = re.sub(r'[a-zA-Z0-9]', '', text)
-        # Remove special characters but keep Persian
-        text = re.sub(r'[^\u0600-\u06FF\s]', '', text)
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return preprocess_text(text)
 
     def get_persian_stopwords(self):
         """Get Persian stopwords list"""
@@ -897,9 +1143,10 @@ class ShilaAnalyzer:
         'بودند', 'بوده', 'شدن', 'کردن', 'کردند', 'میکنه', 'میشد', 'همچنین'
     ]
     
-        if HAZM_AVAILABLE:
+        hazm = _hazm()
+        if hazm:
             try:
-                return list(set(stopwords_list() + custom_stopwords))
+                return list(set(hazm['stopwords_list']() + custom_stopwords))
             except:
                 pass
     
@@ -907,17 +1154,101 @@ class ShilaAnalyzer:
 
     def tokenize_text(self, text):
         """Tokenize Persian text"""
-        if not text:
-            return []
-    
-        if HAZM_AVAILABLE:
-            try:
-                return word_tokenize(text)
-            except:
-                pass
-    
-        # Fallback: simple split
-        return text.split()
+        return tokenize(text)
+
+    def _comment_tokens(self):
+        """(codes, tokens) for the text column, tokenized once per analyzer.
+
+        codes maps each row to a distinct comment (-1 = missing), tokens holds
+        the preprocessed tokens of each distinct comment.
+        """
+        def build():
+            codes, uniques = pd.factorize(self.df[self.get_text_column()])
+            tokens = tokenize_comments(list(uniques))
+            self._token_cache = (codes, tokens)
+        self._build_once('tokens', build)
+        return self._token_cache
+
+    def _sentiment_scores(self):
+        """Positive / negative lexicon words (distinct, whole tokens) and label per row"""
+        codes, tokens = self._comment_tokens()
+        positive = {self.preprocess_persian_text(w) for w in SENTIMENT_LEXICON['positive']}
+        negative = {self.preprocess_persian_text(w) for w in SENTIMENT_LEXICON['negative']}
+
+        # Score each distinct comment once; the trailing 0 is picked by code -1
+        pos = np.array([len(positive.intersection(t)) for t in tokens] + [0], dtype=np.int8)[codes]
+        neg = np.array([len(negative.intersection(t)) for t in tokens] + [0], dtype=np.int8)[codes]
+
+        label = np.select(
+            [pos > neg, neg > pos, pos + neg > 0],
+            ['positive', 'negative', 'mixed'],
+            default='neutral'
+        )
+        return pos, neg, pd.Categorical(label, categories=SENTIMENT_LABELS)
+
+    def _token_ids(self):
+        """Stopword-filtered tokens of every distinct comment as one vocabulary-encoded array.
+
+        Returns (ids, doc, weights, vocab): token ids in comment order, the distinct
+        comment each token belongs to, the number of rows per distinct comment and
+        the id -> word array.
+        """
+        def build():
+            codes, tokens = self._comment_tokens()
+            stopwords = set(self.get_persian_stopwords())
+            vocab = {}
+            ids, doc = [], []
+            for d, doc_tokens in enumerate(tokens):
+                for t in doc_tokens:
+                    if t not in stopwords and len(t) > 1:
+                        ids.append(vocab.setdefault(t, len(vocab)))
+                        doc.append(d)
+            weights = np.bincount(codes[codes >= 0], minlength=len(tokens))
+            self._ngram_cache['ids'] = (
+                np.array(ids, dtype=np.int64), np.array(doc, dtype=np.int64),
+                weights, np.array(list(vocab), dtype=object)
+            )
+        self._build_once('ids', build)
+        return self._ngram_cache['ids']
+
+    def _ngram_table(self, n):
+        """(counts, starts) of every n-gram, most frequent first.
+
+        N-grams are counted as int64 keys over the encoded token array, weighted by
+        how many rows share each comment; `starts` is the position of the first
+        occurrence, which also breaks ties (first seen ranks first). n = 1..3 are
+        computed together on first use and cached with the analyzer.
+        """
+        def build():
+            ids, doc, weights, vocab = self._token_ids()
+            base = max(len(vocab), 1)
+            for k in sorted({1, 2, 3, n} - set(self._ngram_cache)):
+                m = len(ids) - k + 1
+                if m <= 0:
+                    self._ngram_cache[k] = (np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+                    continue
+                # Only windows that stay inside one comment
+                starts = np.flatnonzero(doc[:m] == doc[k - 1:])
+                if base ** k < 1 << 63:
+                    keys = np.zeros(len(starts), dtype=np.int64)
+                    for j in range(k):
+                        keys = keys * base + ids[starts + j]
+                    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+                else:  # vocabulary too large for one int64 key per n-gram
+                    windows = np.stack([ids[starts + j] for j in range(k)], axis=1)
+                    _, first, inverse = np.unique(windows, axis=0, return_index=True, return_inverse=True)
+                    inverse = inverse.ravel()
+                counts = np.bincount(inverse, weights=weights[doc[starts]]).astype(np.int64)
+                first = starts[first]
+                order = np.lexsort((first, -counts))
+                self._ngram_cache[k] = (counts[order], first[order])
+        if n not in self._ngram_cache:
+            self._build_once(('ngrams', n), build)
+        return self._ngram_cache[n]
+
+    def _ngram_phrase(self, start, n):
+        ids, _, _, vocab = self._token_ids()
+        return ' '.join(vocab[ids[start:start + n]])
 
     def get_word_frequency(self, min_freq=5, top_n=50):
         """Get word frequency for word cloud"""
@@ -925,22 +1256,13 @@ class ShilaAnalyzer:
         if not text_col:
             return {}
     
-        stopwords = self.get_persian_stopwords()
-        word_counts = Counter()
-    
-        for _, row in self.df.iterrows():
-            text = self.preprocess_persian_text(row.get(text_col, ''))
-            tokens = self.tokenize_text(text)
-        
-            for token in tokens:
-                if len(token) > 1 and token not in stopwords:
-                    word_counts[token] += 1
-    
-        # Filter by minimum frequency
-        filtered = {k: v for k, v in word_counts.items() if v >= min_freq}
-    
-        # Return top N
-        return dict(Counter(filtered).most_common(top_n))
+        # Unigrams from the shared n-gram counts, already sorted by frequency
+        counts, starts = self._ngram_table(1)
+        keep = counts >= min_freq
+        return {
+            self._ngram_phrase(start, 1): int(count)
+            for count, start in zip(counts[keep][:top_n], starts[keep][:top_n])
+        }
 
     def get_ngram_analysis(self, n=2, min_freq=3, top_n=30):
         """Find common n-gram phrases"""
@@ -948,28 +1270,127 @@ class ShilaAnalyzer:
         if not text_col:
             return pd.DataFrame()
     
-        stopwords = self.get_persian_stopwords()
-        ngram_counts = Counter()
+        # Filter and sort (counts are shared by every call, see _ngram_table)
+        counts, starts = self._ngram_table(n)
+        keep = counts >= min_freq
+        filtered = [
+            (self._ngram_phrase(start, n), int(count))
+            for count, start in zip(counts[keep][:top_n], starts[keep][:top_n])
+        ]
     
-        for _, row in self.df.iterrows():
-            text = self.preprocess_persian_text(row.get(text_col, ''))
-            tokens = self.tokenize_text(text)
-        
-            # Filter stopwords
-            tokens = [t for t in tokens if t not in stopwords and len(t) > 1]
-            
-            # Create n-grams
-            for i in range(len(tokens) - n + 1):
-                ngram = ' '.join(tokens[i:i+n])
-                ngram_counts[ngram] += 1
-                
-        # Filter and sort
-        filtered = [(k, v) for k, v in ngram_counts.items() if v >= min_freq]
-        filtered.sort(key=lambda x: x[1], reverse=True)
-    
-        df_ngrams = pd.DataFrame(filtered[:top_n], columns=['phrase', 'count'])
+        df_ngrams = pd.DataFrame(filtered, columns=['phrase', 'count'])
         return df_ngrams
 
+    def _doc_term_matrix(self):
+        """Sparse (distinct comment x term) count matrix over the cached token ids"""
+        def build():
+            from scipy import sparse
+            ids, doc, weights, vocab = self._token_ids()
+            self._ngram_cache['dtm'] = sparse.csr_matrix(
+                (np.ones(len(ids), dtype=np.int64), (doc, ids)),
+                shape=(len(weights), len(vocab))
+            )
+        self._build_once('dtm', build)
+        return self._ngram_cache['dtm']
+
+    def _group_codes(self, by):
+        """Per-row group index (-1 = no group) and group names for a keyword grouping.
+
+        by: 'rating' (low 1-2 / mid 3 / high 4-5 stars), 'branch', 'month', or a
+        Series of labels aligned with self.df.
+        """
+        if isinstance(by, pd.Series):
+            labels = by
+        elif by == 'rating':
+            rating = self.df[COLS['RATING']]
+            bands = {'low': [1, 2], 'mid': [3], 'high': [4, 5]}
+            conditions = [rating.isin(values).to_numpy(dtype=bool) for values in bands.values()]
+            return np.select(conditions, range(len(bands)), default=-1), list(bands)
+        elif by == 'branch':
+            labels = self.df[COLS['BRANCH']]
+        elif by == 'month':
+            created_col = self.cols.get('CREATED_AT', 'Order Created At')
+            labels = self._column('month') if created_col in self.df.columns else self.df.get('year_month')
+        else:
+            raise ValueError(f"Unknown keyword grouping: {by}")
+        if labels is None:
+            return np.full(len(self.df), -1), []
+        codes, groups = pd.factorize(labels, sort=True)
+        return codes, list(groups)
+
+    def get_group_term_counts(self, by='rating'):
+        """(groups, counts, totals): sparse (group x term) counts summed over each group's
+        rows, and corpus-wide counts per term. Terms are the ids of the shared vocabulary."""
+        from scipy import sparse
+        dtm = self._doc_term_matrix()
+        codes, _ = self._comment_tokens()
+        group_codes, groups = self._group_codes(by)
+        _, _, weights, _ = self._token_ids()
+
+        # (group x distinct comment) row counts, then one sparse product
+        valid = (group_codes >= 0) & (codes >= 0)
+        membership = sparse.csr_matrix(
+            (np.ones(valid.sum(), dtype=np.int64), (group_codes[valid], codes[valid])),
+            shape=(len(groups), dtm.shape[0])
+        )
+        counts = membership @ dtm
+        totals = np.asarray(dtm.T @ weights).ravel()
+        return groups, counts, totals
+
+    def get_distinctive_keywords(self, by='rating', method='relative', top_n=20, min_total=5, min_count=3):
+        """Most distinctive words per group.
+
+        method:
+          'relative' - share of the word's occurrences that fall in the group
+          'tfidf'    - group term frequency x inverse document frequency over comments
+          'log_odds' - z-scored log-odds ratio vs. the rest of the corpus
+                       (informative Dirichlet prior from corpus counts)
+        Returns {group: [{'word', 'count', 'score', 'total'}, ...]}.
+        """
+        text_col = self.get_text_column()
+        if not text_col:
+            return {}
+
+        groups, counts, totals = self.get_group_term_counts(by)
+        _, _, weights, vocab = self._token_ids()
+        counts = counts.toarray()
+
+        if method == 'tfidf':
+            dtm = self._doc_term_matrix()
+            doc_freq = np.asarray((dtm > 0).T @ weights).ravel()
+            n_docs = weights[np.diff(dtm.indptr) > 0].sum()
+            idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+            group_len = np.maximum(counts.sum(axis=1, keepdims=True), 1)
+            scores, digits = counts / group_len * idf, 4
+        elif method == 'log_odds':
+            alpha, alpha0 = totals, totals.sum()
+            rest = totals - counts
+            n_group = counts.sum(axis=1, keepdims=True)
+            n_rest = alpha0 - n_group
+            with np.errstate(divide='ignore', invalid='ignore'):
+                delta = (np.log((counts + alpha) / (n_group + alpha0 - counts - alpha))
+                         - np.log((rest + alpha) / (n_rest + alpha0 - rest - alpha)))
+                scores = delta / np.sqrt(1 / (counts + alpha) + 1 / (rest + alpha))
+            digits = 3
+        elif method == 'relative':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = counts / totals
+            digits = 3
+        else:
+            raise ValueError(f"Unknown distinctiveness method: {method}")
+
+        results = {}
+        for g, group in enumerate(groups):
+            terms = np.flatnonzero((counts[g] >= min_count) & (totals >= min_total))
+            score = np.round(scores[g, terms], digits)
+            # Highest score first, then count; ties keep first-seen order
+            order = np.lexsort((terms, -counts[g, terms], -score))
+            results[group] = [
+                {'word': vocab[t], 'count': int(counts[g, t]), 'score': float(sc), 'total': int(totals[t])}
+                for t, sc in zip(terms[order][:top_n], score[order][:top_n])
+            ]
+        return results
+
     def get_keywords_by_rating(self, top_n=20):
         """Find distinctive keywords for each rating level"""
         text_col = self.get_text_column()
@@ -978,72 +1399,39 @@ class ShilaAnalyzer:
         if not text_col or rating_col not in self.df.columns:
             return {}
     
-        stopwords = self.get_persian_stopwords()
-    
-        # Group ratings
-        rating_groups = {
-            'low': [1, 2],      # 1-2 stars
-            'mid': [3],         # 3 stars
-            'high': [4, 5]      # 4-5 stars
-        }
-    
-        results = {}
-        all_words = Counter()
-        group_words = {g: Counter() for g in rating_groups}
-    
-        for _, row in self.df.iterrows():
-            text = self.preprocess_persian_text(row.get(text_col, ''))
-            rating = row.get(rating_col)
-            tokens = self.tokenize_text(text)
-        
-            for token in tokens:
-                if len(token) > 1 and token not in stopwords:
-                    all_words[token] += 1
-                    for group, ratings in rating_groups.items():
-                        if rating in ratings:
-                            group_words[group][token] += 1
-    
-        # Calculate TF-IDF-like score (relative frequency)
-        for group, words in group_words.items():
-            scored_words = []
-            for word, count in words.items():
-                if all_words[word] >= 5:  # Min frequency
-                # Score = group frequency / total frequency
-                    score = count / all_words[word]
-                    if count >= 3:  # Min count in group
-                        scored_words.append({
-                            'word': word,
-                            'count': count,
-                            'score': round(score, 3),
-                            'total': all_words[word]
-                        })
-        
-            # Sort by score (distinctiveness)
-            scored_words.sort(key=lambda x: (x['score'], x['count']), reverse=True)
-            results[group] = scored_words[:top_n]
-    
-        return results
+        # Score = group frequency / total frequency (TF-IDF-like), from the shared
+        # sparse document-term matrix
+        return self.get_distinctive_keywords('rating', 'relative', top_n=top_n, min_total=5, min_count=3)
 
-    def get_topic_keywords(self, n_topics=5, n_words=10):
-        """Simple topic discovery using word co-occurrence"""
+    def get_topic_keywords(self, n_topics=5, n_words=10, method='seed'):
+        """Topic discovery over the comments.
+
+        method:
+          'seed' - fixed seed-word topics (word co-occurrence with the seed lists)
+          'nmf'  - NMF on TF-IDF weights of the sparse document-term matrix
+          'lda'  - Latent Dirichlet Allocation on term counts
+        Returns [{'topic', 'keywords', 'count'}, ...], largest topic first. Model
+        topics are named after their two strongest words and counted as the rows
+        whose dominant topic they are. Falls back to 'seed' without scikit-learn.
+        """
         text_col = self.get_text_column()
         if not text_col:
             return []
-    
-        stopwords = self.get_persian_stopwords()
-    
-        # Collect all documents as word lists
-        documents = []
-        for _, row in self.df.iterrows():
-            text = self.preprocess_persian_text(row.get(text_col, ''))
-            tokens = self.tokenize_text(text)
-            tokens = [t for t in tokens if t not in stopwords and len(t) > 1]
-            if tokens:
-                documents.append(tokens)
-    
-        if not documents:
-            return []
-    
+
+        if method != 'seed' and SKLEARN_AVAILABLE:
+            model = self._topic_model(n_topics, method, n_words)
+            if model is None:
+                return []
+            dominant, _ = self._dominant_topics(model)
+            counts = np.bincount(dominant[dominant >= 0], minlength=n_topics)
+            results = [
+                {'topic': label, 'keywords': words, 'count': int(count)}
+                for label, words, count in zip(self._topic_labels(model), model['top_words'], counts)
+                if words and count > 0
+            ]
+            results.sort(key=lambda x: x['count'], reverse=True)
+            return results
+
         # Simple approach: cluster by seed words
         seed_topics = {
         'کیفیت غذا': ['غذا', 'کیفیت', 'طعم', 'مزه', 'خوشمزه', 'تازه', 'سرد', 'گرم', 'پخت', 'خام'],
@@ -1052,18 +1440,23 @@ class ShilaAnalyzer:
         'بسته‌بندی': ['بسته', 'بندی', 'کارتن', 'جعبه', 'ظرف', 'پاره', 'ریخته', 'نشت'],
         'پرسنل و خدمات': ['پرسنل', 'برخورد', 'رفتار', 'پشتیبان', 'خدمات', 'مودب', 'بی‌ادب']
         }
-    
+
+        # Stopword-filtered tokens of each distinct comment, counted once per row
+        ids, doc, weights, vocab = self._token_ids()
+        bounds = np.searchsorted(doc, np.arange(len(weights) + 1))
         topic_counts = {topic: Counter() for topic in seed_topics}
-    
-        for doc in documents:
-            doc_text = ' '.join(doc)
+
+        for d, weight in enumerate(weights):
+            if weight == 0 or bounds[d] == bounds[d + 1]:
+                continue
+            words = vocab[ids[bounds[d]:bounds[d + 1]]]
+            doc_text = ' '.join(words)
             for topic, seeds in seed_topics.items():
-                for seed in seeds:
-                    if seed in doc_text:
-                        for word in doc:
-                            topic_counts[topic][word] += 1
-                        break
-    
+                if any(seed in doc_text for seed in seeds):
+                    counter = topic_counts[topic]
+                    for word in words:
+                        counter[word] += weight
+
         # Format results
         results = []
         for topic, words in topic_counts.items():
@@ -1072,12 +1465,68 @@ class ShilaAnalyzer:
                 results.append({
                     'topic': topic,
                     'keywords': top_words,
-                    'count': sum(words.values())
+                    'count': int(sum(words.values()))
                 })
-    
+
         results.sort(key=lambda x: x['count'], reverse=True)
         return results
 
+    def _topic_model(self, n_topics, method, n_words=10):
+        """NMF / LDA fit on the distinct comments, shared through topic_model's cache"""
+        dtm = self._doc_term_matrix()
+        _, _, _, vocab = self._token_ids()
+        if 'fingerprint' not in self._ngram_cache:
+            self._ngram_cache['fingerprint'] = fingerprint(dtm, vocab)
+        return fit_topic_model(dtm, vocab, self._ngram_cache['fingerprint'], n_topics=n_topics,
+                               method=method, n_words=n_words)
+
+    @staticmethod
+    def _topic_labels(model):
+        """Topic names from their two strongest words (numbered when empty or repeated)"""
+        labels = []
+        for i, words in enumerate(model['top_words']):
+            label = ' / '.join(words[:2]) or f'topic {i + 1}'
+            labels.append(label if label not in labels else f'{label} ({i + 1})')
+        return labels
+
+    def _dominant_topics(self, model):
+        """Per-row dominant topic (-1 = no comment / no modeled words) and its weight"""
+        codes, _ = self._comment_tokens()
+        doc_topic = model['doc_topic']
+        best = doc_topic.argmax(axis=1)
+        weight = doc_topic.max(axis=1)
+        best = np.where(weight > 0, best, -1)
+        # Trailing entries are picked by code -1 (missing comment)
+        dominant = np.append(best, -1)[codes]
+        return dominant, np.append(weight, 0)[codes]
+
+    def get_comment_topics(self, n_topics=5, method='nmf', n_words=10):
+        """Topic weights of every commented row for an NMF / LDA model.
+
+        Returns a DataFrame indexed like self.df with the comment, its dominant
+        topic and weight, and one weight column per topic (named like
+        get_topic_keywords). Empty without scikit-learn or enough text.
+        """
+        text_col = self.get_text_column()
+        if not text_col or not SKLEARN_AVAILABLE:
+            return pd.DataFrame()
+        model = self._topic_model(n_topics, method, n_words)
+        if model is None:
+            return pd.DataFrame()
+
+        codes, _ = self._comment_tokens()
+        dominant, weight = self._dominant_topics(model)
+        labels = self._topic_labels(model)
+        rows = dominant >= 0
+
+        result = pd.DataFrame(model['doc_topic'][codes[rows]].astype(float).round(3), columns=labels,
+                              index=self.df.index[rows])
+        result.insert(0, 'weight', weight[rows].astype(float).round(3))
+        result.insert(0, 'topic', pd.Categorical.from_codes(dominant[rows], categories=labels))
+        result.insert(0, text_col, self.df[text_col][rows])
+        return result
+
+    @_numpy_dtypes
     def get_comment_sentiment_distribution(self):
         """Analyze sentiment distribution of comments"""
         text_col = self.get_text_column()
@@ -1086,52 +1535,21 @@ class ShilaAnalyzer:
         if not text_col or rating_col not in self.df.columns:
             return pd.DataFrame()
     
-        # Positive and negative word lists
-        positive_words = [
-        'عالی', 'خوب', 'عالیه', 'خوشمزه', 'تازه', 'سریع', 'مودب', 'تمیز',
-        'عالی‌بود', 'راضی', 'ممنون', 'متشکر', 'بهترین', 'فوق‌العاده',
-        'محشر', 'دوست‌داشتنی', 'لذیذ', 'گرم', 'مناسب', 'حرفه‌ای'
-        ]
-    
-        negative_words = [
-        'بد', 'افتضاح', 'سرد', 'دیر', 'گران', 'کم', 'کثیف', 'خراب',
-        'بی‌کیفیت', 'ناراضی', 'متاسف', 'بدترین', 'زشت', 'خام', 'سوخته',
-        'تاخیر', 'اشتباه', 'بی‌ادب', 'پاره', 'ریخته', 'نامناسب'
-        ]
-    
-        results = []
-        for _, row in self.df.iterrows():
-            text = str(row.get(text_col, '')).lower()
-            rating = row.get(rating_col)
-        
-            if not text or pd.isna(rating):
-                continue
-        
-            pos_count = sum(1 for w in positive_words if w in text)
-            neg_count = sum(1 for w in negative_words if w in text)
-        
-            if pos_count + neg_count > 0:
-                sentiment = 'positive' if pos_count > neg_count else ('negative' if neg_count > pos_count else 'mixed')
-            else:
-                sentiment = 'neutral'
-        
-            results.append({
-                'rating': rating,
-                'sentiment': sentiment,
-                'pos_words': pos_count,
-                'neg_words': neg_count
-            })
-    
-        df_sent = pd.DataFrame(results)
+        # Scored once per comment (SENTIMENT_LEXICON in config.py)
+        sentiment = self._column('sentiment')
+        comments = self.df[text_col]
+        has_text = comments.notna() & (comments.astype(str) != '')
+        valid = has_text & self.df[rating_col].notna()
     
-        if len(df_sent) == 0:
+        if not valid.any():
             return pd.DataFrame()
     
         # Aggregate
-        summary = df_sent.groupby('sentiment').agg(
-            count=('rating', 'count'),
-            avg_rating=('rating', 'mean')
+        summary = self.df.loc[valid, rating_col].groupby(sentiment[valid], observed=True).agg(
+            count='count',
+            avg_rating='mean'
         ).reset_index()
+        summary['sentiment'] = summary['sentiment'].astype(str)
     
         summary['percentage'] = (summary['count'] / summary['count'].sum() * 100).round(1)
     
@@ -1145,59 +1563,41 @@ class ShilaAnalyzer:
         if not text_col or rating_col not in self.df.columns:
             return pd.DataFrame()
     
-        positive_words = ['عالی', 'خوب', 'خوشمزه', 'تازه', 'سریع', 'مودب', 'تمیز', 'راضی', 'ممنون', 'بهترین', 'فوق‌العاده']
-        negative_words = ['بد', 'افتضاح', 'سرد', 'دیر', 'گران', 'کم', 'کثیف', 'خراب', 'بی‌کیفیت', 'ناراضی', 'بدترین', 'تاخیر']
-    
-        results = []
-        for _, row in self.df.iterrows():
-            text = str(row.get(text_col, '')).lower()
-            rating = row.get(rating_col)
-        
-            if pd.isna(rating):
-                continue
-        
-            pos_count = sum(1 for w in positive_words if w in text)
-            neg_count = sum(1 for w in negative_words if w in text)
-        
-            if pos_count > neg_count:
-                sentiment = 'Positive'
-            elif neg_count > pos_count:
-                sentiment = 'Negative'
-            else:
-                sentiment = 'Neutral'
-        
-            results.append({'rating': int(rating), 'sentiment': sentiment})
-    
-        df = pd.DataFrame(results)
+        # Same per-comment scores as the distribution; ties (mixed) count as Neutral here
+        labels = {'positive': 'Positive', 'negative': 'Negative', 'mixed': 'Neutral', 'neutral': 'Neutral'}
+        sentiment = self._column('sentiment')
+        rated = self.df[rating_col].notna()
     
-        if len(df) == 0:
+        if not rated.any():
             return pd.DataFrame()
     
         # Create cross-tab
-        matrix = pd.crosstab(df['rating'], df['sentiment'], margins=True)
+        matrix = pd.crosstab(
+            pd.Series(self.df.loc[rated, rating_col].to_numpy(dtype=float).astype(int), name='rating'),
+            pd.Series(sentiment[rated].map(labels).to_numpy(dtype=object), name='sentiment'),
+            margins=True
+        )
     
         return matrix
 
-    def get_weekly_trends(self):
+    def get_weekly_trends(self, branches=None):
         """Aggregate trends by week (ISO week number)"""
         try:
-            df = self.df.copy()
             date_col = self.cols.get('CREATED_AT') or self.cols.get('DATE')
             rating_col = self.cols.get('RATING')
             
-            if date_col not in df.columns or rating_col not in df.columns:
+            if date_col not in self.df.columns or rating_col not in self.df.columns:
                 return pd.DataFrame()
             
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df = df.dropna(subset=[date_col, rating_col])
+            # Week labels like "2025-W03" for sorting + readability, rolled up from the cube
+            stats = self._rollup('week', branches)
+            stats = stats[stats['rating_count'] > 0]
             
-            # Create a week label like "2025-W03" for sorting + readability
-            df['week'] = df[date_col].dt.strftime('%Y-W%V')
-            
-            weekly = df.groupby('week').agg(
-                avg_rating=(rating_col, 'mean'),
-                order_count=(rating_col, 'count')
-            ).reset_index()
+            weekly = pd.DataFrame({
+                'week': stats.index,
+                'avg_rating': (stats['rating_sum'] / stats['rating_count']).to_numpy(),
+                'order_count': stats['rating_count'].to_numpy(),
+            })
             
             weekly['avg_rating'] = weekly['avg_rating'].round(2)
             weekly = weekly.sort_values('week')
@@ -1212,26 +1612,24 @@ class ShilaAnalyzer:
             print(f"Weekly trends error: {e}")
             return pd.DataFrame()
 
-    def get_monthly_trends(self):
+    def get_monthly_trends(self, branches=None):
         """Aggregate trends by calendar month"""
         try:
-            df = self.df.copy()
             date_col = self.cols.get('CREATED_AT') or self.cols.get('DATE')
             rating_col = self.cols.get('RATING')
             
-            if date_col not in df.columns or rating_col not in df.columns:
+            if date_col not in self.df.columns or rating_col not in self.df.columns:
                 return pd.DataFrame()
             
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df = df.dropna(subset=[date_col, rating_col])
+            # Month labels like "2025-01", rolled up from the cube
+            stats = self._rollup('month', branches)
+            stats = stats[stats['rating_count'] > 0]
             
-            # Create month label like "2025-01"
-            df['month'] = df[date_col].dt.strftime('%Y-%m')
-            
-            monthly = df.groupby('month').agg(
-                avg_rating=(rating_col, 'mean'),
-                order_count=(rating_col, 'count')
-            ).reset_index()
+            monthly = pd.DataFrame({
+                'month': stats.index,
+                'avg_rating': (stats['rating_sum'] / stats['rating_count']).to_numpy(),
+                'order_count': stats['rating_count'].to_numpy(),
+            })
             
             monthly['avg_rating'] = monthly['avg_rating'].round(2)
             monthly = monthly.sort_values('month')
@@ -7,14 +7,19 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
-import io
-from openpyxl.drawing.image import Image as XLImage
+import uuid
 from datetime import datetime
-import matplotlib.pyplot as plt
-from ml_analyzer import ShilaMLAnalyzer
-from config import COLS, LABELS, COLORS, DATA_DIR, REPORTS_DIR, NOTEBOOKLM_DIR, ANTHROPIC_API_KEY, DASHBOARD_PASSWORD
+from config import COLS, LABELS, COLORS, DATA_DIR, REPORTS_DIR, NOTEBOOKLM_DIR, ANTHROPIC_API_KEY, DASHBOARD_PASSWORD, PROFILE_ENABLED, WAREHOUSE_ENABLED
 from analyzer import ShilaAnalyzer
 from ai_insights import InsightsGenerator, get_api_setup_instructions
+from data_loader import load_files, exclude_branches, optimize_dtypes
+from perf import Profiler
+from result_cache import memoize, prefetch
+from shared_cache import get_shared_cache, content_digest
+from upload_registry import get_upload_registry
+from warehouse import get_warehouse, is_snappfood_frame, load_and_store
+# Heavy modules (sklearn, openpyxl, wordcloud) are imported inside
+# the tab or export button that needs them to keep cold starts short.
 
 # Page Config
 st.set_page_config(page_title="Quality Function Deployment Dashboard", 
@@ -528,94 +533,6 @@ def render_hero_section():
 # ==========================================
 # 3. Add the Helper Function
 # ==========================================
-# ==========================================
-# SNAPPFOOD FILE LOADER
-# ==========================================
-
-def load_snappfood_file(uploaded_file):
-    """Load SnappFood format Excel file and convert to standard format (NPS/Pareto/Kano IGNORED)"""
-    from config import SNAPPFOOD_COLS, SNAPPFOOD_ISSUES, COLS
-    import pandas as pd
-    
-    df_raw = pd.read_excel(uploaded_file, sheet_name='Reviews', header=None)
-    
-    # Find where reviews end
-    reviews_end = len(df_raw)
-    for i in range(len(df_raw)):
-        if i < len(df_raw) and str(df_raw.iloc[i, 1]) == 'Products Rate':
-            reviews_end = i
-            break
-    
-    reviews_data = []
-    for i in range(3, reviews_end):
-        row = df_raw.iloc[i]
-        
-        # Branch (Anchor B/1)
-        branch = str(row[1]).strip() if pd.notna(row[1]) else ""
-        if not branch or branch in ['Branch', 'Vendor ID', 'None', 'nan']: continue
-        if any(kw in branch for kw in ['Vendor', 'Page']): continue
-
-        # Rating (Anchor O/14)
-        try:
-            rating = float(row[14]) if pd.notna(row[14]) else None
-        except:
-            rating = None
-        
-        # Full Timestamp (Column M / Index 12) - "Order Created At"
-        # This contains the '26/12/2025 18:37:39' format
-        timestamp_data = row[12] if pd.notna(row[12]) else None
-
-        # Comments (Anchor U/20 and Y/24)
-        comment = str(row[20]).strip() if pd.notna(row[20]) else ""
-        deliv_comment = str(row[24]).strip() if pd.notna(row[24]) else ""
-        full_comment = f"{comment} | {deliv_comment}".strip(" |")
-        
-        record = {
-            COLS['CREATED_AT']: timestamp_data,
-            COLS['BRANCH']: branch,
-            COLS['RATING']: rating,
-            COLS['NPS']: None,       # Ignored
-            COLS['WEAKNESS']: None,  # Ignored for Pareto
-            COLS['STRENGTH']: None,  # Ignored for Kano
-            COLS['ORDER_ITEMS']: str(row[28]) if pd.notna(row[28]) else "",
-            COLS['DATE']: timestamp_data,
-            COLS['COMMENT']: full_comment if full_comment else None,
-            'order_code': row[9],
-            'customer_name': str(row[3]).strip() if pd.notna(row[3]) else "Unknown"
-        }
-        reviews_data.append(record)
-    
-    # 4. Final Processing
-    df = pd.DataFrame(reviews_data)
-    
-    # Clean up dates immediately
-    if not df.empty:
-        # Convert the standardized column to datetime
-        df[COLS['CREATED_AT']] = pd.to_datetime(df[COLS['CREATED_AT']], dayfirst=True, errors='coerce')
-    
-    return df
-
-def detect_file_format(uploaded_file):
-    """Detect if file is SnappFood format or original format"""
-    try:
-        xl = pd.ExcelFile(uploaded_file)
-        sheets = xl.sheet_names
-        
-        # SnappFood format has these sheets
-        if 'Reviews' in sheets and 'Overview' in sheets:
-            return 'snappfood'
-        
-        # Check for original format columns
-        df_check = pd.read_excel(uploaded_file, nrows=3)
-        cols = [str(c) for c in df_check.columns]
-        
-        if any('شعبه' in c for c in cols) or any('میزان رضایت' in c for c in cols):
-            return 'original'
-        
-        return 'original'  # Default
-    except:
-        return 'original'
-
 def get_metric_html(label, value, icon, color="black"):
     # Detect direction for RTL support
     direction = "rtl" if st.session_state.lang == 'fa' else "ltr"
@@ -629,19 +546,13 @@ def get_metric_html(label, value, icon, color="black"):
     """
 def L(key): return LABELS[st.session_state.lang].get(key, key)
 
-def load_data(file):
-    try:
-        if isinstance(file, str):
-            return pd.read_csv(file) if file.endswith('.csv') else pd.read_excel(file)
-        return pd.read_csv(file) if file.name.endswith('.csv') else pd.read_excel(file)
-    except Exception as e:
-        st.error(f"Error: {e}")
-        return None
-
 # Session State
 if 'lang' not in st.session_state: st.session_state.lang = 'en'
 if 'df' not in st.session_state: st.session_state.df = None
 if 'analyzer' not in st.session_state: st.session_state.analyzer = None
+if 'profiler' not in st.session_state:
+    st.session_state.profiler = Profiler(enabled=PROFILE_ENABLED or st.query_params.get('perf') == '1')
+profiler = st.session_state.profiler
 
 # ==========================================
 # 4. TOP NAVIGATION BAR
@@ -716,6 +627,34 @@ if st.session_state.df is None:
 # ==========================================
 # 5. DATA SETTINGS EXPANDER (Hidden by default)
 # ==========================================
+shared_cache = get_shared_cache()
+# The review history is only kept when WAREHOUSE_ENABLED is set (it stores customer reviews on disk)
+warehouse = get_warehouse() if WAREHOUSE_ENABLED else None
+
+
+def load_data_file(file_path):
+    """Parse a file from DATA_DIR and prepare it like an upload. Returns (df, file_format)."""
+    result = load_and_store([file_path])[0]
+    if isinstance(result, Exception):
+        raise result
+    df, file_format = result
+    if df is not None:
+        df = optimize_dtypes(exclude_branches(df))
+    return df, file_format
+
+
+def set_dataset(df, dataset_key):
+    """Make df the session's dataset; the analyzer is rebuilt only when the data changed.
+
+    Analyzer results go to the shared cache under the dataset key, so sessions
+    viewing the same files compute each result once.
+    """
+    st.session_state.df = df
+    if st.session_state.get('dataset_key') != dataset_key or st.session_state.analyzer is None:
+        st.session_state.analyzer = memoize(ShilaAnalyzer(df, COLS, copy=False),
+                                            cache=shared_cache, namespace=('analyzer', dataset_key))
+        st.session_state.dataset_key = dataset_key
+
 # The "Filter" button that drops down options
 with st.expander("📂 **Data Source & Settings**", expanded=(st.session_state.df is None)):
     c_upload, c_select = st.columns(2)
@@ -731,69 +670,77 @@ with st.expander("📂 **Data Source & Settings**", expanded=(st.session_state.d
     with c_select:
         existing = [f for f in os.listdir(DATA_DIR) if f.endswith(('.csv', '.xlsx'))] if os.path.exists(DATA_DIR) else []
         selected_file = st.selectbox(L('or_select'), [''] + existing) if existing else None
+
+        # Every loaded file is also kept in the review warehouse, if enabled (see warehouse.py)
+        history = warehouse.stats() if warehouse is not None else {'reviews': 0}
+        history_range = None
+        if history['reviews'] and st.checkbox(L('use_history').format(n=history['reviews'], first=history['first_date'],
+                                                                      last=history['last_date']), key='use_history'):
+            first, last = pd.Timestamp(history['first_date']).date(), pd.Timestamp(history['last_date']).date()
+            picked = st.date_input(L('date_range'), value=(first, last), min_value=first, max_value=last, key='history_range')
+            # The picker returns a single date until the end of the range is chosen
+            history_range = (picked[0], picked[-1]) if isinstance(picked, (list, tuple)) and picked else (first, last)
     
     # Logic to load data - WITH FORMAT DETECTION
+    # Parsed files are shared by every session through the process-wide cache (keyed by file contents)
+    # New files are parsed in parallel; one unreadable file is skipped without stopping the rest
     if uploaded_files:
-        all_dfs = []
-        is_any_snappfood = False
-        for file in uploaded_files:
-            file_format = detect_file_format(file)
-        
-            if file_format == 'snappfood':
-                is_any_snappfood = True
-                temp_df = load_snappfood_file(file)
+        dataset_key = ('upload', content_digest(uploaded_files))
+        progress_slot = st.empty()
+
+        def load_uploads(files):
+            """(df, is_snappfood, failed): the files that could not be read are cached with
+            the dataset, so they are reported on every upload of this set"""
+            failed = []
+
+            def show_progress(done, total, name, error):
+                progress_slot.progress(done / total, text=f"📄 {name} ({done}/{total})")
+                if error is not None:
+                    failed.append(f"{name}: {error}")
+
+            df, is_snappfood = load_files(files, loader=load_and_store, progress=show_progress)
+            return df, is_snappfood, failed
+
+        df, is_any_snappfood, failed = shared_cache.get_or_compute(dataset_key, lambda: load_uploads(uploaded_files))
+        progress_slot.empty()
+        for message in failed:
+            st.warning(f"⚠️ Skipped {message}")
         
-            else:
-                temp_df = load_data(file)
-                
-            if temp_df is not None:
-                all_dfs.append(temp_df)
-            
-        if all_dfs:
-            # STEP 2: Combine all daily files into one master DataFrame
-            df = pd.concat(all_dfs, ignore_index=True)
+        if df is not None:
             st.session_state.is_snappfood = is_any_snappfood
-            
-            # STEP 3: Remove duplicate orders (safety check for overlapping files)
-            if 'order_code' in df.columns:
-                df = df.drop_duplicates(subset=['order_code'])
-            
-            # STEP 4: Global Keyword Filter (Pulling from config.py)
-            from config import EXCLUDE_BRANCHES 
-            if not df.empty and COLS['BRANCH'] in df.columns:
-                pattern = '|'.join(EXCLUDE_BRANCHES)
-                mask = df[COLS['BRANCH']].str.contains(pattern, case=False, na=False)
-                df = df[~mask]
-            
-            # STEP 5: Finalize Session State
-            st.session_state.df = df
-            st.session_state.analyzer = ShilaAnalyzer(df, COLS)
-            st.success(f"✅ Loaded {len(uploaded_files)} files! Total rows: {len(df):,}")
+            set_dataset(df, dataset_key)
+            st.success(f"✅ Loaded {len(uploaded_files) - len(failed)} files! Total rows: {len(df):,}")
+        else:
+            st.error("Error: none of the uploaded files could be read")
             
     elif selected_file:
         file_path = os.path.join(DATA_DIR, selected_file)
-        file_format = detect_file_format(file_path)
-        
-        if file_format == 'snappfood':
-            st.success("✅ SnappFood format detected")
-            st.session_state.is_snappfood = True
-            df = load_snappfood_file(file_path)
-        else:
-            st.success("✅ Original format detected")
-            st.session_state.is_snappfood = False
-            df = load_data(file_path)
+        try:
+            dataset_key = ('file', content_digest(file_path))
+            df, file_format = shared_cache.get_or_compute(dataset_key, lambda: load_data_file(file_path))
+        except Exception as e:
+            st.error(f"Error: {e}")
+            df, file_format = None, None
         
         if df is not None:
-            # Pull keywords from config
-            from config import EXCLUDE_BRANCHES 
-            if not df.empty and COLS['BRANCH'] in df.columns:
-                # Join keywords into a regex pattern (e.g., "کیک خونه|کشمون|")
-                pattern = '|'.join(EXCLUDE_BRANCHES)
-                mask = df[COLS['BRANCH']].str.contains(pattern, case=False, na=False)
-                df = df[~mask]
-                
-            st.session_state.df = df
-            st.session_state.analyzer = ShilaAnalyzer(df, COLS)
+            if file_format == 'snappfood':
+                st.success("✅ SnappFood format detected")
+            else:
+                st.success("✅ Original format detected")
+            st.session_state.is_snappfood = file_format == 'snappfood'
+            set_dataset(df, dataset_key)
+
+    elif history_range:
+        start, end = history_range
+        dataset_key = ('warehouse', warehouse.version(), start, end)
+        df = shared_cache.get_or_compute(dataset_key, lambda: warehouse.query(start, end))
+
+        if df is not None:
+            st.session_state.is_snappfood = is_snappfood_frame(df)
+            set_dataset(df, dataset_key)
+            st.success(f"✅ Loaded {len(df):,} reviews from history ({start} – {end})")
+        else:
+            st.warning("No stored reviews in this date range")
 
 if st.session_state.analyzer is None:
     st.info("👋 Please upload data or select a file from the settings menu above to begin.")
@@ -802,7 +749,7 @@ if st.session_state.analyzer is None:
 # ==========================================
 # 6. METRIC CARDS
 # ==========================================
-analyzer = st.session_state.analyzer
+analyzer = profiler.instrument(memoize(st.session_state.analyzer), 'analyzer')
 kpis = analyzer.get_kpis()
 
 st.markdown(f"### {L('kpi_section')}")
@@ -832,24 +779,6 @@ st.markdown("<br>", unsafe_allow_html=True)
 # ==========================================
 # 7. MAIN TABS (Complete Content)
 # ==========================================
-# --- TAB DEFINITIONS ---
-# Define base tabs available for everyone
-main_tabs = [L('tab_overview')]
-
-# Only add NPS/Tag dependent tabs if it's NOT SnappFood
-if not st.session_state.get('is_snappfood', False):
-    main_tabs.append(L('tab_pareto'))
-    main_tabs.append(L('tab_kano'))
-
-main_tabs.extend([L('tab_branches'), L('tab_aspects'), L('tab_trends'), L('tab_ai')])
-main_tabs.extend(["🍔 Products", "📝 Text Mining", "🤖 Machine Learning"])
-
-# Create the tabs object
-tabs = st.tabs(main_tabs)
-
-# Define a counter to track the current index
-t = 0
-
 # Helper to clean up chart look
 def clean_chart(fig, height=400):
     fig.update_layout(
@@ -863,8 +792,12 @@ def clean_chart(fig, height=400):
     )
     return fig
 
+# Widgets inside a fragment rerun only that function, not the whole page (Streamlit >= 1.37;
+# older versions rerun everything)
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
 # TAB 1: OVERVIEW
-with tabs[t]:
+def render_overview_tab():
     st.markdown("<br>", unsafe_allow_html=True)
     c1, c2 = st.columns(2)
     
@@ -1070,93 +1003,84 @@ with tabs[t]:
                 </div>
                 """, unsafe_allow_html=True)
 
-# Increment tab counter for next tab
-t += 1
 
 # TAB 2: PARETO ANALYSIS
-if not st.session_state.get('is_snappfood', False):
-    with tabs[t]:
-        st.markdown("<br>", unsafe_allow_html=True)
-        st.markdown(f"### {L('issues_by_damage')}")
-        st.caption("Which issues are hurting your star rating the most?")
+def render_pareto_tab():
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown(f"### {L('issues_by_damage')}")
+    st.caption("Which issues are hurting your star rating the most?")
     
-        pareto = analyzer.get_pareto_analysis()
-        if len(pareto) > 0:
-            fig = make_subplots(specs=[[{"secondary_y": True}]])
-        
-            # Bar Chart (Damage)
-            fig.add_trace(go.Bar(
-                x=pareto['tag'].head(15), 
-                y=pareto['total_damage'].head(15), 
-                name='Impact Score', 
-                marker_color='#D32F2F', 
-                opacity=0.85
-            ), secondary_y=False)
+    pareto = analyzer.get_pareto_analysis()
+    if len(pareto) > 0:
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
         
-            # Line Chart (Cumulative %)
-            fig.add_trace(go.Scatter(
-                x=pareto['tag'].head(15), 
-                y=pareto['cumulative_pct'].head(15), 
-                name='Cumulative %', 
-                mode='lines+markers', 
-                line=dict(color='#1A1F36', width=2),
-                marker=dict(size=6)
-            ), secondary_y=True)
-        
-            # The 80% Rule Line
-            fig.add_hline(y=80, line_dash="dash", line_color="#4CAF50", secondary_y=True, annotation_text="80% Cutoff")
-        
-            fig = clean_chart(fig, 500)
-            fig.update_layout(xaxis_tickangle=-45, legend=dict(orientation="h", y=1.1))
-            st.plotly_chart(fig, width='stretch')
+        # Bar Chart (Damage)
+        fig.add_trace(go.Bar(
+            x=pareto['tag'].head(15), 
+            y=pareto['total_damage'].head(15), 
+            name='Impact Score', 
+            marker_color='#D32F2F', 
+            opacity=0.85
+        ), secondary_y=False)
+        
+        # Line Chart (Cumulative %)
+        fig.add_trace(go.Scatter(
+            x=pareto['tag'].head(15), 
+            y=pareto['cumulative_pct'].head(15), 
+            name='Cumulative %', 
+            mode='lines+markers', 
+            line=dict(color='#1A1F36', width=2),
+            marker=dict(size=6)
+        ), secondary_y=True)
+        
+        # The 80% Rule Line
+        fig.add_hline(y=80, line_dash="dash", line_color="#4CAF50", secondary_y=True, annotation_text="80% Cutoff")
+        
+        fig = clean_chart(fig, 500)
+        fig.update_layout(xaxis_tickangle=-45, legend=dict(orientation="h", y=1.1))
+        st.plotly_chart(fig, width='stretch')
             
-            with st.expander("View Detailed Data Table"):
-                st.dataframe(pareto.head(20), width='stretch', hide_index=True)
-        else:
-            st.info("Not enough issue data to generate Pareto analysis.")
+        with st.expander("View Detailed Data Table"):
+            st.dataframe(pareto.head(20), width='stretch', hide_index=True)
+    else:
+        st.info("Not enough issue data to generate Pareto analysis.")
             
-    # CRITICAL: Increment the counter only inside the IF block 
-    # because the tab only exists in the list for standard files.
-    t += 1
 
 # TAB: KANO MODEL
-if not st.session_state.get('is_snappfood', False):
-    with tabs[t]:
-        st.markdown("<br>", unsafe_allow_html=True)
-        st.markdown(f"### {L('kano_classification')}")
-        st.caption("Classifying features into Must-Be, Performance, and Delighters based on customer feedback.")
-    
-        kano = analyzer.get_kano_analysis()
-        if len(kano) > 0:
-            fig = px.scatter(
-                kano, 
-                x='lift_as_strength', 
-                y='drop_as_weakness', 
-                color='kano_type', 
-                hover_name='attribute', 
-                size='strength_mentions', 
-                size_max=40,
-                color_discrete_map={'Must-Be':'#D32F2F', 'Performance':'#FFB020', 'Delighter':'#4CAF50'}
-            )
+def render_kano_tab():
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown(f"### {L('kano_classification')}")
+    st.caption("Classifying features into Must-Be, Performance, and Delighters based on customer feedback.")
+    
+    kano = analyzer.get_kano_analysis()
+    if len(kano) > 0:
+        fig = px.scatter(
+            kano, 
+            x='lift_as_strength', 
+            y='drop_as_weakness', 
+            color='kano_type', 
+            hover_name='attribute', 
+            size='strength_mentions', 
+            size_max=40,
+            color_discrete_map={'Must-Be':'#D32F2F', 'Performance':'#FFB020', 'Delighter':'#4CAF50'}
+        )
         
-            # Quadrant Lines
-            fig.add_hline(y=0.5, line_dash="dot", line_color="#E1E4E8")
-            fig.add_vline(x=0.3, line_dash="dot", line_color="#E1E4E8")
+        # Quadrant Lines
+        fig.add_hline(y=0.5, line_dash="dot", line_color="#E1E4E8")
+        fig.add_vline(x=0.3, line_dash="dot", line_color="#E1E4E8")
             
-            # Labels for Quadrants
-            fig.add_annotation(x=0.8, y=0.1, text="Delighters (Unique)", showarrow=False, font=dict(color="green"))
-            fig.add_annotation(x=0.1, y=0.9, text="Must-Be (Critical)", showarrow=False, font=dict(color="red"))
+        # Labels for Quadrants
+        fig.add_annotation(x=0.8, y=0.1, text="Delighters (Unique)", showarrow=False, font=dict(color="green"))
+        fig.add_annotation(x=0.1, y=0.9, text="Must-Be (Critical)", showarrow=False, font=dict(color="red"))
             
-            st.plotly_chart(clean_chart(fig, 500), width='stretch')
+        st.plotly_chart(clean_chart(fig, 500), width='stretch')
 
-        else:
-            st.info("Not enough strength/weakness data to generate Kano classification.")
+    else:
+        st.info("Not enough strength/weakness data to generate Kano classification.")
 
-    # Increment counter only if we actually processed this tab
-    t += 1
 
 # TAB: BRANCH COMPARISON
-with tabs[t]:
+def render_branches_tab():
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown(f"### {L('branch_comparison')}")
     
@@ -1342,10 +1266,9 @@ with tabs[t]:
     else:
         st.info("No product data available for this selection. Check if 'نام محصولات سفارشی' is in your file.")
 
-t += 1
 
 ## TAB: ASPECT SENTIMENT
-with tabs[t]:
+def render_aspects_tab():
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown(f"### {L('aspect_sentiment')}")
     
@@ -1368,11 +1291,25 @@ with tabs[t]:
         # Fallback if no comments or keywords were found
         st.info("💡 Not enough comment data found to perform aspect-based sentiment analysis.")
 
-# Increment tab counter for next tab
-t += 1
+
+@fragment
+def render_low_rating_hour_drilldown(low_comments):
+    """Hour slider + the low-rating comments of that hour (reruns on its own)"""
+    selected_hour = st.select_slider(
+        "Select an hour to read comments:",
+        options=sorted(low_comments['hour'].unique()),
+        format_func=lambda x: f"{int(x):02d}:00"
+    )
+
+    hour_filtered = low_comments[low_comments['hour'] == selected_hour]
+    for _, row in hour_filtered.iterrows():
+        with st.chat_message("user", avatar="🚨"):
+            st.write(f"**Rating: {int(row[analyzer.cols.get('RATING')])}** | Branch: {row[analyzer.cols.get('BRANCH')]}")
+            st.info(row[analyzer.cols.get('COMMENT')])
+
 
 # TAB: TRENDS
-with tabs[t]:
+def render_trends_tab():
     st.markdown("<br>", unsafe_allow_html=True)
     is_sf = st.session_state.get('is_snappfood', False)
     low_comments = pd.DataFrame()
@@ -1601,18 +1538,7 @@ with tabs[t]:
             
             st.markdown("---")
             st.write("💬 **Drill Down: Read specific complaints by hour**")
-        
-            selected_hour = st.select_slider(
-                "Select an hour to read comments:",
-                options=sorted(low_comments['hour'].unique()),
-                format_func=lambda x: f"{int(x):02d}:00"
-            )
-        
-            hour_filtered = low_comments[low_comments['hour'] == selected_hour]
-            for _, row in hour_filtered.iterrows():
-                with st.chat_message("user", avatar="🚨"):
-                    st.write(f"**Rating: {int(row[analyzer.cols.get('RATING')])}** | Branch: {row[analyzer.cols.get('BRANCH')]}")
-                    st.info(row[analyzer.cols.get('COMMENT')])
+            render_low_rating_hour_drilldown(low_comments)
         else:
             st.success("🌟 Incredible! No 1-3 star ratings found in this week's data.")
 
@@ -1642,11 +1568,9 @@ with tabs[t]:
         else:
             st.success(f"No data found for {view_type}.")
         
-# Increment main tab counter
-t += 1
 
 # TAB: AI INSIGHTS
-with tabs[t]:
+def render_ai_tab():
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown(f"## 🤖 {L('ai_title')}")
     
@@ -1692,10 +1616,9 @@ with tabs[t]:
                     else:
                         st.error(result.get('error'))
 
-t += 1
 
 # TAB: PRODUCTS
-with tabs[t]:  # Index 1 for Products
+def render_products_tab():
     st.markdown("<br>", unsafe_allow_html=True)
     
     c1, c2 = st.columns(2)
@@ -1748,11 +1671,9 @@ with tabs[t]:  # Index 1 for Products
             """)
             st.info("Check the **Aspect Sentiment** tab for text-based insights into product and service quality.")
 
-# Increment tab counter
-t += 1
 
 # TAB : TEXT MINING
-with tabs[t]:  # Adjust index as needed
+def render_text_mining_tab():
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown("### 📝 Text Mining Analysis")
     st.caption("Deep analysis of customer comments and feedback")
@@ -1770,95 +1691,34 @@ with tabs[t]:  # Adjust index as needed
         word_freq = analyzer.get_word_frequency(min_freq=5, top_n=100)
 
         if word_freq:
-            try:
-                from wordcloud import WordCloud
-                import arabic_reshaper
-                from bidi.algorithm import get_display
-                import matplotlib.pyplot as plt
-                import os
-                import platform
-        
-                # Reshape Persian text for correct display
-                reshaped_freq = {}
-                for word, freq in word_freq.items():
-                    try:
-                        reshaped = arabic_reshaper.reshape(word)
-                        bidi_text = get_display(reshaped)
-                        reshaped_freq[bidi_text] = freq
-                    except:
-                        reshaped_freq[word] = freq
-        
-                # Find appropriate font based on OS
-                font_path = None
-        
-                if platform.system() == 'Windows':
-                    # Windows fonts that support Persian/Arabic
-                    possible_fonts = [
-                        'C:/Windows/Fonts/Vazirmatn-Regular.ttf',
-                        'C:/Windows/Fonts/tahoma.ttf',       # Tahoma (best for Persian)
-                        'C:/Windows/Fonts/arial.ttf',        # Arial
-                        'C:/Windows/Fonts/segoeui.ttf',      # Segoe UI
-                        'C:/Windows/Fonts/times.ttf',        # Times New Roman
-                        'C:/Windows/Fonts/calibri.ttf',      # Calibri
-                    ]
-                elif platform.system() == 'Darwin':  # macOS
-                    possible_fonts = [
-                        '/Library/Fonts/Arial.ttf',
-                        '/System/Library/Fonts/Helvetica.ttc',
-                    ]
-                else:  # Linux
-                    possible_fonts = [
-                        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                        '/usr/share/fonts/truetype/freefont/FreeSans.ttf',
-                        '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
-                    ]
-        
-                # Find first available font
-                for font in possible_fonts:
-                    if os.path.exists(font):
-                        font_path = font
-                        break
-        
-                if font_path is None:
-                    # Use default (may not support Persian well)
-                    st.warning("⚠️ No suitable font found. Persian text may not display correctly.")
-                    font_path = None
+            with profiler.section('render:wordcloud'):
+                try:
+                    from word_cloud import find_font, render_word_cloud
                     
-                # Generate word cloud
-                wc = WordCloud(
-                    font_path=font_path,
-                    width=800, 
-                    height=400,
-                    background_color='white',
-                    colormap='viridis',
-                    max_words=100,
-                    prefer_horizontal=0.7,
-                    min_font_size=10
-                    ).generate_from_frequencies(reshaped_freq)
-                
-                fig_wc, ax = plt.subplots(figsize=(12, 6))
-                ax.imshow(wc, interpolation='bilinear')
-                ax.axis('off')
-                st.pyplot(fig_wc)
-                plt.close()
+                    # Font lookup, reshaping and the rendered PNG are cached per process
+                    if find_font() is None:
+                        # Use default (may not support Persian well)
+                        st.warning("⚠️ No suitable font found. Persian text may not display correctly.")
+                    
+                    st.image(render_word_cloud(word_freq), width='stretch')
                 
-            except Exception as e:
-                # Fallback: show as bar chart
-                st.info(f"📊 Showing word frequency as bar chart")
+                except Exception as e:
+                    # Fallback: show as bar chart
+                    st.info(f"📊 Showing word frequency as bar chart")
                 
-                df_words = pd.DataFrame([
-                    {'word': k, 'count': v} for k, v in list(word_freq.items())[:30]
-                ])
-                df_words = df_words.sort_values('count', ascending=True)
+                    df_words = pd.DataFrame([
+                        {'word': k, 'count': v} for k, v in list(word_freq.items())[:30]
+                    ])
+                    df_words = df_words.sort_values('count', ascending=True)
         
-                fig_words = px.bar(
-                    df_words, y='word', x='count',
-                    orientation='h',
-                    color='count',
-                    color_continuous_scale=['#FFC107', '#4CAF50']
-                    )
-                fig_words.update_layout(height=600, showlegend=False)
-                st.plotly_chart(fig_words, width='stretch')
+                    fig_words = px.bar(
+                        df_words, y='word', x='count',
+                        orientation='h',
+                        color='count',
+                        color_continuous_scale=['#FFC107', '#4CAF50']
+                        )
+                    fig_words.update_layout(height=600, showlegend=False)
+                    st.plotly_chart(fig_words, width='stretch')
     
             # Show top words table
             with st.expander("📋 View Top 50 Words"):
@@ -1971,7 +1831,17 @@ with tabs[t]:  # Adjust index as needed
         st.markdown("#### 🏷️ Topic Discovery")
         st.caption("Main themes found in customer comments")
         
-        topics = analyzer.get_topic_keywords(n_topics=5, n_words=10)
+        topic_methods = {"Seed topics": 'seed', "NMF": 'nmf', "LDA": 'lda'}
+        topic_method = st.radio(
+            "Topic model:",
+            list(topic_methods),
+            horizontal=True,
+            key="topic_method",
+            help="Seed topics use fixed keyword lists; NMF / LDA learn topics from the comments"
+        )
+        topic_method = topic_methods[topic_method]
+        
+        topics = analyzer.get_topic_keywords(n_topics=5, n_words=10, method=topic_method)
         
         if topics:
             cols_topic = st.columns(len(topics))
@@ -1991,6 +1861,17 @@ with tabs[t]:  # Adjust index as needed
                         </small>
                     </div>
                     """, unsafe_allow_html=True)
+            
+            if topic_method != 'seed':
+                with st.expander("🔎 Comments by topic"):
+                    comment_topics = analyzer.get_comment_topics(n_topics=5, method=topic_method)
+                    if not comment_topics.empty:
+                        selected_topic = st.selectbox("Topic:", list(comment_topics['topic'].cat.categories))
+                        in_topic = comment_topics[comment_topics['topic'] == selected_topic]
+                        st.dataframe(
+                            in_topic.sort_values('weight', ascending=False).iloc[:, :3].head(50),
+                            width='stretch', hide_index=True
+                        )
         else:
             st.info("Not enough data for topic discovery")
         
@@ -2069,18 +1950,413 @@ with tabs[t]:  # Adjust index as needed
     else:
         st.warning("⚠️ No text/comment column found in your data. Text mining requires customer comments.")
         st.info("Expected column names: 'لطفا نظر و انتفادات خود را برای ما بنویسید', 'نظر', 'توضیحات', 'comment'")
-# CRITICAL: Increment the index for the next tab
-t += 1
+
+# --- ML SUB-TABS (fragments: their sliders and buttons rerun only the sub-tab) ---
+# Model methods whose results are cached per parameter set (moving a slider back costs nothing)
+ML_MEMOIZED = ('train_', 'perform_clustering', 'get_association_rules', 'detect_anomalies')
+
+
+def get_ml_analyzer():
+    """ML analyzer of the current dataset, shared by the sessions viewing it (trained models are reused);
+    model results are memoized per parameter set"""
+    ml_state = st.session_state.get('ml_state')
+    if ml_state is None or ml_state['source'] is not st.session_state.analyzer:
+        from ml_analyzer import ShilaMLAnalyzer
+        dataset_key = st.session_state.get('dataset_key')
+        if dataset_key is None:
+            ml_analyzer = memoize(ShilaMLAnalyzer(st.session_state.df, COLS, copy=False), ML_MEMOIZED)
+        else:
+            # Results are namespaced per instance: if the instance is evicted, its results
+            # (which have no fitted models behind them) are never served to its successor
+            key = ('ml', dataset_key)
+            ml_analyzer = shared_cache.get_or_compute(key, lambda: memoize(
+                ShilaMLAnalyzer(st.session_state.df, COLS, copy=False), ML_MEMOIZED,
+                cache=shared_cache, namespace=key + (uuid.uuid4().hex,)))
+        ml_state = st.session_state.ml_state = {'source': st.session_state.analyzer, 'ml': ml_analyzer, 'shown': set()}
+    return ml_state['ml']
+
+
+def show_ml_results(key, clicked):
+    """True once the button `key` was clicked for this dataset, so results stay up while sliders change"""
+    shown = st.session_state.ml_state['shown']
+    if clicked:
+        shown.add(key)
+    return key in shown
+
+
+@fragment
+def render_ml_detractor(ml_analyzer):
+    st.markdown("#### 🎯 Predict Potential Detractors")
+    st.caption("Identify customers likely to give low NPS scores before they do")
+
+    if show_ml_results("train_detractor", st.button("🚀 Train Detractor Model", key="train_detractor")):
+        with st.spinner("Training model..."):
+            results = ml_analyzer.train_detractor_model()
+
+        if 'error' in results:
+            st.error(results['error'])
+        else:
+            # Model Performance
+            st.markdown("##### 📊 Model Performance")
+
+            col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+            with col_m1:
+                st.metric("Accuracy", f"{results['accuracy']*100:.1f}%")
+            with col_m2:
+                st.metric("Precision", f"{results['precision']*100:.1f}%")
+            with col_m3:
+                st.metric("Recall", f"{results['recall']*100:.1f}%")
+            with col_m4:
+                st.metric("F1 Score", f"{results['f1_score']*100:.1f}%")
+
+            st.markdown("---")
+
+            col_conf, col_feat = st.columns(2)
+
+            with col_conf:
+                st.markdown("##### 🔢 Confusion Matrix")
+                cm = results['confusion_matrix']
+
+                fig_cm = go.Figure(data=go.Heatmap(
+                    z=cm,
+                    x=['Predicted: Not Detractor', 'Predicted: Detractor'],
+                    y=['Actual: Not Detractor', 'Actual: Detractor'],
+                    text=cm,
+                    texttemplate='%{text}',
+                    colorscale=['#E8F5E9', '#4CAF50'],
+                    showscale=False
+                ))
+                fig_cm.update_layout(height=300, margin=dict(l=10, r=10, t=30, b=10))
+                st.plotly_chart(fig_cm, width='stretch')
+
+            with col_feat:
+                st.markdown("##### 📈 Feature Importance")
+
+                importance_df = pd.DataFrame(results['feature_importance'])
+
+                fig_imp = px.bar(
+                    importance_df.head(10).sort_values('importance'),
+                    y='feature', x='importance',
+                    orientation='h',
+                    color='importance',
+                    color_continuous_scale=['#FFC107', '#4CAF50']
+                )
+                fig_imp.update_layout(height=300, showlegend=False, margin=dict(l=10, r=10, t=30, b=10))
+                st.plotly_chart(fig_imp, width='stretch')
+
+                st.success(f"✅ Model trained! Detractor rate: {results['detractor_rate']}%")
+
+        st.markdown("---")
+
+        # High Risk Customers
+        st.markdown("##### 🚨 High Risk Customers")
+
+        if show_ml_results("find_risk", st.button("🔍 Find High Risk Customers", key="find_risk")):
+            with st.spinner("Analyzing..."):
+                high_risk = ml_analyzer.predict_detractor_risk(top_n=50)
+
+            if len(high_risk) > 0:
+                # Risk distribution
+                risk_counts = high_risk['risk_level'].value_counts()
+
+                col_r1, col_r2, col_r3 = st.columns(3)
+                with col_r1:
+                    high_count = risk_counts.get('High', 0)
+                    st.metric("🔴 High Risk", high_count)
+                with col_r2:
+                    med_count = risk_counts.get('Medium', 0)
+                    st.metric("🟠 Medium Risk", med_count)
+                with col_r3:
+                    low_count = risk_counts.get('Low', 0)
+                    st.metric("🟢 Low Risk", low_count)
+
+                st.dataframe(high_risk, width='stretch', hide_index=True)
+            else:
+                st.info("No risk data available")
+
+
+@fragment
+def render_ml_clustering(ml_analyzer):
+    st.markdown("#### 👥 Customer Clustering")
+    st.caption("Discover natural customer segments using K-Means clustering")
+
+    n_clusters = st.slider("Number of Clusters", 2, 8, 5)
+
+    if show_ml_results("run_cluster", st.button("🔬 Perform Clustering", key="run_cluster")):
+        with st.spinner("Clustering customers..."):
+            cluster_results = ml_analyzer.perform_clustering(n_clusters=n_clusters)
+
+        if 'error' in cluster_results:
+            st.error(cluster_results['error'])
+        else:
+            # Cluster Stats
+            st.markdown("##### 📊 Cluster Profiles")
+
+            cluster_df = pd.DataFrame(cluster_results['cluster_stats'])
+
+            # Display as cards
+            cols = st.columns(len(cluster_df))
+
+            cluster_colors = ['#4CAF50', '#8BC34A', '#FFC107', '#FF9800', '#F44336', '#9C27B0', '#2196F3', '#00BCD4']
+
+            for i, (_, row) in enumerate(cluster_df.iterrows()):
+                with cols[i]:
+                    color = cluster_colors[i % len(cluster_colors)]
+                    st.markdown(f"""
+                    <div style="background-color:{color}; padding:15px; border-radius:10px; text-align:center; color:white;">
+                        <b style="font-size:14px;">{row.get('cluster_name', f'Cluster {i}')}</b><br>
+                        <span style="font-size:24px;"><b>{row['size']:,}</b></span><br>
+                        <small>({row['percentage']}%)</small><br>
+                        <hr style="border-color:rgba(255,255,255,0.3);">
+                        <small>Rating: {row.get('avg_rating', 'N/A')}</small><br>
+                        <small>NPS: {row.get('avg_nps', 'N/A')}</small>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+            st.markdown("---")
+
+            col_elbow, col_pca = st.columns(2)
+
+            with col_elbow:
+                st.markdown("##### 📉 Elbow Method")
+                elbow = cluster_results['elbow_data']
+
+                fig_elbow = px.line(
+                    x=elbow['k'], y=elbow['inertia'],
+                    markers=True,
+                    labels={'x': 'Number of Clusters (K)', 'y': 'Inertia'}
+                )
+                fig_elbow.update_layout(height=300)
+                st.plotly_chart(fig_elbow, width='stretch')
+
+            with col_pca:
+                st.markdown("##### 🎯 Cluster Visualization (PCA)")
+                pca = cluster_results['pca_data']
+
+                fig_pca = px.scatter(
+                    x=pca['x'], y=pca['y'],
+                    color=[str(c) for c in pca['cluster']],
+                    labels={'x': 'PC1', 'y': 'PC2', 'color': 'Cluster'},
+                    color_discrete_sequence=cluster_colors
+                )
+                fig_pca.update_layout(height=300)
+                st.plotly_chart(fig_pca, width='stretch')
+
+            # Full stats table
+            with st.expander("📋 View Full Cluster Statistics"):
+                st.dataframe(cluster_df, width='stretch', hide_index=True)
+
+
+@fragment
+def render_ml_association(ml_analyzer, ml_summary):
+    st.markdown("#### 🔗 Association Rules")
+    st.caption("Discover which issues frequently occur together")
+
+    if not ml_summary.get('mlxtend_available', False):
+        st.warning("⚠️ mlxtend not installed. Run: `pip install mlxtend`")
+    else:
+        col_params1, col_params2 = st.columns(2)
+        with col_params1:
+            min_support = st.slider("Minimum Support", 0.005, 0.1, 0.01, 0.005)
+        with col_params2:
+            min_confidence = st.slider("Minimum Confidence", 0.1, 0.8, 0.3, 0.05)
+
+        if show_ml_results("find_rules", st.button("🔍 Find Association Rules", key="find_rules")):
+            with st.spinner("Mining rules..."):
+                rules_results = ml_analyzer.get_association_rules(
+                    min_support=min_support,
+                    min_confidence=min_confidence
+                )
+
+            if 'error' in rules_results:
+                st.error(rules_results['error'])
+            elif not rules_results.get('rules'):
+                st.info("No association rules found with the current thresholds. Try lowering Support or Confidence.")
+            else:
+                st.success(f"Found {len(rules_results['rules'])} rules from {rules_results['total_transactions']:,} transactions")
+
+                st.markdown("##### 📜 Top Association Rules")
+                st.caption("'If X, then Y' - What issues appear together")
+
+                for rule in rules_results['rules'][:10]:
+                    lift_color = '#4CAF50' if rule['lift'] > 1.5 else ('#FFC107' if rule['lift'] > 1 else '#9E9E9E')
+                    st.markdown(f"""
+                    <div style="background-color:#f5f5f5; padding:10px; border-radius:8px; margin:5px 0; border-left:4px solid {lift_color};">
+                        <b>IF</b> {rule['if']}<br>
+                        <b>THEN</b> {rule['then']}<br>
+                        <small style="color:#666;">
+                            Support: {rule['support']:.1%} | 
+                            Confidence: {rule['confidence']:.1%} | 
+                            Lift: <span style="color:{lift_color}; font-weight:bold;">{rule['lift']:.2f}</span>
+                        </small>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                st.markdown("---")
+
+                st.markdown("##### 📊 Frequent Issue Combinations")
+                itemsets_df = pd.DataFrame(rules_results['frequent_itemsets'])
+                if not itemsets_df.empty:
+                    st.dataframe(itemsets_df, width='stretch', hide_index=True)
+
+
+@fragment
+def render_ml_anomaly(ml_analyzer):
+    st.markdown("#### 🚨 Anomaly Detection")
+    st.caption("Find unusual patterns that may indicate fraud, errors, or system issues")
+
+    contamination = st.slider("Expected Anomaly Rate", 0.01, 0.15, 0.05, 0.01)
+
+    if show_ml_results("detect_anomaly", st.button("🔍 Detect Anomalies", key="detect_anomaly")):
+        with st.spinner("Analyzing patterns..."):
+            anomaly_results = ml_analyzer.detect_anomalies(contamination=contamination)
+
+        if 'error' in anomaly_results:
+            st.error(anomaly_results['error'])
+        else:
+            stats = anomaly_results['stats']
+
+            # Summary metrics
+            col_a1, col_a2, col_a3, col_a4 = st.columns(4)
+
+            with col_a1:
+                st.metric("🚨 Anomalies Found", stats['total_anomalies'])
+            with col_a2:
+                st.metric("📊 Anomaly Rate", f"{stats['anomaly_rate']}%")
+            with col_a3:
+                if 'anomaly_avg_rating' in stats:
+                    st.metric("⭐ Anomaly Avg Rating", stats['anomaly_avg_rating'])
+            with col_a4:
+                if 'normal_avg_rating' in stats:
+                    st.metric("⭐ Normal Avg Rating", stats['normal_avg_rating'])
+
+            st.markdown("---")
+
+            # Anomaly Types
+            if anomaly_results['anomaly_types']:
+                st.markdown("##### 🏷️ Anomaly Types Detected")
+
+                cols_type = st.columns(len(anomaly_results['anomaly_types']))
+
+                for i, atype in enumerate(anomaly_results['anomaly_types']):
+                    with cols_type[i]:
+                        st.markdown(f"""
+                        <div style="background-color:#FFF3E0; padding:15px; border-radius:10px; text-align:center; border:2px solid #FF9800;">
+                            <span style="font-size:28px;">{atype['icon']}</span><br>
+                            <b>{atype['type']}</b><br>
+                            <span style="font-size:24px; color:#FF9800;"><b>{atype['count']}</b></span><br>
+                            <small>{atype['description']}</small>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+            st.markdown("---")
+
+            # Top anomalies table
+            st.markdown("##### 📋 Top Anomalies to Review")
+            anomalies_df = pd.DataFrame(anomaly_results['top_anomalies'])
+
+            if not anomalies_df.empty:
+                st.dataframe(anomalies_df, width='stretch', hide_index=True)
+            else:
+                st.info("No specific anomaly records to display.")
+
+
+@fragment
+def render_ml_churn(ml_analyzer):
+    st.markdown("#### 📉 Churn Prediction")
+    st.caption("Predict which customers are likely to stop ordering")
+
+    st.info("💡 **Note:** True churn prediction requires repeat customer data (customer ID + order history). This model uses a proxy based on rating, NPS, and issues.")
+
+    if show_ml_results("train_churn", st.button("🚀 Train Churn Model", key="train_churn")):
+        with st.spinner("Training model..."):
+            churn_results = ml_analyzer.train_churn_model()
+
+        if 'error' in churn_results:
+            st.error(churn_results['error'])
+        else:
+            # Model Performance
+            st.markdown("##### 📊 Model Performance")
+
+            col_c1, col_c2, col_c3, col_c4 = st.columns(4)
+            with col_c1:
+                st.metric("Accuracy", f"{churn_results['accuracy']*100:.1f}%")
+            with col_c2:
+                st.metric("Precision", f"{churn_results['precision']*100:.1f}%")
+            with col_c3:
+                st.metric("Recall", f"{churn_results['recall']*100:.1f}%")
+            with col_c4:
+                st.metric("Churn Rate", f"{churn_results['churn_rate']}%")
+
+            st.markdown("---")
+
+            col_cm, col_fi = st.columns(2)
+
+            with col_cm:
+                st.markdown("##### 🔢 Confusion Matrix")
+                cm = churn_results['confusion_matrix']
+
+                fig_cm = go.Figure(data=go.Heatmap(
+                    z=cm,
+                    x=['Stay', 'Churn'],
+                    y=['Actual: Stay', 'Actual: Churn'],
+                    text=cm,
+                    texttemplate='%{text}',
+                    colorscale=['#E3F2FD', '#2196F3'],
+                    showscale=False
+                ))
+                fig_cm.update_layout(height=300, margin=dict(l=10, r=10, t=30, b=10))
+                st.plotly_chart(fig_cm, width='stretch')
+
+                with col_fi:
+                    st.markdown("##### 📈 Feature Importance")
+
+                    importance_df = pd.DataFrame(churn_results['feature_importance'])
+
+                    fig_imp = px.bar(
+                        importance_df.sort_values('importance'),
+                        y='feature', x='importance',
+                        orientation='h',
+                        color='importance',
+                        color_continuous_scale=['#BBDEFB', '#2196F3']
+                    )
+                    fig_imp.update_layout(height=300, showlegend=False, margin=dict(l=10, r=10, t=30, b=10))
+                    st.plotly_chart(fig_imp, width='stretch')
+
+        st.markdown("---")
+
+        # High Churn Risk
+        st.markdown("##### 📉 High Churn Risk Customers")
+
+        if show_ml_results("find_churn", st.button("🔍 Find Churn Risk Customers", key="find_churn")):
+            with st.spinner("Analyzing..."):
+                churn_risk = ml_analyzer.predict_churn_risk(top_n=50)
+
+            if len(churn_risk) > 0:
+                risk_counts = churn_risk['churn_level'].value_counts()
+
+                col_cr1, col_cr2, col_cr3 = st.columns(3)
+                with col_cr1:
+                    st.metric("🔴 High Churn Risk", risk_counts.get('High', 0))
+                with col_cr2:
+                    st.metric("🟠 Medium Risk", risk_counts.get('Medium', 0))
+                with col_cr3:
+                    st.metric("🟢 Low Risk", risk_counts.get('Low', 0))
+
+                st.dataframe(churn_risk, width='stretch', hide_index=True)
+            else:
+                st.info("No churn risk data available")
+
 
 ## TAB: MACHINE LEARNING
-with tabs[t]:  # Adjust index as needed
+def render_ml_tab():
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown("### 🤖 Machine Learning Analysis")
     st.caption("Predictive models and advanced pattern discovery")
     
-    # Initialize ML Analyzer
-    from config import COLS
-    ml_analyzer = ShilaMLAnalyzer(st.session_state.df, COLS)
+    # Initialize ML Analyzer (kept for the session so trained models and prepared features are reused)
+    # The ML analyzer is shared between sessions: time it through a per-session proxy
+    ml_analyzer = profiler.instrument(get_ml_analyzer(), 'ml', shared=True)
     ml_summary = ml_analyzer.get_ml_summary()
     
     if not ml_summary['ml_available']:
@@ -2105,281 +2381,24 @@ with tabs[t]:  # Adjust index as needed
     # 1. SUB-TAB: DETRACTOR PREDICTION (Conditional)
     if not st.session_state.get('is_snappfood', False):
         with ml_tabs[m]:
-            st.markdown("#### 🎯 Predict Potential Detractors")
-            st.caption("Identify customers likely to give low NPS scores before they do")
-        
-            if st.button("🚀 Train Detractor Model", key="train_detractor"):
-                with st.spinner("Training model..."):
-                    results = ml_analyzer.train_detractor_model()
-            
-                if 'error' in results:
-                    st.error(results['error'])
-                else:
-                    # Model Performance
-                    st.markdown("##### 📊 Model Performance")
-                
-                    col_m1, col_m2, col_m3, col_m4 = st.columns(4)
-                    with col_m1:
-                        st.metric("Accuracy", f"{results['accuracy']*100:.1f}%")
-                    with col_m2:
-                        st.metric("Precision", f"{results['precision']*100:.1f}%")
-                    with col_m3:
-                        st.metric("Recall", f"{results['recall']*100:.1f}%")
-                    with col_m4:
-                        st.metric("F1 Score", f"{results['f1_score']*100:.1f}%")
-                
-                    st.markdown("---")
-                
-                    col_conf, col_feat = st.columns(2)
-                
-                    with col_conf:
-                        st.markdown("##### 🔢 Confusion Matrix")
-                        cm = results['confusion_matrix']
-                    
-                        fig_cm = go.Figure(data=go.Heatmap(
-                            z=cm,
-                            x=['Predicted: Not Detractor', 'Predicted: Detractor'],
-                            y=['Actual: Not Detractor', 'Actual: Detractor'],
-                            text=cm,
-                            texttemplate='%{text}',
-                            colorscale=['#E8F5E9', '#4CAF50'],
-                            showscale=False
-                        ))
-                        fig_cm.update_layout(height=300, margin=dict(l=10, r=10, t=30, b=10))
-                        st.plotly_chart(fig_cm, width='stretch')
-                        
-                    with col_feat:
-                        st.markdown("##### 📈 Feature Importance")
-                            
-                        importance_df = pd.DataFrame(results['feature_importance'])
-                            
-                        fig_imp = px.bar(
-                            importance_df.head(10).sort_values('importance'),
-                            y='feature', x='importance',
-                            orientation='h',
-                            color='importance',
-                            color_continuous_scale=['#FFC107', '#4CAF50']
-                        )
-                        fig_imp.update_layout(height=300, showlegend=False, margin=dict(l=10, r=10, t=30, b=10))
-                        st.plotly_chart(fig_imp, width='stretch')
-                
-                        st.success(f"✅ Model trained! Detractor rate: {results['detractor_rate']}%")
-        
-                st.markdown("---")
-        
-                # High Risk Customers
-                st.markdown("##### 🚨 High Risk Customers")
-        
-                if st.button("🔍 Find High Risk Customers", key="find_risk"):
-                    with st.spinner("Analyzing..."):
-                        high_risk = ml_analyzer.predict_detractor_risk(top_n=50)
-            
-                    if len(high_risk) > 0:
-                        # Risk distribution
-                        risk_counts = high_risk['risk_level'].value_counts()
-                        
-                        col_r1, col_r2, col_r3 = st.columns(3)
-                        with col_r1:
-                            high_count = risk_counts.get('High', 0)
-                            st.metric("🔴 High Risk", high_count)
-                        with col_r2:
-                            med_count = risk_counts.get('Medium', 0)
-                            st.metric("🟠 Medium Risk", med_count)
-                        with col_r3:
-                            low_count = risk_counts.get('Low', 0)
-                            st.metric("🟢 Low Risk", low_count)
-                
-                        st.dataframe(high_risk, width='stretch', hide_index=True)
-                    else:
-                        st.info("No risk data available")
-            m += 1
+            render_ml_detractor(ml_analyzer)
+        m += 1
     
     # 2. SUB-TAB: CLUSTERING (Universal)
     with ml_tabs[m]:
-        st.markdown("#### 👥 Customer Clustering")
-        st.caption("Discover natural customer segments using K-Means clustering")
-        
-        n_clusters = st.slider("Number of Clusters", 2, 8, 5)
-        
-        if st.button("🔬 Perform Clustering", key="run_cluster"):
-            with st.spinner("Clustering customers..."):
-                cluster_results = ml_analyzer.perform_clustering(n_clusters=n_clusters)
-            
-            if 'error' in cluster_results:
-                st.error(cluster_results['error'])
-            else:
-                # Cluster Stats
-                st.markdown("##### 📊 Cluster Profiles")
-                
-                cluster_df = pd.DataFrame(cluster_results['cluster_stats'])
-                
-                # Display as cards
-                cols = st.columns(len(cluster_df))
-                
-                cluster_colors = ['#4CAF50', '#8BC34A', '#FFC107', '#FF9800', '#F44336', '#9C27B0', '#2196F3', '#00BCD4']
-                
-                for i, (_, row) in enumerate(cluster_df.iterrows()):
-                    with cols[i]:
-                        color = cluster_colors[i % len(cluster_colors)]
-                        st.markdown(f"""
-                        <div style="background-color:{color}; padding:15px; border-radius:10px; text-align:center; color:white;">
-                            <b style="font-size:14px;">{row.get('cluster_name', f'Cluster {i}')}</b><br>
-                            <span style="font-size:24px;"><b>{row['size']:,}</b></span><br>
-                            <small>({row['percentage']}%)</small><br>
-                            <hr style="border-color:rgba(255,255,255,0.3);">
-                            <small>Rating: {row.get('avg_rating', 'N/A')}</small><br>
-                            <small>NPS: {row.get('avg_nps', 'N/A')}</small>
-                        </div>
-                        """, unsafe_allow_html=True)
-                
-                st.markdown("---")
-                
-                col_elbow, col_pca = st.columns(2)
-                
-                with col_elbow:
-                    st.markdown("##### 📉 Elbow Method")
-                    elbow = cluster_results['elbow_data']
-                    
-                    fig_elbow = px.line(
-                        x=elbow['k'], y=elbow['inertia'],
-                        markers=True,
-                        labels={'x': 'Number of Clusters (K)', 'y': 'Inertia'}
-                    )
-                    fig_elbow.update_layout(height=300)
-                    st.plotly_chart(fig_elbow, width='stretch')
-                
-                with col_pca:
-                    st.markdown("##### 🎯 Cluster Visualization (PCA)")
-                    pca = cluster_results['pca_data']
-                    
-                    fig_pca = px.scatter(
-                        x=pca['x'], y=pca['y'],
-                        color=[str(c) for c in pca['cluster']],
-                        labels={'x': 'PC1', 'y': 'PC2', 'color': 'Cluster'},
-                        color_discrete_sequence=cluster_colors
-                    )
-                    fig_pca.update_layout(height=300)
-                    st.plotly_chart(fig_pca, width='stretch')
-                
-                # Full stats table
-                with st.expander("📋 View Full Cluster Statistics"):
-                    st.dataframe(cluster_df, width='stretch', hide_index=True)
+        render_ml_clustering(ml_analyzer)
     m += 1
     
     # 3. SUB-TAB: Association rules
     with ml_tabs[m]:
-        st.markdown("#### 🔗 Association Rules")
-        st.caption("Discover which issues frequently occur together")
-        
-        if not ml_summary.get('mlxtend_available', False):
-            st.warning("⚠️ mlxtend not installed. Run: `pip install mlxtend`")
-        else:
-            col_params1, col_params2 = st.columns(2)
-            with col_params1:
-                min_support = st.slider("Minimum Support", 0.005, 0.1, 0.01, 0.005)
-            with col_params2:
-                min_confidence = st.slider("Minimum Confidence", 0.1, 0.8, 0.3, 0.05)
-            
-            if st.button("🔍 Find Association Rules", key="find_rules"):
-                with st.spinner("Mining rules..."):
-                    rules_results = ml_analyzer.get_association_rules(
-                        min_support=min_support,
-                        min_confidence=min_confidence
-                    )
-                
-                if 'error' in rules_results:
-                    st.error(rules_results['error'])
-                elif not rules_results.get('rules'):
-                    st.info("No association rules found with the current thresholds. Try lowering Support or Confidence.")
-                else:
-                    st.success(f"Found {len(rules_results['rules'])} rules from {rules_results['total_transactions']:,} transactions")
-                    
-                    st.markdown("##### 📜 Top Association Rules")
-                    st.caption("'If X, then Y' - What issues appear together")
-                    
-                    for rule in rules_results['rules'][:10]:
-                        lift_color = '#4CAF50' if rule['lift'] > 1.5 else ('#FFC107' if rule['lift'] > 1 else '#9E9E9E')
-                        st.markdown(f"""
-                        <div style="background-color:#f5f5f5; padding:10px; border-radius:8px; margin:5px 0; border-left:4px solid {lift_color};">
-                            <b>IF</b> {rule['if']}<br>
-                            <b>THEN</b> {rule['then']}<br>
-                            <small style="color:#666;">
-                                Support: {rule['support']:.1%} | 
-                                Confidence: {rule['confidence']:.1%} | 
-                                Lift: <span style="color:{lift_color}; font-weight:bold;">{rule['lift']:.2f}</span>
-                            </small>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    st.markdown("---")
-                    
-                    st.markdown("##### 📊 Frequent Issue Combinations")
-                    itemsets_df = pd.DataFrame(rules_results['frequent_itemsets'])
-                    if not itemsets_df.empty:
-                        st.dataframe(itemsets_df, width='stretch', hide_index=True)
+        render_ml_association(ml_analyzer, ml_summary)
 
     # Increment the ML sub-tab index
     m += 1
     
     # 4. SUB-TAB: ANOMALY DETECTION
     with ml_tabs[m]:
-        st.markdown("#### 🚨 Anomaly Detection")
-        st.caption("Find unusual patterns that may indicate fraud, errors, or system issues")
-        
-        contamination = st.slider("Expected Anomaly Rate", 0.01, 0.15, 0.05, 0.01)
-        
-        if st.button("🔍 Detect Anomalies", key="detect_anomaly"):
-            with st.spinner("Analyzing patterns..."):
-                anomaly_results = ml_analyzer.detect_anomalies(contamination=contamination)
-            
-            if 'error' in anomaly_results:
-                st.error(anomaly_results['error'])
-            else:
-                stats = anomaly_results['stats']
-                
-                # Summary metrics
-                col_a1, col_a2, col_a3, col_a4 = st.columns(4)
-                
-                with col_a1:
-                    st.metric("🚨 Anomalies Found", stats['total_anomalies'])
-                with col_a2:
-                    st.metric("📊 Anomaly Rate", f"{stats['anomaly_rate']}%")
-                with col_a3:
-                    if 'anomaly_avg_rating' in stats:
-                        st.metric("⭐ Anomaly Avg Rating", stats['anomaly_avg_rating'])
-                with col_a4:
-                    if 'normal_avg_rating' in stats:
-                        st.metric("⭐ Normal Avg Rating", stats['normal_avg_rating'])
-                
-                st.markdown("---")
-                
-                # Anomaly Types
-                if anomaly_results['anomaly_types']:
-                    st.markdown("##### 🏷️ Anomaly Types Detected")
-                    
-                    cols_type = st.columns(len(anomaly_results['anomaly_types']))
-                    
-                    for i, atype in enumerate(anomaly_results['anomaly_types']):
-                        with cols_type[i]:
-                            st.markdown(f"""
-                            <div style="background-color:#FFF3E0; padding:15px; border-radius:10px; text-align:center; border:2px solid #FF9800;">
-                                <span style="font-size:28px;">{atype['icon']}</span><br>
-                                <b>{atype['type']}</b><br>
-                                <span style="font-size:24px; color:#FF9800;"><b>{atype['count']}</b></span><br>
-                                <small>{atype['description']}</small>
-                            </div>
-                            """, unsafe_allow_html=True)
-                
-                st.markdown("---")
-                
-                # Top anomalies table
-                st.markdown("##### 📋 Top Anomalies to Review")
-                anomalies_df = pd.DataFrame(anomaly_results['top_anomalies'])
-                
-                if not anomalies_df.empty:
-                    st.dataframe(anomalies_df, width='stretch', hide_index=True)
-                else:
-                    st.info("No specific anomaly records to display.")
+        render_ml_anomaly(ml_analyzer)
 
     # Increment the local ML counter
     m += 1
@@ -2388,95 +2407,60 @@ with tabs[t]:  # Adjust index as needed
     # 5. SUB-TAB: CHURN PREDICTION
     if not st.session_state.get('is_snappfood', False):
         with ml_tabs[m]:
-            st.markdown("#### 📉 Churn Prediction")
-            st.caption("Predict which customers are likely to stop ordering")
-        
-            st.info("💡 **Note:** True churn prediction requires repeat customer data (customer ID + order history). This model uses a proxy based on rating, NPS, and issues.")
-        
-            if st.button("🚀 Train Churn Model", key="train_churn"):
-                with st.spinner("Training model..."):
-                    churn_results = ml_analyzer.train_churn_model()
-            
-                if 'error' in churn_results:
-                    st.error(churn_results['error'])
-                else:
-                    # Model Performance
-                    st.markdown("##### 📊 Model Performance")
-                
-                    col_c1, col_c2, col_c3, col_c4 = st.columns(4)
-                    with col_c1:
-                        st.metric("Accuracy", f"{churn_results['accuracy']*100:.1f}%")
-                    with col_c2:
-                        st.metric("Precision", f"{churn_results['precision']*100:.1f}%")
-                    with col_c3:
-                        st.metric("Recall", f"{churn_results['recall']*100:.1f}%")
-                    with col_c4:
-                        st.metric("Churn Rate", f"{churn_results['churn_rate']}%")
-                
-                    st.markdown("---")
-                
-                    col_cm, col_fi = st.columns(2)
-                
-                    with col_cm:
-                        st.markdown("##### 🔢 Confusion Matrix")
-                        cm = churn_results['confusion_matrix']
-                        
-                        fig_cm = go.Figure(data=go.Heatmap(
-                            z=cm,
-                            x=['Stay', 'Churn'],
-                            y=['Actual: Stay', 'Actual: Churn'],
-                            text=cm,
-                            texttemplate='%{text}',
-                            colorscale=['#E3F2FD', '#2196F3'],
-                            showscale=False
-                        ))
-                        fig_cm.update_layout(height=300, margin=dict(l=10, r=10, t=30, b=10))
-                        st.plotly_chart(fig_cm, width='stretch')
-                        
-                        with col_fi:
-                            st.markdown("##### 📈 Feature Importance")
-                            
-                            importance_df = pd.DataFrame(churn_results['feature_importance'])
-                            
-                            fig_imp = px.bar(
-                                importance_df.sort_values('importance'),
-                                y='feature', x='importance',
-                                orientation='h',
-                                color='importance',
-                                color_continuous_scale=['#BBDEFB', '#2196F3']
-                            )
-                            fig_imp.update_layout(height=300, showlegend=False, margin=dict(l=10, r=10, t=30, b=10))
-                            st.plotly_chart(fig_imp, width='stretch')
-                            
-                st.markdown("---")
-        
-                # High Churn Risk
-                st.markdown("##### 📉 High Churn Risk Customers")
-        
-                if st.button("🔍 Find Churn Risk Customers", key="find_churn"):
-                    with st.spinner("Analyzing..."):
-                        churn_risk = ml_analyzer.predict_churn_risk(top_n=50)
-            
-                if len(churn_risk) > 0:
-                    risk_counts = churn_risk['churn_level'].value_counts()
-                
-                    col_cr1, col_cr2, col_cr3 = st.columns(3)
-                    with col_cr1:
-                        st.metric("🔴 High Churn Risk", risk_counts.get('High', 0))
-                    with col_cr2:
-                        st.metric("🟠 Medium Risk", risk_counts.get('Medium', 0))
-                    with col_cr3:
-                        st.metric("🟢 Low Risk", risk_counts.get('Low', 0))
-                
-                        st.dataframe(churn_risk, width='stretch', hide_index=True)
-                else:
-                    st.info("No churn risk data available")
+            render_ml_churn(ml_analyzer)
 
         # Increment local counter
         m += 1
 
-    # FINAL: Increment the main tab counter so your app stays perfectly synced
-    t += 1
+
+# --- TAB RENDERING ---
+# Only the open tab runs its analytics; the others compute on first visit and are
+# served from the analyzer's result cache afterwards. While a tab is open, the
+# analytics of the next one are warmed in the background.
+tab_specs = [(L('tab_overview'), render_overview_tab, [
+    ('get_rating_distribution', {}), ('get_nps_distribution', {}),
+    ('get_top_issues', {'n': 10}), ('get_top_strengths', {'n': 10}),
+    ('get_recovery_opportunities', {}),
+])]
+
+# Only add NPS/Tag dependent tabs if it's NOT SnappFood
+if not st.session_state.get('is_snappfood', False):
+    tab_specs.append((L('tab_pareto'), render_pareto_tab, [('get_pareto_analysis', {})]))
+    tab_specs.append((L('tab_kano'), render_kano_tab, [('get_kano_analysis', {})]))
+
+tab_specs.extend([
+    (L('tab_branches'), render_branches_tab, [('get_branch_analysis', {}), ('get_branch_product_matrix', {})]),
+    (L('tab_aspects'), render_aspects_tab, [('get_aspect_sentiment', {})]),
+    (L('tab_trends'), render_trends_tab, [
+        ('get_peak_hour_analysis', {}), ('get_hourly_trends', {}), ('get_daily_trends', {}),
+        ('get_mom_comparison', {}), ('get_low_rating_comments_by_hour', {}),
+    ]),
+    (L('tab_ai'), render_ai_tab, [('get_summary_for_ai', {})]),
+    ("🍔 Products", render_products_tab, [('get_product_analysis', {}), ('get_issue_category_analysis', {})]),
+    ("📝 Text Mining", render_text_mining_tab, [
+        ('get_word_frequency', {'min_freq': 5, 'top_n': 100}),
+        ('get_ngram_analysis', {'n': 2, 'min_freq': 3, 'top_n': 20}),
+        ('get_keywords_by_rating', {'top_n': 15}),
+    ]),
+    ("🤖 Machine Learning", render_ml_tab, []),
+])
+main_tabs = [label for label, _, _ in tab_specs]
+
+# Tab state (which tab is open) needs Streamlit >= 1.51; older versions render every tab
+try:
+    tabs = st.tabs(main_tabs, key="main_tab", on_change="rerun")
+except TypeError:
+    tabs = st.tabs(main_tabs)
+
+for t, (tab, (label, render_tab, _)) in enumerate(zip(tabs, tab_specs)):
+    if getattr(tab, 'open', None) is False:
+        continue
+    with tab, profiler.section(f"tab:{label}"):
+        render_tab()
+    # Profiling stays single-threaded so the timings only cover what the page itself ran
+    if not profiler.enabled and getattr(tab, 'open', None) and t + 1 < len(tab_specs):
+        prefetch(analyzer, tab_specs[t + 1][2])
+
 
 # --- EXPORT FOOTER ---
 st.markdown("---")
@@ -2490,1276 +2474,8 @@ with c_exp_1:
         
         with st.spinner("Generating comprehensive Excel report with charts..."):
             try:
-                # Create workbook
-                from openpyxl import Workbook
-                from openpyxl.drawing.image import Image as XLImage
-                from openpyxl.utils.dataframe import dataframe_to_rows
-                from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-                from openpyxl.chart import BarChart, LineChart, PieChart, Reference
-                import io
-                
-                wb = Workbook()
-                
-                # Helper function to add dataframe to sheet
-                def df_to_sheet(ws, df, start_row=1):
-                    for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), start_row):
-                        for c_idx, value in enumerate(row, 1):
-                            cell = ws.cell(row=r_idx, column=c_idx, value=value)
-                            if r_idx == start_row:  # Header row
-                                cell.font = Font(bold=True, color="FFFFFF")
-                                cell.fill = PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid")
-                                cell.alignment = Alignment(horizontal="center")
-                    return r_idx + 2  # Return next available row
-                
-                # Helper to save plotly chart as image bytes
-                def fig_to_image_bytes(fig, width=700, height=400):
-                    img_bytes = fig.to_image(format="png", width=width, height=height, scale=2)
-                    return io.BytesIO(img_bytes)
-                
-                # ==========================================
-                # SHEET 1: DASHBOARD SUMMARY WITH CHARTS
-                # ==========================================
-                ws = wb.active
-                ws.title = "📊 Dashboard"
-                
-                # Title
-                ws['A1'] = "🍕 Shila Restaurant - QFD Analysis Report"
-                ws['A1'].font = Font(bold=True, size=18, color="1A1F36")
-                ws.merge_cells('A1:F1')
-                
-                ws['A2'] = f"Generated: {ts}"
-                ws['A2'].font = Font(italic=True, color="697386")
-                
-                # KPI Summary
-                ws['A4'] = "📈 Key Performance Indicators"
-                ws['A4'].font = Font(bold=True, size=14)
-                
-                kpi_data = [
-                    ['Metric', 'Value', 'Status'],
-                    ['NPS Score', kpis['nps_score'], '🟢 Good' if kpis['nps_score'] > 30 else ('🟡 OK' if kpis['nps_score'] > 0 else '🔴 Bad')],
-                    ['Average Rating', f"{kpis['avg_rating']} / 5", '🟢 Good' if kpis['avg_rating'] >= 4 else ('🟡 OK' if kpis['avg_rating'] >= 3 else '🔴 Bad')],
-                    ['Total Orders', kpis['total_orders'], '-'],
-                    ['Promoters', kpis['promoters'], '😊'],
-                    ['Passives', kpis['passives'], '😐'],
-                    ['Detractors', kpis['detractors'], '😠'],
-                    ['Response Rate', f"{kpis['response_rate']}%", '🟢 Good' if kpis['response_rate'] > 50 else '🟡 Low'],
-                ]
-                for r_idx, row in enumerate(kpi_data, 5):
-                    for c_idx, val in enumerate(row, 1):
-                        cell = ws.cell(row=r_idx, column=c_idx, value=val)
-                        if r_idx == 5:
-                            cell.font = Font(bold=True, color="FFFFFF")
-                            cell.fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
-                
-                # Add Rating Distribution Chart
-                rd = analyzer.get_rating_distribution()
-                if len(rd) > 0:
-                    fig_rating = px.bar(
-                        rd, x='Rating', y='Count', 
-                        color='Rating',
-                        color_continuous_scale=['#D32F2F','#FF9800','#FFEB3B','#8BC34A','#4CAF50'],
-                        title='Rating Distribution'
-                    )
-                    fig_rating.update_layout(
-                        paper_bgcolor='white', plot_bgcolor='white',
-                        font=dict(family="Arial", size=12),
-                        showlegend=False
-                    )
-                    img_bytes = fig_to_image_bytes(fig_rating, 500, 350)
-                    img = XLImage(img_bytes)
-                    ws.add_image(img, 'E5')
-                
-                # ==========================================
-                # SHEET 2: NPS ANALYSIS WITH CHART
-                # ==========================================
-                ws2 = wb.create_sheet("📈 NPS Analysis")
-                
-                ws2['A1'] = "NPS Score Analysis"
-                ws2['A1'].font = Font(bold=True, size=16)
-                
-                nd = analyzer.get_nps_distribution()
-                if len(nd) > 0:
-                    next_row = df_to_sheet(ws2, nd, 3)
-                    
-                    # NPS Distribution Chart
-                    fig_nps = px.bar(
-                        nd, x='NPS', y='Count', color='Segment',
-                        color_discrete_map={'Promoter':'#4CAF50','Passive':'#FF9800','Detractor':'#D32F2F'},
-                        title='NPS Score Distribution'
-                    )
-                    fig_nps.update_layout(paper_bgcolor='white', plot_bgcolor='white')
-                    img_bytes = fig_to_image_bytes(fig_nps, 600, 400)
-                    img = XLImage(img_bytes)
-                    ws2.add_image(img, 'F3')
-                    
-                    # NPS Pie Chart
-                    segment_counts = nd.groupby('Segment')['Count'].sum().reset_index()
-                    fig_pie = px.pie(
-                        segment_counts, values='Count', names='Segment',
-                        color='Segment',
-                        color_discrete_map={'Promoter':'#4CAF50','Passive':'#FF9800','Detractor':'#D32F2F'},
-                        title='NPS Segments'
-                    )
-                    fig_pie.update_layout(paper_bgcolor='white')
-                    img_bytes = fig_to_image_bytes(fig_pie, 450, 400)
-                    img = XLImage(img_bytes)
-                    ws2.add_image(img, 'F20')
-                
-                # ==========================================
-                # SHEET 3: PARETO ANALYSIS WITH CHART
-                # ==========================================
-                ws3 = wb.create_sheet("📊 Pareto Analysis")
-                
-                ws3['A1'] = "Pareto Analysis - Issues by Impact"
-                ws3['A1'].font = Font(bold=True, size=16)
-                
-                pareto = analyzer.get_pareto_analysis()
-                if len(pareto) > 0:
-                    df_to_sheet(ws3, pareto, 3)
-                    
-                    # Pareto Chart
-                    fig_pareto = make_subplots(specs=[[{"secondary_y": True}]])
-                    fig_pareto.add_trace(go.Bar(
-                        x=pareto['tag'].head(15), y=pareto['total_damage'].head(15),
-                        name='Impact Score', marker_color='#D32F2F', opacity=0.85
-                    ), secondary_y=False)
-                    fig_pareto.add_trace(go.Scatter(
-                        x=pareto['tag'].head(15), y=pareto['cumulative_pct'].head(15),
-                        name='Cumulative %', mode='lines+markers',
-                        line=dict(color='#1A1F36', width=2)
-                    ), secondary_y=True)
-                    fig_pareto.add_hline(y=80, line_dash="dash", line_color="#4CAF50", secondary_y=True)
-                    fig_pareto.update_layout(
-                        title='Pareto Chart - Top Issues by Rating Damage',
-                        paper_bgcolor='white', plot_bgcolor='white',
-                        xaxis_tickangle=-45
-                    )
-                    img_bytes = fig_to_image_bytes(fig_pareto, 800, 450)
-                    img = XLImage(img_bytes)
-                    ws3.add_image(img, 'H3')
-                
-                # ==========================================
-                # SHEET 4: KANO MODEL WITH CHART
-                # ==========================================
-                ws4 = wb.create_sheet("🎨 Kano Model")
-                
-                ws4['A1'] = "Kano Model Classification"
-                ws4['A1'].font = Font(bold=True, size=16)
-                
-                kano = analyzer.get_kano_analysis()
-                if len(kano) > 0:
-                    df_to_sheet(ws4, kano, 3)
-                    
-                    # Kano Scatter Chart
-                    fig_kano = px.scatter(
-                        kano, x='lift_as_strength', y='drop_as_weakness',
-                        color='kano_type', hover_name='attribute',
-                        size='strength_mentions', size_max=40,
-                        color_discrete_map={'Must-Be':'#D32F2F', 'Performance':'#FFB020', 'Delighter':'#4CAF50'},
-                        title='Kano Model - Feature Classification'
-                    )
-                    fig_kano.add_hline(y=0.5, line_dash="dot", line_color="#E1E4E8")
-                    fig_kano.add_vline(x=0.3, line_dash="dot", line_color="#E1E4E8")
-                    fig_kano.update_layout(paper_bgcolor='white', plot_bgcolor='white')
-                    img_bytes = fig_to_image_bytes(fig_kano, 700, 500)
-                    img = XLImage(img_bytes)
-                    ws4.add_image(img, 'H3')
-                
-                # ==========================================
-                # SHEET 5: BRANCH ANALYSIS WITH CHART
-                # ==========================================
-                ws5 = wb.create_sheet("🏪 Branch Analysis")
-                
-                ws5['A1'] = "Branch Performance Comparison"
-                ws5['A1'].font = Font(bold=True, size=16)
-                
-                br_stats, br_issues = analyzer.get_branch_analysis()
-                if len(br_stats) > 0:
-                    df_to_sheet(ws5, br_stats.round(2), 3)
-                    
-                    # Branch Comparison Chart
-                    br_sorted = br_stats.sort_values('avg_rating', ascending=True)
-                    fig_branch = px.bar(
-                        br_sorted, x='branch', y='rating_vs_avg',
-                        color='rating_vs_avg',
-                        color_continuous_scale=['#D32F2F', '#FFB020', '#4CAF50'],
-                        color_continuous_midpoint=0,
-                        title='Branch Performance vs Average'
-                    )
-                    fig_branch.update_layout(paper_bgcolor='white', plot_bgcolor='white')
-                    img_bytes = fig_to_image_bytes(fig_branch, 700, 400)
-                    img = XLImage(img_bytes)
-                    ws5.add_image(img, 'I3')
-                
-                # ==========================================
-                # SHEET 6: PRODUCT ANALYSIS
-                # ==========================================
-                ws6 = wb.create_sheet("🍔 Products")
-                
-                ws6['A1'] = "Product Performance"
-                ws6['A1'].font = Font(bold=True, size=16)
-                
-                products = analyzer.get_product_analysis()
-                if len(products) > 0:
-                    df_to_sheet(ws6, products, 3)
-                    
-                    # Product Chart - HORIZONTAL for Persian text
-                    top_products = products.head(15).sort_values('avg_rating', ascending=True)
-    
-                    fig_prod = px.bar(
-                        top_products,
-                        y='product',
-                        x='avg_rating',
-                        orientation='h',
-                        color='avg_rating',
-                        color_continuous_scale=['#D32F2F', '#FF9800', '#FFEB3B', '#8BC34A', '#4CAF50'],
-                        text='avg_rating',
-                        title='Top Products by Rating'
-                    )
-                    
-                    fig_prod.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-                    fig_prod.update_layout(
-                        paper_bgcolor='white', 
-                        plot_bgcolor='white',
-                        height=500,
-                        yaxis=dict(automargin=True),
-                        xaxis=dict(range=[0, 5.5]),
-                        showlegend=False
-                    )
-                    img_bytes = fig_to_image_bytes(fig_prod, 700, 500)
-                    img = XLImage(img_bytes)
-                    ws6.add_image(img, 'G3')
-                
-                # ==========================================
-                # SHEET 7: CUSTOMER SEGMENTS WITH CHART
-                # ==========================================
-                ws7 = wb.create_sheet("🎯 Customer Segments")
-                
-                ws7['A1'] = "Customer Segmentation Analysis"
-                ws7['A1'].font = Font(bold=True, size=16)
-                
-                recovery = analyzer.get_recovery_opportunities()
-                if len(recovery) > 0:
-                    df_to_sheet(ws7, recovery, 3)
-                    
-                    # Segment Pie Chart
-                    fig_seg = px.pie(
-                        recovery, values='count', names='segment',
-                        color='segment',
-                        color_discrete_map={
-                            'Happy':'#4CAF50', 'Neutral':'#9E9E9E',
-                            'Recovery':'#FF9800', 'Silent Churner':'#FF5722', 'At Risk':'#D32F2F'
-                        },
-                        title='Customer Segments Distribution'
-                    )
-                    fig_seg.update_layout(paper_bgcolor='white')
-                    img_bytes = fig_to_image_bytes(fig_seg, 500, 400)
-                    img = XLImage(img_bytes)
-                    ws7.add_image(img, 'G3')
-                
-                # ==========================================
-                # SHEET 8: ISSUE CATEGORIES
-                # ==========================================
-                ws8 = wb.create_sheet("⚠️ Issue Categories")
-                
-                ws8['A1'] = "Issue Category Impact Analysis"
-                ws8['A1'].font = Font(bold=True, size=16)
-                
-                issue_cats = analyzer.get_issue_category_analysis()
-                if len(issue_cats) > 0:
-                    df_to_sheet(ws8, issue_cats, 3)
-                    
-                    # Issue Category Chart
-                    fig_cats = px.bar(
-                        issue_cats, x='category_fa', y='rating_impact',
-                        color='rating_impact',
-                        color_continuous_scale=['#4CAF50', '#FFB020', '#D32F2F'],
-                        title='Rating Impact by Issue Category'
-                    )
-                    fig_cats.update_layout(paper_bgcolor='white', plot_bgcolor='white')
-                    img_bytes = fig_to_image_bytes(fig_cats, 500, 350)
-                    img = XLImage(img_bytes)
-                    ws8.add_image(img, 'J3')
-                
-                # ==========================================
-                # SHEET 9: ASPECT SENTIMENT WITH CHART
-                # ==========================================
-                ws9 = wb.create_sheet("🎭 Aspect Sentiment")
-                
-                ws9['A1'] = "Aspect-Based Sentiment Analysis"
-                ws9['A1'].font = Font(bold=True, size=16)
-                
-                aspects = analyzer.get_aspect_sentiment()
-                if len(aspects) > 0:
-                    df_to_sheet(ws9, aspects, 3)
-                    
-                    # Sentiment Chart
-                    fig_aspect = px.bar(
-                        aspects, y='aspect', x='sentiment_score', orientation='h',
-                        color='sentiment_score',
-                        color_continuous_scale=['#D32F2F', '#FFEB3B', '#4CAF50'],
-                        color_continuous_midpoint=0,
-                        title='Aspect Sentiment Scores'
-                    )
-                    fig_aspect.update_layout(paper_bgcolor='white', plot_bgcolor='white')
-                    img_bytes = fig_to_image_bytes(fig_aspect, 600, 400)
-                    img = XLImage(img_bytes)
-                    ws9.add_image(img, 'H3')
-                
-                # ==========================================
-                # SHEET 10: DAILY TRENDS WITH CHART
-                # ==========================================
-                ws10 = wb.create_sheet("📅 Daily Trends")
-                
-                ws10['A1'] = "Daily Performance Trends"
-                ws10['A1'].font = Font(bold=True, size=16)
-                
-                daily = analyzer.get_daily_trends()
-                if len(daily) > 0:
-                    df_to_sheet(ws10, daily.round(2), 3)
-                    
-                    # Trend Chart
-                    fig_trend = make_subplots(rows=2, cols=1, subplot_titles=('Rating Trend', 'Order Volume'))
-                    fig_trend.add_trace(go.Scatter(
-                        x=daily['date'], y=daily['avg_rating'],
-                        mode='lines', name='Daily', line=dict(color='#E1E4E8', width=1)
-                    ), row=1, col=1)
-                    fig_trend.add_trace(go.Scatter(
-                        x=daily['date'], y=daily['rating_7day_avg'],
-                        mode='lines', name='7-Day Avg', line=dict(color='#2196F3', width=3)
-                    ), row=1, col=1)
-                    fig_trend.add_trace(go.Bar(
-                        x=daily['date'], y=daily['order_count'],
-                        name='Orders', marker_color='#4CAF50', opacity=0.6
-                    ), row=2, col=1)
-                    fig_trend.update_layout(
-                        paper_bgcolor='white', plot_bgcolor='white',
-                        height=500, showlegend=True
-                    )
-                    img_bytes = fig_to_image_bytes(fig_trend, 900, 500)
-                    img = XLImage(img_bytes)
-                    ws10.add_image(img, 'H3')
-                
-                # ==========================================
-                # SHEET 11: MONTHLY TRENDS WITH CHART
-                # ==========================================
-                ws11 = wb.create_sheet("📅 Monthly Trends")
-                
-                ws11['A1'] = "Month-over-Month Analysis"
-                ws11['A1'].font = Font(bold=True, size=16)
-                
-                mom = analyzer.get_mom_comparison()
-                if len(mom) > 0:
-                    df_to_sheet(ws11, mom, 3)
-                    
-                    # MoM Chart
-                    fig_mom = make_subplots(specs=[[{"secondary_y": True}]])
-                    fig_mom.add_trace(go.Bar(
-                        x=mom['year_month'], y=mom['order_count'],
-                        name='Orders', marker_color='#4CAF50', opacity=0.6
-                    ), secondary_y=False)
-                    fig_mom.add_trace(go.Scatter(
-                        x=mom['year_month'], y=mom['avg_rating'],
-                        name='Avg Rating', mode='lines+markers',
-                        line=dict(color='#2196F3', width=3)
-                    ), secondary_y=True)
-                    fig_mom.update_layout(
-                        title='Monthly Performance',
-                        paper_bgcolor='white', plot_bgcolor='white'
-                    )
-                    img_bytes = fig_to_image_bytes(fig_mom, 700, 400)
-                    img = XLImage(img_bytes)
-                    ws11.add_image(img, 'H3')
-                
-                # ==========================================
-                # SHEET 12: BRANCH-PRODUCT MATRIX (HEATMAP)
-                # ==========================================
-                ws12 = wb.create_sheet("🔥 Branch-Product Matrix")
-                
-                ws12['A1'] = "Branch × Product Performance Matrix"
-                ws12['A1'].font = Font(bold=True, size=16)
-
-                matrix = analyzer.get_branch_product_matrix()
-                if len(matrix) > 0:
-                    # Write matrix manually (with index as first column)
-                    # Header row
-                    ws12.cell(row=3, column=1, value="Branch").font = Font(bold=True)
-                    for c_idx, col_name in enumerate(matrix.columns, 2):
-                        cell = ws12.cell(row=3, column=c_idx, value=col_name)
-                        cell.font = Font(bold=True, color="FFFFFF")
-                        cell.fill = PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid")
-    
-                    # Data rows
-                    for r_idx, (branch, row_data) in enumerate(matrix.iterrows(), 4):
-                        ws12.cell(row=r_idx, column=1, value=branch)
-                        for c_idx, value in enumerate(row_data, 2):
-                            if pd.notna(value):
-                                ws12.cell(row=r_idx, column=c_idx, value=round(value, 2))
-    
-                    # Heatmap chart
-                    fig_heat = px.imshow(
-                        matrix,
-                        color_continuous_scale=['#D32F2F', '#FFEB3B', '#4CAF50'],
-                        aspect='auto', text_auto='.2f',
-                        title='Branch-Product Rating Heatmap'
-                    )
-                    fig_heat.update_layout(paper_bgcolor='white', height=500)
-                    img_bytes = fig_to_image_bytes(fig_heat, 800, 500)
-                    img = XLImage(img_bytes)
-                    ws12.add_image(img, f'A{len(matrix)+8}')
-                
-                # ==========================================
-                # SHEET 13: CO-OCCURRENCE
-                # ==========================================
-                ws13 = wb.create_sheet("🔗 Issue Co-occurrence")
-                
-                ws13['A1'] = "Issue Co-occurrence Analysis"
-                ws13['A1'].font = Font(bold=True, size=16)
-                
-                cooccur = analyzer.get_cooccurrence(20)
-                if len(cooccur) > 0:
-                    df_to_sheet(ws13, cooccur, 3)
-                
-                # ==========================================
-                # SHEET 14: TOP ISSUES
-                # ==========================================
-                ws14 = wb.create_sheet("🚨 Top Issues")
-                ws14['A1'] = "Top Issues"
-                ws14['A1'].font = Font(bold=True, size=16)
-                issues = analyzer.get_top_issues(20)
-                if len(issues) > 0:
-                    df_to_sheet(ws14, issues, 3)
-                
-                # ==========================================
-                # SHEET 15: TOP STRENGTHS
-                # ==========================================
-                ws15 = wb.create_sheet("🏆 Top Strengths")
-                ws15['A1'] = "Top Strengths"
-                ws15['A1'].font = Font(bold=True, size=16)
-                strengths = analyzer.get_top_strengths(20)
-                if len(strengths) > 0:
-                    df_to_sheet(ws15, strengths, 3)
-                
-                # ==========================================
-                # SHEET 16: RAW DATA
-                # ==========================================
-                ws16 = wb.create_sheet("📁 Raw Data")
-                ws16['A1'] = "Original Dataset"
-                ws16['A1'].font = Font(bold=True, size=16)
-                df_to_sheet(ws16, st.session_state.df, 3)
-                
-                # ==========================================
-                # SHEET 17: WORD FREQUENCY
-                # ==========================================
-                ws17 = wb.create_sheet("📝 Word Frequency")
-                ws17['A1'] = "Word Frequency Analysis"
-                ws17['A1'].font = Font(bold=True, size=16)
-
-                word_freq = analyzer.get_word_frequency(min_freq=5, top_n=100)
-                if word_freq:
-                    # Headers
-                    ws17['A3'] = "Word"
-                    ws17['B3'] = "Count"
-                    ws17['A3'].font = Font(bold=True, color="FFFFFF")
-                    ws17['B3'].font = Font(bold=True, color="FFFFFF")
-                    ws17['A3'].fill = PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid")
-                    ws17['B3'].fill = PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid")
-    
-                # Data
-                for i, (word, count) in enumerate(word_freq.items(), 4):
-                    ws17.cell(row=i, column=1, value=word)
-                    ws17.cell(row=i, column=2, value=count)
-    
-                    # Word Cloud Chart (Bar chart as alternative)
-                    df_wf = pd.DataFrame([{'word': k, 'count': v} for k, v in list(word_freq.items())[:20]])
-                    df_wf = df_wf.sort_values('count', ascending=True)
-    
-                    fig_wf = px.bar(
-                        df_wf, y='word', x='count',
-                        orientation='h',
-                        color='count',
-                        color_continuous_scale=['#FFC107', '#4CAF50'],
-                        title='Top 20 Words'
-                        )
-                    fig_wf.update_layout(paper_bgcolor='white', plot_bgcolor='white', height=500, showlegend=False)
-                    img_bytes = fig_to_image_bytes(fig_wf, 600, 500)
-                    img = XLImage(img_bytes)
-                    ws17.add_image(img, 'D3')
-
-                # ==========================================
-                # SHEET 18: N-GRAM ANALYSIS
-                # ==========================================
-                ws18 = wb.create_sheet("🔗 N-gram Analysis")                
-                ws18['A1'] = "N-gram Analysis - Common Phrases"
-                ws18['A1'].font = Font(bold=True, size=16)
-
-                # Bigrams
-                ws18['A3'] = "Bigrams (2-word phrases)"
-                ws18['A3'].font = Font(bold=True, size=14)
-
-                bigrams = analyzer.get_ngram_analysis(n=2, min_freq=3, top_n=30)
-                if len(bigrams) > 0:
-                    ws18['A4'] = "Phrase"
-                    ws18['B4'] = "Count"
-                    ws18['A4'].font = Font(bold=True, color="FFFFFF")
-                    ws18['B4'].font = Font(bold=True, color="FFFFFF")
-                    ws18['A4'].fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
-                    ws18['B4'].fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
-    
-                    for i, (_, row) in enumerate(bigrams.iterrows(), 5):
-                        ws18.cell(row=i, column=1, value=row['phrase'])
-                        ws18.cell(row=i, column=2, value=row['count'])
-                    
-                    # Bigram Chart
-                    bi_chart = bigrams.head(15).sort_values('count', ascending=True)
-                    fig_bi = px.bar(
-                        bi_chart, y='phrase', x='count',
-                        orientation='h',
-                        color='count',
-                        color_continuous_scale=['#2196F3', '#4CAF50'],
-                        title='Top 15 Bigrams'
-                    )
-                    fig_bi.update_layout(paper_bgcolor='white', plot_bgcolor='white', height=400, showlegend=False)
-                    img_bytes = fig_to_image_bytes(fig_bi, 500, 400)
-                    img = XLImage(img_bytes)
-                    ws18.add_image(img, 'D3')
-
-                # Trigrams
-                trigrams = analyzer.get_ngram_analysis(n=3, min_freq=2, top_n=30)
-                if len(trigrams) > 0:
-                    start_row = max(len(bigrams) + 7, 38)
-    
-                    ws18.cell(row=start_row, column=1, value="Trigrams (3-word phrases)")
-                    ws18.cell(row=start_row, column=1).font = Font(bold=True, size=14)
-    
-                    ws18.cell(row=start_row+1, column=1, value="Phrase")
-                    ws18.cell(row=start_row+1, column=2, value="Count")
-                    ws18.cell(row=start_row+1, column=1).font = Font(bold=True, color="FFFFFF")
-                    ws18.cell(row=start_row+1, column=2).font = Font(bold=True, color="FFFFFF")
-                    ws18.cell(row=start_row+1, column=1).fill = PatternFill(start_color="FF9800", end_color="FF9800", fill_type="solid")
-                    ws18.cell(row=start_row+1, column=2).fill = PatternFill(start_color="FF9800", end_color="FF9800", fill_type="solid")
-                        
-                    for i, (_, row) in enumerate(trigrams.iterrows(), start_row+2):
-                        ws18.cell(row=i, column=1, value=row['phrase'])
-                        ws18.cell(row=i, column=2, value=row['count'])
-    
-                    # Trigram Chart
-                    tri_chart = trigrams.head(15).sort_values('count', ascending=True)
-                    fig_tri = px.bar(
-                        tri_chart, y='phrase', x='count',
-                        orientation='h',
-                        color='count',
-                        color_continuous_scale=['#FF9800', '#F44336'],
-                        title='Top 15 Trigrams'
-                    )
-                    fig_tri.update_layout(paper_bgcolor='white', plot_bgcolor='white', height=400, showlegend=False)
-                    img_bytes = fig_to_image_bytes(fig_tri, 500, 400)
-                    img = XLImage(img_bytes)
-                    ws18.add_image(img, f'D{start_row}')
-
-                # ==========================================
-                # SHEET 19: KEYWORDS BY RATING
-                # ==========================================
-                ws19 = wb.create_sheet("🎯 Keywords by Rating")
-
-                ws19['A1'] = "Distinctive Keywords by Rating Level"
-                ws19['A1'].font = Font(bold=True, size=16)
-
-                keywords_by_rating = analyzer.get_keywords_by_rating(top_n=20)
-
-                if keywords_by_rating:
-                    # Column headers
-                    col_config = [
-                        ('A', '1-2 Stars (Unhappy)', 'D32F2F', 'low'),
-                        ('D', '3 Stars (Neutral)', 'FF9800', 'mid'),
-                        ('G', '4-5 Stars (Happy)', '4CAF50', 'high')
-                    ]
-    
-                    for col_letter, title, color, key in col_config:
-                        col_idx = ord(col_letter) - ord('A') + 1
-        
-                        # Title
-                        ws19.cell(row=3, column=col_idx, value=title)
-                        ws19.cell(row=3, column=col_idx).font = Font(bold=True, color="FFFFFF")
-                        ws19.cell(row=3, column=col_idx).fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-                        ws19.merge_cells(start_row=3, start_column=col_idx, end_row=3, end_column=col_idx+1)
-                        
-                        # Sub-headers
-                        ws19.cell(row=4, column=col_idx, value="Word")
-                        ws19.cell(row=4, column=col_idx+1, value="Count")
-                        ws19.cell(row=4, column=col_idx).font = Font(bold=True)
-                        ws19.cell(row=4, column=col_idx+1).font = Font(bold=True)
-        
-                        # Data
-                        if key in keywords_by_rating and keywords_by_rating[key]:
-                            for i, item in enumerate(keywords_by_rating[key][:20], 5):
-                                ws19.cell(row=i, column=col_idx, value=item['word'])
-                                ws19.cell(row=i, column=col_idx+1, value=item['count'])
-
-                # ==========================================
-                # SHEET 20: TOPIC DISCOVERY
-                # ==========================================
-                ws20 = wb.create_sheet("🏷️ Topics")
-
-                ws20['A1'] = "Topic Discovery - Main Themes in Comments"
-                ws20['A1'].font = Font(bold=True, size=16)
-
-                topics = analyzer.get_topic_keywords(n_topics=5, n_words=10)
-
-                if topics:
-                    # Headers
-                    ws20['A3'] = "Topic"
-                    ws20['B3'] = "Mention Count"
-                    ws20['C3'] = "Top Keywords"
-                    for col in ['A3', 'B3', 'C3']:
-                        ws20[col].font = Font(bold=True, color="FFFFFF")
-                        ws20[col].fill = PatternFill(start_color="9C27B0", end_color="9C27B0", fill_type="solid")
-    
-                    # Data
-                    for i, topic in enumerate(topics, 4):
-                        ws20.cell(row=i, column=1, value=topic['topic'])
-                        ws20.cell(row=i, column=2, value=topic['count'])
-                        ws20.cell(row=i, column=3, value=', '.join(topic['keywords']))
-    
-                    # Topic Chart
-                    df_topics = pd.DataFrame(topics)
-                    fig_topic = px.bar(
-                        df_topics.sort_values('count', ascending=True),
-                        y='topic', x='count',
-                        orientation='h',
-                        color='count',
-                        color_continuous_scale=['#9C27B0', '#E91E63'],
-                        title='Topics by Mention Count'
-                    )
-                    fig_topic.update_layout(paper_bgcolor='white', plot_bgcolor='white', height=350, showlegend=False)
-                    img_bytes = fig_to_image_bytes(fig_topic, 500, 350)
-                    img = XLImage(img_bytes)
-                    ws20.add_image(img, 'E3')
-
-                # ==========================================
-                # SHEET 21: SENTIMENT ANALYSIS
-                # ==========================================
-                ws21 = wb.create_sheet("😊 Sentiment")
-                
-                ws21['A1'] = "Sentiment Analysis"
-                ws21['A1'].font = Font(bold=True, size=16)
-
-                # Sentiment Distribution
-                ws21['A3'] = "Sentiment Distribution"
-                ws21['A3'].font = Font(bold=True, size=14)
-
-                sentiment_dist = analyzer.get_comment_sentiment_distribution()
-
-                if len(sentiment_dist) > 0:
-                    ws21['A4'] = "Sentiment"
-                    ws21['B4'] = "Count"
-                    ws21['C4'] = "Percentage"
-                    ws21['D4'] = "Avg Rating"
-                    for col in ['A4', 'B4', 'C4', 'D4']:
-                        ws21[col].font = Font(bold=True, color="FFFFFF")
-                        ws21[col].fill = PatternFill(start_color="607D8B", end_color="607D8B", fill_type="solid")
-                        
-                    sentiment_colors = {'positive': '4CAF50', 'negative': 'D32F2F', 'neutral': '9E9E9E', 'mixed': 'FF9800'}
-    
-                    for i, (_, row) in enumerate(sentiment_dist.iterrows(), 5):
-                        ws21.cell(row=i, column=1, value=row['sentiment'])
-                        ws21.cell(row=i, column=2, value=row['count'])
-                        ws21.cell(row=i, column=3, value=f"{row['percentage']}%")
-                        ws21.cell(row=i, column=4, value=round(row['avg_rating'], 2))
-        
-                        # Color code sentiment
-                        color = sentiment_colors.get(row['sentiment'], '9E9E9E')
-                        ws21.cell(row=i, column=1).fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-                        ws21.cell(row=i, column=1).font = Font(color="FFFFFF")
-    
-                    # Sentiment Pie Chart
-                    fig_sent = px.pie(
-                        sentiment_dist,
-                        values='count',
-                        names='sentiment',
-                        color='sentiment',
-                        color_discrete_map={'positive': '#4CAF50', 'negative': '#D32F2F', 'neutral': '#9E9E9E', 'mixed': '#FF9800'},
-                        title='Sentiment Distribution'
-                    )
-                    fig_sent.update_layout(paper_bgcolor='white', height=350)
-                    img_bytes = fig_to_image_bytes(fig_sent, 450, 350)
-                    img = XLImage(img_bytes)
-                    ws21.add_image(img, 'F3')
-
-                # Rating vs Sentiment Matrix
-                rating_sentiment = analyzer.get_rating_sentiment_matrix()
-
-                if len(rating_sentiment) > 0:
-                    start_row = 12
-    
-                    ws21.cell(row=start_row, column=1, value="Rating vs Sentiment Matrix")
-                    ws21.cell(row=start_row, column=1).font = Font(bold=True, size=14)
-    
-                    # Write matrix
-                    for c_idx, col_name in enumerate(rating_sentiment.columns, 2):
-                        ws21.cell(row=start_row+1, column=c_idx, value=col_name)
-                        ws21.cell(row=start_row+1, column=c_idx).font = Font(bold=True)
-                        
-                        ws21.cell(row=start_row+1, column=1, value="Rating")
-                        ws21.cell(row=start_row+1, column=1).font = Font(bold=True)
-    
-                    for r_idx, (rating, row_data) in enumerate(rating_sentiment.iterrows(), start_row+2):
-                        ws21.cell(row=r_idx, column=1, value=rating)
-                        for c_idx, value in enumerate(row_data, 2):
-                            ws21.cell(row=r_idx, column=c_idx, value=value)
-
-                # ==========================================
-                # SHEET 22: TEXT MINING SUMMARY
-                # ==========================================
-                ws22 = wb.create_sheet("📊 Text Mining Summary")
-                
-                ws22['A1'] = "Text Mining Summary & Insights"
-                ws22['A1'].font = Font(bold=True, size=16)
-
-                ws22['A3'] = "Key Insights"
-                ws22['A3'].font = Font(bold=True, size=14)
-
-                insights = []
-
-                # Top word
-                if word_freq:
-                    top_word = list(word_freq.keys())[0]
-                    top_count = word_freq[top_word]
-                    insights.append(f"Most frequent word: '{top_word}' ({top_count} mentions)")
-
-                # Top bigram
-                if len(bigrams) > 0:
-                    top_phrase = bigrams.iloc[0]['phrase']
-                    phrase_count = bigrams.iloc[0]['count']
-                    insights.append(f"Most common phrase: '{top_phrase}' ({phrase_count} mentions)")
-
-                # Top topic
-                if topics:
-                    top_topic = topics[0]['topic']
-                    topic_count = topics[0]['count']
-                    insights.append(f"Main topic: '{top_topic}' ({topic_count} mentions)")
-
-                # Sentiment
-                if len(sentiment_dist) > 0:
-                    positive_pct = sentiment_dist[sentiment_dist['sentiment'] == 'positive']['percentage'].values
-                    negative_pct = sentiment_dist[sentiment_dist['sentiment'] == 'negative']['percentage'].values
-                    if len(positive_pct) > 0:
-                        insights.append(f"Positive sentiment: {positive_pct[0]}%")
-                    if len(negative_pct) > 0:
-                        insights.append(f"Negative sentiment: {negative_pct[0]}%")
-
-                # Keywords insight
-                if keywords_by_rating:
-                    if 'low' in keywords_by_rating and keywords_by_rating['low']:
-                        low_words = [item['word'] for item in keywords_by_rating['low'][:3]]
-                        insights.append(f"Unhappy customers mention: {', '.join(low_words)}")
-                    if 'high' in keywords_by_rating and keywords_by_rating['high']:
-                        high_words = [item['word'] for item in keywords_by_rating['high'][:3]]
-                        insights.append(f"Happy customers mention: {', '.join(high_words)}")
-
-                # Write insights
-                for i, insight in enumerate(insights, 4):
-                    ws22.cell(row=i, column=1, value=f"• {insight}")
-
-                # Recommendations
-                ws22.cell(row=len(insights)+6, column=1, value="Recommendations Based on Text Analysis")
-                ws22.cell(row=len(insights)+6, column=1).font = Font(bold=True, size=14)
-
-                recommendations = [
-    "1. Address the most frequent negative phrases in customer training",
-    "2. Highlight positive keywords in marketing materials",
-    "3. Create targeted responses for each topic category",
-    "4. Monitor sentiment trends over time",
-    "5. Focus on converting neutral sentiment to positive"
-                ]
-
-                for i, rec in enumerate(recommendations, len(insights)+7):
-                    ws22.cell(row=i, column=1, value=rec)
-                
-                # ==========================================
-                # SHEET 23: ML - DETRACTOR PREDICTION
-                # ==========================================
-                ws23 = wb.create_sheet("🎯 ML Detractor Prediction")
-                
-                ws23['A1'] = "Machine Learning: Detractor Prediction Model"
-                ws23['A1'].font = Font(bold=True, size=16)
-
-                # Initialize ML Analyzer
-                from ml_analyzer import ShilaMLAnalyzer
-                from config import COLS
-                ml_analyzer = ShilaMLAnalyzer(df, COLS)
-
-                try:
-                    detractor_results = ml_analyzer.train_detractor_model()
-                    
-                    if 'error' not in detractor_results:
-                        # Model Performance
-                        ws23['A3'] = "Model Performance"
-                        ws23['A3'].font = Font(bold=True, size=14)
-        
-                        metrics = [
-                            ('Metric', 'Value'),
-                            ('Accuracy', f"{detractor_results['accuracy']*100:.1f}%"),
-                            ('Precision', f"{detractor_results['precision']*100:.1f}%"),
-                            ('Recall', f"{detractor_results['recall']*100:.1f}%"),
-                            ('F1 Score', f"{detractor_results['f1_score']*100:.1f}%"),
-                            ('Cross-Val Mean', f"{detractor_results['cv_mean']*100:.1f}%"),
-                            ('Train Size', detractor_results['train_size']),
-                            ('Test Size', detractor_results['test_size']),
-                            ('Detractor Rate', f"{detractor_results['detractor_rate']}%")
-                        ]
-        
-                    for i, (metric, value) in enumerate(metrics, 4):
-                        ws23.cell(row=i, column=1, value=metric)
-                        ws23.cell(row=i, column=2, value=value)
-                        if i == 4:
-                            ws23.cell(row=i, column=1).font = Font(bold=True, color="FFFFFF")
-                            ws23.cell(row=i, column=2).font = Font(bold=True, color="FFFFFF")
-                            ws23.cell(row=i, column=1).fill = PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid")
-                            ws23.cell(row=i, column=2).fill = PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid")
-                        
-                        # Feature Importance
-                        ws23['A15'] = "Feature Importance"
-                        ws23['A15'].font = Font(bold=True, size=14)
-                        
-                        ws23['A16'] = "Feature"
-                        ws23['B16'] = "Importance"
-                        ws23['A16'].font = Font(bold=True, color="FFFFFF")
-                        ws23['B16'].font = Font(bold=True, color="FFFFFF")
-                        ws23['A16'].fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
-                        ws23['B16'].fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
-                
-                    for i, feat in enumerate(detractor_results['feature_importance'][:10], 17):
-                        ws23.cell(row=i, column=1, value=feat['feature'])
-                        ws23.cell(row=i, column=2, value=round(feat['importance'], 4))
-        
-                    # Confusion Matrix
-                    ws23['A30'] = "Confusion Matrix"
-                    ws23['A30'].font = Font(bold=True, size=14)
-                    
-                    cm = detractor_results['confusion_matrix']
-                    ws23['B32'] = "Predicted: No"
-                    ws23['C32'] = "Predicted: Yes"
-                    ws23['A33'] = "Actual: No"
-                    ws23['A34'] = "Actual: Yes"
-                    ws23['B33'] = cm[0][0]
-                    ws23['C33'] = cm[0][1]
-                    ws23['B34'] = cm[1][0]
-                    ws23['C34'] = cm[1][1]
-                
-                    # Feature Importance Chart
-                    feat_df = pd.DataFrame(detractor_results['feature_importance'][:10])
-                    feat_df = feat_df.sort_values('importance', ascending=True)
-                    
-                    fig_feat = px.bar(
-                        feat_df, y='feature', x='importance',
-                        orientation='h',
-                        color='importance',
-                        color_continuous_scale=['#FFC107', '#4CAF50'],
-                        title='Feature Importance for Detractor Prediction'
-                        )
-                    fig_feat.update_layout(paper_bgcolor='white', plot_bgcolor='white', height=400, showlegend=False)
-                    img_bytes = fig_to_image_bytes(fig_feat, 500, 400)
-                    img = XLImage(img_bytes)
-                    ws23.add_image(img, 'E3')
-                
-                    # High Risk Customers
-                    ws23['A38'] = "High Risk Customers (Top 30)"
-                    ws23['A38'].font = Font(bold=True, size=14)
-                
-                    high_risk = ml_analyzer.predict_detractor_risk(top_n=30)
-                    if len(high_risk) > 0:
-                        for c_idx, col_name in enumerate(high_risk.columns, 1):
-                            cell = ws23.cell(row=39, column=c_idx, value=col_name)
-                            cell.font = Font(bold=True, color="FFFFFF")
-                            cell.fill = PatternFill(start_color="D32F2F", end_color="D32F2F", fill_type="solid")
-                        
-                        for r_idx, (_, row_data) in enumerate(high_risk.iterrows(), 40):
-                            for c_idx, value in enumerate(row_data, 1):
-                                if isinstance(value, float):
-                                    ws23.cell(row=r_idx, column=c_idx, value=round(value, 3))
-                                else:
-                                    ws23.cell(row=r_idx, column=c_idx, value=value)
-                        else:
-                            ws23['A3'] = f"Error: {detractor_results['error']}"
-                except Exception as e:
-                    ws23['A3'] = f"ML Analysis Error: {str(e)}"
-
-                # ==========================================
-                # SHEET 24: ML - CUSTOMER CLUSTERING
-                # ==========================================
-                ws24 = wb.create_sheet("👥 ML Clustering")
-                
-                ws24['A1'] = "Machine Learning: Customer Clustering"
-                ws24['A1'].font = Font(bold=True, size=16)
-
-                try:
-                    cluster_results = ml_analyzer.perform_clustering(n_clusters=5)
-    
-                    if 'error' not in cluster_results:
-                        # Cluster Profiles
-                        ws24['A3'] = "Cluster Profiles"
-                        ws24['A3'].font = Font(bold=True, size=14)
-                        
-                        cluster_df = pd.DataFrame(cluster_results['cluster_stats'])
-                        
-                        # Headers
-                        headers = ['Cluster', 'Name', 'Size', 'Percentage', 'Avg Rating', 'Avg NPS', 'Promoter %', 'Detractor %']
-                        for c_idx, header in enumerate(headers, 1):
-                            cell = ws24.cell(row=4, column=c_idx, value=header)
-                            cell.font = Font(bold=True, color="FFFFFF")
-                            cell.fill = PatternFill(start_color="9C27B0", end_color="9C27B0", fill_type="solid")
-        
-                        # Data
-                        for r_idx, (_, row) in enumerate(cluster_df.iterrows(), 5):
-                            ws24.cell(row=r_idx, column=1, value=row.get('cluster', ''))
-                            ws24.cell(row=r_idx, column=2, value=row.get('cluster_name', ''))
-                            ws24.cell(row=r_idx, column=3, value=row.get('size', 0))
-                            ws24.cell(row=r_idx, column=4, value=f"{row.get('percentage', 0)}%")
-                            ws24.cell(row=r_idx, column=5, value=row.get('avg_rating', ''))
-                            ws24.cell(row=r_idx, column=6, value=row.get('avg_nps', ''))
-                            ws24.cell(row=r_idx, column=7, value=f"{row.get('promoter_pct', 0)}%")
-                            ws24.cell(row=r_idx, column=8, value=f"{row.get('detractor_pct', 0)}%")
-                            
-                        # Cluster Size Chart
-                        fig_cluster = px.pie(
-                            cluster_df,
-                            values='size',
-                            names='cluster_name',
-                            title='Customer Cluster Distribution',
-                            color_discrete_sequence=['#4CAF50', '#8BC34A', '#FFC107', '#FF9800', '#F44336']
-                        )
-                        fig_cluster.update_layout(paper_bgcolor='white', height=400)
-                        img_bytes = fig_to_image_bytes(fig_cluster, 500, 400)
-                        img = XLImage(img_bytes)
-                        ws24.add_image(img, 'J3')
-        
-                        # Cluster Comparison Chart
-                        fig_compare = px.bar(
-                            cluster_df,
-                            x='cluster_name',
-                            y=['avg_rating', 'avg_nps'],
-                            barmode='group',
-                            title='Cluster Comparison: Rating vs NPS',
-                            color_discrete_sequence=['#4CAF50', '#2196F3']
-                        )
-                        fig_compare.update_layout(paper_bgcolor='white', plot_bgcolor='white', height=350)
-                        img_bytes = fig_to_image_bytes(fig_compare, 500, 350)
-                        img = XLImage(img_bytes)
-                        ws24.add_image(img, 'J22')
-                    else:
-                        ws24['A3'] = f"Error: {cluster_results['error']}"
-                except Exception as e:
-                    ws24['A3'] = f"Clustering Error: {str(e)}"
-
-                # ==========================================
-                # SHEET 25: ML - ASSOCIATION RULES
-                # ==========================================
-                ws25 = wb.create_sheet("🔗 ML Association Rules")
-                
-                ws25['A1'] = "Machine Learning: Association Rules"
-                ws25['A1'].font = Font(bold=True, size=16)
-                ws25['A2'] = "Which issues frequently occur together"
-                ws25['A2'].font = Font(italic=True, color="666666")
-
-                try:
-                    rules_results = ml_analyzer.get_association_rules(min_support=0.01, min_confidence=0.3)
-    
-                    if 'error' not in rules_results:
-                        # Summary
-                        ws25['A4'] = f"Total Transactions: {rules_results['total_transactions']:,}"
-                        ws25['A5'] = f"Unique Items: {rules_results['unique_items']}"
-                        ws25['A6'] = f"Rules Found: {len(rules_results['rules'])}"
-                        
-                        # Association Rules Table
-                        ws25['A8'] = "Association Rules"
-                        ws25['A8'].font = Font(bold=True, size=14)
-                        
-                        rule_headers = ['IF (Antecedent)', 'THEN (Consequent)', 'Support', 'Confidence', 'Lift']
-                        for c_idx, header in enumerate(rule_headers, 1):
-                            cell = ws25.cell(row=9, column=c_idx, value=header)
-                            cell.font = Font(bold=True, color="FFFFFF")
-                            cell.fill = PatternFill(start_color="FF9800", end_color="FF9800", fill_type="solid")
-                            
-                        for r_idx, rule in enumerate(rules_results['rules'], 10):
-                            ws25.cell(row=r_idx, column=1, value=rule['if'])
-                            ws25.cell(row=r_idx, column=2, value=rule['then'])
-                            ws25.cell(row=r_idx, column=3, value=f"{rule['support']:.1%}")
-                            ws25.cell(row=r_idx, column=4, value=f"{rule['confidence']:.1%}")
-                            ws25.cell(row=r_idx, column=5, value=rule['lift'])
-            
-                            # Color code lift
-                            lift_cell = ws25.cell(row=r_idx, column=5)
-                            if rule['lift'] > 1.5:
-                                lift_cell.fill = PatternFill(start_color="C8E6C9", end_color="C8E6C9", fill_type="solid")
-                            elif rule['lift'] < 1:
-                                lift_cell.fill = PatternFill(start_color="FFCDD2", end_color="FFCDD2", fill_type="solid")
-        
-                        # Frequent Itemsets
-                        start_row = 10 + len(rules_results['rules']) + 3
-                        ws25.cell(row=start_row, column=1, value="Frequent Issue Combinations")
-                        ws25.cell(row=start_row, column=1).font = Font(bold=True, size=14)
-                        
-                        item_headers = ['Items', 'Support', 'Count']
-                        for c_idx, header in enumerate(item_headers, 1):
-                            cell = ws25.cell(row=start_row+1, column=c_idx, value=header)
-                            cell.font = Font(bold=True, color="FFFFFF")
-                            cell.fill = PatternFill(start_color="607D8B", end_color="607D8B", fill_type="solid")
-                            
-                        for r_idx, item in enumerate(rules_results['frequent_itemsets'], start_row+2):
-                            ws25.cell(row=r_idx, column=1, value=item['items'])
-                            ws25.cell(row=r_idx, column=2, value=f"{item['support']:.1%}")
-                            ws25.cell(row=r_idx, column=3, value=item['count'])
-                    else:
-                        ws25['A4'] = f"Error: {rules_results['error']}"
-                except Exception as e:
-                    ws25['A4'] = f"Association Rules Error: {str(e)}"
-
-                # ==========================================
-                # SHEET 26: ML - ANOMALY DETECTION
-                # ==========================================
-                ws26 = wb.create_sheet("🚨 ML Anomaly Detection")
-                
-                ws26['A1'] = "Machine Learning: Anomaly Detection"
-                ws26['A1'].font = Font(bold=True, size=16)
-                ws26['A2'] = "Find unusual patterns in customer feedback"
-                ws26['A2'].font = Font(italic=True, color="666666")
-
-                try:
-                    anomaly_results = ml_analyzer.detect_anomalies(contamination=0.05)
-    
-                    if 'error' not in anomaly_results:
-                        stats = anomaly_results['stats']
-        
-                        # Summary Metrics
-                        ws26['A4'] = "Summary"
-                        ws26['A4'].font = Font(bold=True, size=14)
-        
-                        summary_data = [
-                            ('Metric', 'Value'),
-                            ('Total Anomalies', stats['total_anomalies']),
-                            ('Anomaly Rate', f"{stats['anomaly_rate']}%"),
-                            ('Anomaly Avg Rating', stats.get('anomaly_avg_rating', 'N/A')),
-                            ('Normal Avg Rating', stats.get('normal_avg_rating', 'N/A')),
-                            ('Anomaly Avg NPS', stats.get('anomaly_avg_nps', 'N/A')),
-                            ('Normal Avg NPS', stats.get('normal_avg_nps', 'N/A'))
-                        ]
-        
-                        for i, (metric, value) in enumerate(summary_data, 5):
-                            ws26.cell(row=i, column=1, value=metric)
-                            ws26.cell(row=i, column=2, value=value)
-                            if i == 5:
-                                ws26.cell(row=i, column=1).font = Font(bold=True, color="FFFFFF")
-                                ws26.cell(row=i, column=2).font = Font(bold=True, color="FFFFFF")
-                                ws26.cell(row=i, column=1).fill = PatternFill(start_color="D32F2F", end_color="D32F2F", fill_type="solid")
-                                ws26.cell(row=i, column=2).fill = PatternFill(start_color="D32F2F", end_color="D32F2F", fill_type="solid")
-                                
-                        # Anomaly Types
-                        if anomaly_results['anomaly_types']:
-                            ws26['A14'] = "Anomaly Types Detected"
-                            ws26['A14'].font = Font(bold=True, size=14)
-                            
-                            type_headers = ['Type', 'Description', 'Count', 'Icon']
-                            for c_idx, header in enumerate(type_headers, 1):
-                                cell = ws26.cell(row=15, column=c_idx, value=header)
-                                cell.font = Font(bold=True, color="FFFFFF")
-                                cell.fill = PatternFill(start_color="FF9800", end_color="FF9800", fill_type="solid")
-            
-                            for r_idx, atype in enumerate(anomaly_results['anomaly_types'], 16):
-                                ws26.cell(row=r_idx, column=1, value=atype['type'])
-                                ws26.cell(row=r_idx, column=2, value=atype['description'])
-                                ws26.cell(row=r_idx, column=3, value=atype['count'])
-                                ws26.cell(row=r_idx, column=4, value=atype['icon'])
-        
-                        # Top Anomalies
-                        ws26['A22'] = "Top Anomalies to Review"
-                        ws26['A22'].font = Font(bold=True, size=14)
-                        
-                        top_anomalies = anomaly_results['top_anomalies']
-                        if top_anomalies:
-                            headers = list(top_anomalies[0].keys())
-                            for c_idx, header in enumerate(headers, 1):
-                                cell = ws26.cell(row=23, column=c_idx, value=header)
-                                cell.font = Font(bold=True, color="FFFFFF")
-                                cell.fill = PatternFill(start_color="9C27B0", end_color="9C27B0", fill_type="solid")
-            
-                            for r_idx, anomaly in enumerate(top_anomalies[:20], 24):
-                                for c_idx, key in enumerate(headers, 1):
-                                    value = anomaly.get(key, '')
-                                    if isinstance(value, float):
-                                        value = round(value, 3)
-                                        ws26.cell(row=r_idx, column=c_idx, value=value)
-                    else:
-                        ws26['A4'] = f"Error: {anomaly_results['error']}"
-                except Exception as e:
-                    ws26['A4'] = f"Anomaly Detection Error: {str(e)}"
-
-                # ==========================================
-                # SHEET 27: ML - CHURN PREDICTION
-                # ==========================================
-                ws27 = wb.create_sheet("📉 ML Churn Prediction")
-
-                ws27['A1'] = "Machine Learning: Churn Prediction"
-                ws27['A1'].font = Font(bold=True, size=16)
-                ws27['A2'] = "Predict which customers are likely to stop ordering"
-                ws27['A2'].font = Font(italic=True, color="666666")
-
-                try:
-                    churn_results = ml_analyzer.train_churn_model()
-                    
-                    if 'error' not in churn_results:
-                        # Model Performance
-                        ws27['A4'] = "Model Performance"
-                        ws27['A4'].font = Font(bold=True, size=14)
-                        
-                        metrics = [
-                            ('Metric', 'Value'),
-                            ('Accuracy', f"{churn_results['accuracy']*100:.1f}%"),
-                            ('Precision', f"{churn_results['precision']*100:.1f}%"),
-                            ('Recall', f"{churn_results['recall']*100:.1f}%"),
-                            ('F1 Score', f"{churn_results['f1_score']*100:.1f}%"),
-                            ('Churn Rate', f"{churn_results['churn_rate']}%")
-                        ]
-        
-                        for i, (metric, value) in enumerate(metrics, 5):
-                            ws27.cell(row=i, column=1, value=metric)
-                            ws27.cell(row=i, column=2, value=value)
-                            if i == 5:
-                                ws27.cell(row=i, column=1).font = Font(bold=True, color="FFFFFF")
-                                ws27.cell(row=i, column=2).font = Font(bold=True, color="FFFFFF")
-                                ws27.cell(row=i, column=1).fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
-                                ws27.cell(row=i, column=2).fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
-        
-                        # Note about proxy model
-                        ws27['A12'] = "Note: This is a proxy model based on rating/NPS/issues. True churn requires repeat customer data."
-                        ws27['A12'].font = Font(italic=True, color="666666")
-                        
-                        # Feature Importance
-                        ws27['A14'] = "Feature Importance"
-                        ws27['A14'].font = Font(bold=True, size=14)
-                        
-                        ws27['A15'] = "Feature"
-                        ws27['B15'] = "Importance"
-                        ws27['A15'].font = Font(bold=True, color="FFFFFF")
-                        ws27['B15'].font = Font(bold=True, color="FFFFFF")
-                        ws27['A15'].fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
-                        ws27['B15'].fill = PatternFill(start_color="2196F3", end_color="2196F3", fill_type="solid")
-                        
-                        for i, feat in enumerate(churn_results['feature_importance'], 16):
-                            ws27.cell(row=i, column=1, value=feat['feature'])
-                            ws27.cell(row=i, column=2, value=round(feat['importance'], 4))
-        
-                        # Confusion Matrix
-                        ws27['A22'] = "Confusion Matrix"
-                        ws27['A22'].font = Font(bold=True, size=14)
-                        
-                        cm = churn_results['confusion_matrix']
-                        ws27['B24'] = "Pred: Stay"
-                        ws27['C24'] = "Pred: Churn"
-                        ws27['A25'] = "Actual: Stay"
-                        ws27['A26'] = "Actual: Churn"
-                        ws27['B25'] = cm[0][0]
-                        ws27['C25'] = cm[0][1]
-                        ws27['B26'] = cm[1][0]
-                        ws27['C26'] = cm[1][1]
-                        
-                        # High Churn Risk Customers
-                        ws27['A30'] = "High Churn Risk Customers (Top 30)"
-                        ws27['A30'].font = Font(bold=True, size=14)
-                        
-                        churn_risk = ml_analyzer.predict_churn_risk(top_n=30)
-                        if len(churn_risk) > 0:
-                            for c_idx, col_name in enumerate(churn_risk.columns, 1):
-                                cell = ws27.cell(row=31, column=c_idx, value=col_name)
-                                cell.font = Font(bold=True, color="FFFFFF")
-                                cell.fill = PatternFill(start_color="F44336", end_color="F44336", fill_type="solid")
-            
-                            for r_idx, (_, row_data) in enumerate(churn_risk.iterrows(), 32):
-                                for c_idx, value in enumerate(row_data, 1):
-                                    if isinstance(value, float):
-                                        ws27.cell(row=r_idx, column=c_idx, value=round(value, 3))
-                                    else:
-                                        ws27.cell(row=r_idx, column=c_idx, value=value)
-        
-                        # Chart
-                        feat_df = pd.DataFrame(churn_results['feature_importance'])
-                        feat_df = feat_df.sort_values('importance', ascending=True)
-                        
-                        fig_churn = px.bar(
-                            feat_df, y='feature', x='importance',
-                            orientation='h',
-                            color='importance',
-                            color_continuous_scale=['#BBDEFB', '#2196F3'],
-                            title='Feature Importance for Churn Prediction'
-                            )
-                        fig_churn.update_layout(paper_bgcolor='white', plot_bgcolor='white', height=300, showlegend=False)
-                        img_bytes = fig_to_image_bytes(fig_churn, 450, 300)
-                        img = XLImage(img_bytes)
-                        ws27.add_image(img, 'E4')
-                    else:
-                        ws27['A4'] = f"Error: {churn_results['error']}"
-                except Exception as e:
-                    ws27['A4'] = f"Churn Prediction Error: {str(e)}"
-
-                # ==========================================
-                # SHEET 28: ML SUMMARY
-                # ==========================================
-                ws28 = wb.create_sheet("📊 ML Summary")
-                
-                ws28['A1'] = "Machine Learning Analysis Summary"
-                ws28['A1'].font = Font(bold=True, size=16)
-                
-                ws28['A3'] = "Models Trained"
-                ws28['A3'].font = Font(bold=True, size=14)
-
-                ml_models = [
-                    ('Model', 'Purpose', 'Key Metric', 'Status'),
-                    ('Detractor Prediction', 'Predict unhappy customers before they complain', 'F1 Score', '✅ Trained'),
-                    ('Customer Clustering', 'Find natural customer segments', '5 Clusters', '✅ Trained'),
-                    ('Association Rules', 'Find issue combinations', 'Lift Score', '✅ Trained'),
-                    ('Anomaly Detection', 'Find unusual patterns', 'Anomaly Rate', '✅ Trained'),
-                    ('Churn Prediction', 'Predict customer churn', 'F1 Score', '✅ Trained')
-                    ]
-                
-                for i, row_data in enumerate(ml_models, 4):
-                    for j, value in enumerate(row_data, 1):
-                        cell = ws28.cell(row=i, column=j, value=value)
-                        if i == 4:
-                            cell.font = Font(bold=True, color="FFFFFF")
-                            cell.fill = PatternFill(start_color="673AB7", end_color="673AB7", fill_type="solid")
-                            
-                ws28['A12'] = "Key Insights"
-                ws28['A12'].font = Font(bold=True, size=14)
-
-                insights = [
-                    "1. Use Detractor Prediction to identify at-risk customers before they leave bad reviews",
-                    "2. Customer Clustering reveals 5 distinct segments - target each with specific strategies",
-                    "3. Association Rules show which issues tend to occur together - fix root causes",
-                    "4. Anomaly Detection flags suspicious patterns that may indicate fraud or system errors",
-                    "5. Churn Prediction helps prioritize retention efforts on high-risk customers"
-                    ]
-
-                for i, insight in enumerate(insights, 13):
-                    ws28.cell(row=i, column=1, value=insight)
-                    
-                ws28['A20'] = "Recommendations"
-                ws28['A20'].font = Font(bold=True, size=14)
-
-                recommendations = [
-                    "• Train models weekly with new data for best accuracy",
-                    "• Focus retention efforts on High Risk detractor/churn customers",
-                    "• Investigate anomalies promptly - they may indicate fraud",
-                    "• Use clustering insights for targeted marketing campaigns",
-                    "• Address issue combinations identified by association rules"
-                    ]
-
-                for i, rec in enumerate(recommendations, 21):
-                    ws28.cell(row=i, column=1, value=rec)
-                
-                # ==========================================
-                # SAVE WORKBOOK
-                # ==========================================
-                wb.save(fp)
+                from reports import build_excel_report
+                build_excel_report(analyzer, st.session_state.df, fp, ts)
                 
                 # Download button
                 with open(fp, 'rb') as f:
@@ -3785,370 +2501,8 @@ with c_exp_3:
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Build comprehensive markdown report
-        md_content = f"""# 📊 Shila Restaurant - Analysis Report
-**Generated:** {ts}
-
----
-
-## 📈 Key Performance Indicators
-| Metric | Value |
-|--------|-------|
-| NPS Score | {kpis['nps_score']} |
-| Average Rating | {kpis['avg_rating']} / 5 |
-| Total Orders | {kpis['total_orders']:,} |
-| Promoters | {kpis['promoters']:,} |
-| Detractors | {kpis['detractors']:,} |
-| Response Rate | {kpis['response_rate']}% |
-
----
-
-## 🚨 Top Issues (Pain Points)
-"""
-        for _, r in analyzer.get_top_issues(10).iterrows():
-            md_content += f"- **{r['Issue']}**: {r['Count']} mentions\n"
-        
-        md_content += "\n---\n\n## 🏆 Top Strengths\n"
-        for _, r in analyzer.get_top_strengths(10).iterrows():
-            md_content += f"- **{r['Strength']}**: {r['Count']} mentions\n"
-        
-        # Pareto Analysis
-        pareto = analyzer.get_pareto_analysis()
-        if len(pareto) > 0:
-            md_content += "\n---\n\n## 📊 Pareto Analysis (Top 5 Issues by Impact)\n"
-            md_content += "| Issue | Damage Score | Frequency | Avg Rating |\n"
-            md_content += "|-------|-------------|-----------|------------|\n"
-            for _, r in pareto.head(5).iterrows():
-                md_content += f"| {r['tag']} | {r['total_damage']} | {r['frequency']} | {r['avg_rating']} |\n"
-        
-        # Branch Analysis
-        br_stats, _ = analyzer.get_branch_analysis()
-        if len(br_stats) > 0:
-            md_content += "\n---\n\n## 🏪 Branch Performance\n"
-            md_content += "### ✅ Best Performing Branches\n"
-            for _, r in br_stats.head(3).iterrows():
-                nps_txt = f", NPS {r['nps_score']:.1f}" if 'nps_score' in r else ""
-                md_content += f"- **{r['branch']}**: Rating {r['avg_rating']:.2f}{nps_txt} ({int(r['order_count'])} orders)\n"
-            md_content += "\n### ⚠️ Needs Improvement\n"
-            for _, r in br_stats.tail(3).iterrows():
-                nps_txt = f", NPS {r['nps_score']:.1f}" if 'nps_score' in r else ""
-                md_content += f"- **{r['branch']}**: Rating {r['avg_rating']:.2f}{nps_txt} ({int(r['order_count'])} orders)\n"
-        
-        # Customer Segments
-        recovery = analyzer.get_recovery_opportunities()
-        if len(recovery) > 0:
-            md_content += "\n---\n\n## 🎯 Customer Segments\n"
-            md_content += "| Segment | Persian | Count | Percentage |\n"
-            md_content += "|---------|---------|-------|------------|\n"
-            for _, r in recovery.iterrows():
-                md_content += f"| {r['emoji']} {r['segment']} | {r['segment_fa']} | {r['count']:,} | {r['percentage']}% |\n"
-        
-        # Issue Categories
-        issue_cats = analyzer.get_issue_category_analysis()
-        if len(issue_cats) > 0:
-            md_content += "\n---\n\n## ⚠️ Issue Category Impact\n"
-            md_content += "| Category | Issues | % of Orders | Rating Impact | Top Problems |\n"
-            md_content += "|----------|--------|-------------|---------------|---------------|\n"
-            for _, r in issue_cats.iterrows():
-                md_content += f"| {r['category_fa']} | {r['issue_count']} | {r['issue_pct']}% | -{r['rating_impact']:.2f} | {r['top_issues']} |\n"
-        
-        # Month-over-Month
-        mom = analyzer.get_mom_comparison()
-        if len(mom) > 1:
-            md_content += "\n---\n\n## 📅 Month-over-Month Trend\n"
-            md_content += "| Month | Orders | Avg Rating | NPS Score |\n"
-            md_content += "|-------|--------|------------|------------|\n"
-            for _, r in mom.tail(6).iterrows():
-                nps_txt = f"{r['nps_score']:.1f}" if 'nps_score' in r and pd.notna(r['nps_score']) else "N/A"
-                md_content += f"| {r['year_month']} | {int(r['order_count'])} | {r['avg_rating']:.2f} | {nps_txt} |\n"
-            
-            latest = mom.iloc[-1]
-            md_content += f"\n**Latest Trend:**\n"
-            md_content += f"- Rating Change: {latest['rating_change']:+.2f}\n"
-            md_content += f"- Orders Change: {latest['orders_change_pct']:+.1f}%\n"
-            if 'nps_change' in latest and pd.notna(latest['nps_change']):
-                md_content += f"- NPS Change: {latest['nps_change']:+.1f}\n"
-        
-        # Product Analysis
-        products = analyzer.get_product_analysis()
-        if len(products) > 0:
-            md_content += "\n---\n\n## 🍔 Product Performance\n"
-            md_content += "### ⭐ Top Rated Products\n"
-            md_content += "| Rank | Product | Rating | Orders |\n"
-            md_content += "|------|---------|--------|--------|\n"
-            for _, r in products.head(5).iterrows():
-                md_content += f"| {int(r['rank'])} | {r['product']} | {r['avg_rating']:.2f} | {int(r['order_count'])} |\n"
-            
-            if len(products) > 5:
-                md_content += "\n### 📉 Needs Attention\n"
-                md_content += "| Product | Rating | Orders |\n"
-                md_content += "|---------|--------|--------|\n"
-                for _, r in products.tail(3).iterrows():
-                    md_content += f"| {r['product']} | {r['avg_rating']:.2f} | {int(r['order_count'])} |\n"
-        
-        # Aspect Sentiment
-        aspects = analyzer.get_aspect_sentiment()
-        if len(aspects) > 0:
-            md_content += "\n---\n\n## 🎭 Aspect Sentiment Analysis\n"
-            md_content += "| Aspect | Mentions | Avg Rating | Positive % | Negative % | Sentiment |\n"
-            md_content += "|--------|----------|------------|------------|------------|------------|\n"
-            for _, r in aspects.iterrows():
-                sentiment = "🟢" if r['sentiment_score'] > 0.3 else ("🔴" if r['sentiment_score'] < -0.3 else "🟡")
-                md_content += f"| {r['aspect']} | {r['mentions']} | {r['avg_rating']} | {r['positive_pct']}% | {r['negative_pct']}% | {sentiment} {r['sentiment_score']:.2f} |\n"
-        
-        # Kano Analysis
-        kano = analyzer.get_kano_analysis()
-        if len(kano) > 0:
-            md_content += "\n---\n\n## 🎨 Kano Model Classification\n"
-            for ktype in ['Must-Be', 'Performance', 'Delighter']:
-                ktype_data = kano[kano['kano_type'] == ktype]
-                if len(ktype_data) > 0:
-                    emoji = "🔴" if ktype == "Must-Be" else ("🟡" if ktype == "Performance" else "🟢")
-                    md_content += f"\n### {emoji} {ktype} Attributes\n"
-                    for _, r in ktype_data.iterrows():
-                        md_content += f"- **{r['attribute']}**: Lift {r['lift_as_strength']:+.2f}, Drop {r['drop_as_weakness']:+.2f}\n"
-        
-        # ==========================================
-        # TEXT MINING SECTION
-        # ==========================================
-        md_content += "\n---\n\n## 📝 Text Mining Analysis\n"
-        
-        # Word Frequency
-        word_freq = analyzer.get_word_frequency(min_freq=5, top_n=20)
-        if word_freq:
-            md_content += "\n### ☁️ Most Frequent Words\n"
-            md_content += "| Word | Count |\n|------|-------|\n"
-            for word, count in list(word_freq.items())[:15]:
-                md_content += f"| {word} | {count} |\n"
-        
-        # Bigrams
-        bigrams = analyzer.get_ngram_analysis(n=2, min_freq=3, top_n=15)
-        if len(bigrams) > 0:
-            md_content += "\n### 🔗 Common Phrases (Bigrams)\n"
-            md_content += "| Phrase | Count |\n|--------|-------|\n"
-            for _, row in bigrams.head(10).iterrows():
-                md_content += f"| {row['phrase']} | {row['count']} |\n"
-        
-        # Keywords by Rating
-        keywords_by_rating = analyzer.get_keywords_by_rating(top_n=10)
-        if keywords_by_rating:
-            md_content += "\n### 🎯 Keywords by Rating Level\n"
-            
-            if 'low' in keywords_by_rating and keywords_by_rating['low']:
-                low_words = [item['word'] for item in keywords_by_rating['low'][:8]]
-                md_content += f"\n**⭐ 1-2 Stars (Unhappy customers say):** {', '.join(low_words)}\n"
-            
-            if 'mid' in keywords_by_rating and keywords_by_rating['mid']:
-                mid_words = [item['word'] for item in keywords_by_rating['mid'][:8]]
-                md_content += f"\n**⭐⭐⭐ 3 Stars (Neutral customers say):** {', '.join(mid_words)}\n"
-            
-            if 'high' in keywords_by_rating and keywords_by_rating['high']:
-                high_words = [item['word'] for item in keywords_by_rating['high'][:8]]
-                md_content += f"\n**⭐⭐⭐⭐⭐ 4-5 Stars (Happy customers say):** {', '.join(high_words)}\n"
-        
-        # Topic Discovery
-        topics = analyzer.get_topic_keywords(n_topics=5, n_words=8)
-        if topics:
-            md_content += "\n### 🏷️ Main Topics Discovered\n"
-            md_content += "| Topic | Mentions | Top Keywords |\n|-------|----------|---------------|\n"
-            for topic in topics:
-                keywords_str = ', '.join(topic['keywords'][:5])
-                md_content += f"| {topic['topic']} | {topic['count']} | {keywords_str} |\n"
-        
-        # Sentiment Analysis
-        sentiment_dist = analyzer.get_comment_sentiment_distribution()
-        if len(sentiment_dist) > 0:
-            md_content += "\n### 😊 Sentiment Distribution\n"
-            md_content += "| Sentiment | Count | Percentage | Avg Rating |\n"
-            md_content += "|-----------|-------|------------|------------|\n"
-            for _, row in sentiment_dist.iterrows():
-                emoji = "🟢" if row['sentiment'] == 'positive' else ("🔴" if row['sentiment'] == 'negative' else "🟡")
-                md_content += f"| {emoji} {row['sentiment']} | {row['count']:,} | {row['percentage']}% | {row['avg_rating']:.2f} |\n"
-        
-        # Text Mining Insights Summary
-        md_content += "\n### 💡 Text Mining Key Insights\n"
-        
-        if word_freq:
-            top_word = list(word_freq.keys())[0]
-            md_content += f"- **Most mentioned word:** '{top_word}' ({word_freq[top_word]} times)\n"
-        
-        if len(bigrams) > 0:
-            top_phrase = bigrams.iloc[0]['phrase']
-            md_content += f"- **Most common phrase:** '{top_phrase}' ({bigrams.iloc[0]['count']} times)\n"
-        
-        if topics:
-            md_content += f"- **Main discussion topic:** '{topics[0]['topic']}' ({topics[0]['count']} mentions)\n"
-        
-        if len(sentiment_dist) > 0:
-            pos_row = sentiment_dist[sentiment_dist['sentiment'] == 'positive']
-            neg_row = sentiment_dist[sentiment_dist['sentiment'] == 'negative']
-            if len(pos_row) > 0:
-                md_content += f"- **Positive sentiment:** {pos_row.iloc[0]['percentage']}% of comments\n"
-            if len(neg_row) > 0:
-                md_content += f"- **Negative sentiment:** {neg_row.iloc[0]['percentage']}% of comments\n"
-        
-        # ==========================================
-        # MACHINE LEARNING SECTION
-        # ==========================================
-        md_content += "\n---\n\n## 🤖 Machine Learning Analysis\n"
-        
-        # Initialize ML Analyzer
-        from ml_analyzer import ShilaMLAnalyzer
-        from config import COLS
-        ml_analyzer = ShilaMLAnalyzer(df, COLS)
-        
-        # Detractor Prediction
-        md_content += "\n### 🎯 Detractor Prediction Model\n"
-        
-        try:
-            detractor_results = ml_analyzer.train_detractor_model()
-            
-            if 'error' not in detractor_results:
-                md_content += "**Model Performance:**\n"
-                md_content += "| Metric | Value |\n|--------|-------|\n"
-                md_content += f"| Accuracy | {detractor_results['accuracy']*100:.1f}% |\n"
-                md_content += f"| Precision | {detractor_results['precision']*100:.1f}% |\n"
-                md_content += f"| Recall | {detractor_results['recall']*100:.1f}% |\n"
-                md_content += f"| F1 Score | {detractor_results['f1_score']*100:.1f}% |\n"
-                md_content += f"| Detractor Rate | {detractor_results['detractor_rate']}% |\n"
-                
-                md_content += "\n**Top Features (What Predicts Detractors):**\n"
-                for feat in detractor_results['feature_importance'][:5]:
-                    md_content += f"- {feat['feature']}: {feat['importance']:.3f}\n"
-                
-                # High risk customers summary
-                high_risk = ml_analyzer.predict_detractor_risk(top_n=10)
-                if len(high_risk) > 0:
-                    high_count = len(high_risk[high_risk['risk_level'] == 'High'])
-                    md_content += f"\n**⚠️ High Risk Customers:** {high_count} customers identified as high detractor risk\n"
-            else:
-                md_content += f"*Model training error: {detractor_results['error']}*\n"
-        except Exception as e:
-            md_content += f"*Could not train detractor model: {str(e)}*\n"
-        
-        # Customer Clustering
-        md_content += "\n### 👥 Customer Clustering\n"
-        
-        try:
-            cluster_results = ml_analyzer.perform_clustering(n_clusters=5)
-            
-            if 'error' not in cluster_results:
-                md_content += "**Cluster Profiles:**\n"
-                md_content += "| Cluster | Size | % | Avg Rating | Avg NPS |\n"
-                md_content += "|---------|------|---|------------|--------|\n"
-                
-                for cluster in cluster_results['cluster_stats']:
-                    md_content += f"| {cluster.get('cluster_name', 'N/A')} | {cluster['size']:,} | {cluster['percentage']}% | {cluster.get('avg_rating', 'N/A')} | {cluster.get('avg_nps', 'N/A')} |\n"
-                
-                md_content += "\n**Cluster Insights:**\n"
-                md_content += "- Champions: Highest rating & NPS - your best customers\n"
-                md_content += "- At Risk/Critical: Need immediate attention and recovery efforts\n"
-            else:
-                md_content += f"*Clustering error: {cluster_results['error']}*\n"
-        except Exception as e:
-            md_content += f"*Could not perform clustering: {str(e)}*\n"
-        
-        # Association Rules
-        md_content += "\n### 🔗 Association Rules (Issue Combinations)\n"
-        
-        try:
-            rules_results = ml_analyzer.get_association_rules(min_support=0.01, min_confidence=0.3)
-            
-            if 'error' not in rules_results:
-                md_content += f"*Found {len(rules_results['rules'])} rules from {rules_results['total_transactions']:,} transactions*\n\n"
-                
-                md_content += "**Top Association Rules:**\n"
-                md_content += "| IF (Issue) | THEN (Also Occurs) | Confidence | Lift |\n"
-                md_content += "|------------|-------------------|------------|------|\n"
-                
-                for rule in rules_results['rules'][:8]:
-                    lift_emoji = "🟢" if rule['lift'] > 1.5 else ("🟡" if rule['lift'] > 1 else "🔴")
-                    md_content += f"| {rule['if']} | {rule['then']} | {rule['confidence']:.0%} | {lift_emoji} {rule['lift']:.2f} |\n"
-                
-                md_content += "\n**Interpretation:** Lift > 1.5 means issues strongly co-occur. Fix one to potentially fix both.\n"
-            else:
-                md_content += f"*Association rules error: {rules_results['error']}*\n"
-        except Exception as e:
-            md_content += f"*Could not mine association rules: {str(e)}*\n"
-        
-        # Anomaly Detection
-        md_content += "\n### 🚨 Anomaly Detection\n"
-        
-        try:
-            anomaly_results = ml_analyzer.detect_anomalies(contamination=0.05)
-            
-            if 'error' not in anomaly_results:
-                stats = anomaly_results['stats']
-                
-                md_content += "**Anomaly Summary:**\n"
-                md_content += f"- Total Anomalies Found: **{stats['total_anomalies']}** ({stats['anomaly_rate']}% of data)\n"
-                
-                if 'anomaly_avg_rating' in stats:
-                    md_content += f"- Anomaly Avg Rating: {stats['anomaly_avg_rating']} vs Normal: {stats['normal_avg_rating']}\n"
-                
-                if anomaly_results['anomaly_types']:
-                    md_content += "\n**Anomaly Types:**\n"
-                    for atype in anomaly_results['anomaly_types']:
-                        md_content += f"- {atype['icon']} **{atype['type']}**: {atype['count']} cases - {atype['description']}\n"
-                
-                md_content += "\n**Action:** Review flagged anomalies for potential fraud, system errors, or data quality issues.\n"
-            else:
-                md_content += f"*Anomaly detection error: {anomaly_results['error']}*\n"
-        except Exception as e:
-            md_content += f"*Could not detect anomalies: {str(e)}*\n"
-        
-        # Churn Prediction
-        md_content += "\n### 📉 Churn Prediction\n"
-        
-        try:
-            churn_results = ml_analyzer.train_churn_model()
-            
-            if 'error' not in churn_results:
-                md_content += "*Note: Proxy model based on rating/NPS/issues. True churn requires repeat customer data.*\n\n"
-                
-                md_content += "**Model Performance:**\n"
-                md_content += "| Metric | Value |\n|--------|-------|\n"
-                md_content += f"| Accuracy | {churn_results['accuracy']*100:.1f}% |\n"
-                md_content += f"| Precision | {churn_results['precision']*100:.1f}% |\n"
-                md_content += f"| Recall | {churn_results['recall']*100:.1f}% |\n"
-                md_content += f"| Estimated Churn Rate | {churn_results['churn_rate']}% |\n"
-                
-                md_content += "\n**Key Churn Drivers:**\n"
-                for feat in churn_results['feature_importance']:
-                    md_content += f"- {feat['feature']}: {feat['importance']:.3f}\n"
-                
-                # High churn risk summary
-                churn_risk = ml_analyzer.predict_churn_risk(top_n=10)
-                if len(churn_risk) > 0:
-                    high_churn = len(churn_risk[churn_risk['churn_level'] == 'High'])
-                    md_content += f"\n**⚠️ High Churn Risk:** {high_churn} customers at high risk of churning\n"
-            else:
-                md_content += f"*Churn model error: {churn_results['error']}*\n"
-        except Exception as e:
-            md_content += f"*Could not train churn model: {str(e)}*\n"
-        
-        # ML Summary & Recommendations
-        md_content += "\n### 💡 ML-Driven Recommendations\n"
-        md_content += """
-1. **Proactive Outreach**: Contact high detractor-risk customers before they complain
-2. **Segment Marketing**: Tailor campaigns to each customer cluster
-3. **Root Cause Analysis**: Fix issue combinations identified by association rules
-4. **Fraud Prevention**: Investigate anomalies flagged by detection model
-5. **Retention Focus**: Prioritize high churn-risk customers for loyalty programs
-6. **Continuous Learning**: Retrain models monthly with new data
-
-**Data Quality Note:** ML models perform best with:
-- Customer ID for tracking repeat behavior
-- Order timestamps for temporal patterns
-- Complete feedback data (minimize missing values)
-"""
-              
-        # Footer
-        md_content += "\n---\n\n## 📝 Notes for Analysis\n"
-        md_content += "- **NPS Score** ranges from -100 to +100 (yours: " + str(kpis['nps_score']) + ")\n"
-        md_content += "- **Pareto Principle**: Focus on top issues that cause 80% of damage\n"
-        md_content += "- **Kano Types**: Must-Be (fix first), Performance (improve), Delighter (innovate)\n"
-        md_content += "- **Customer Segments**: Prioritize 'At Risk' and 'Silent Churners'\n"
-        md_content += "\n---\n\n*Report generated by InsightForge QFD Dashboard*\n"
+        from reports import build_markdown_report
+        md_content = build_markdown_report(analyzer, st.session_state.df, ts)
         
         # Save file
         fp = os.path.join(NOTEBOOKLM_DIR, f"shila_report_{ts}.md")
@@ -4166,14 +2520,32 @@ with c_exp_3:
         
         st.success(f"✅ Report generated with {len(md_content):,} characters!")
 
-
-
-
-
-
-
-
-
-
-
-
+# --- PERFORMANCE PANEL (only when profiling is enabled: SHILA_PROFILE=1 or ?perf=1) ---
+if profiler.enabled:
+    st.markdown("---")
+    with st.expander("⏱️ Performance", expanded=False):
+        st.caption("Wall time, calls, rows and peak allocation (tracemalloc) per analyzer method and tab render, accumulated over this session.")
+        perf_df = profiler.to_frame()
+        st.dataframe(perf_df, width='stretch', hide_index=True)
+        
+        cache_stats = shared_cache.stats()
+        st.caption(f"Shared cache (all sessions): {cache_stats['entries']} entries, "
+                   f"{cache_stats['mb']} / {cache_stats['max_mb']} MB, hit rate {cache_stats['hit_rate']:.0%} "
+                   f"({cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['evictions']} evictions)")
+        registry_stats = get_upload_registry().stats()
+        st.caption(f"Upload registry (parsed files on disk): {registry_stats['files']} files, "
+                   f"{registry_stats['mb']} / {registry_stats['max_mb']} MB")
+        
+        c_perf_1, c_perf_2 = st.columns(2)
+        with c_perf_1:
+            st.download_button(
+                "📥 Download JSON",
+                profiler.to_json(),
+                f"shila_perf_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                "application/json",
+                width='stretch'
+            )
+        with c_perf_2:
+            if st.button("🔄 Reset Timings", width='stretch'):
+                profiler.reset()
+                st.rerun()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Aspect Matching - one pass over each comment for every keyword in config.ASPECTS
+
+AspectMatcher compiles all aspect keywords into one automaton and returns, per
+comment, a bitmask with bit i set when aspect i (in ASPECTS order) is mentioned.
+Matching is plain substring matching after ي/ك -> ی/ک normalization.
+
+Uses pyahocorasick (Aho-Corasick in C) when installed, otherwise a single
+trie-shaped regex that reports the longest keyword at every position.
+
+    matcher = get_matcher()
+    masks = matcher.scan(df[COLS['COMMENT']])      # uint8 Series for 7 aspects
+    matcher.names(masks.iloc[0])                   # ['Price / قیمت', ...]
+"""
+
+import re
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from config import ASPECTS
+
+AHOCORASICK_AVAILABLE = find_spec('ahocorasick') is not None
+
+
+def normalize_text(text):
+    """Arabic-keyboard yeh/kaf -> Persian (the only normalization keywords rely on)"""
+    return text.replace('ي', 'ی').replace('ك', 'ک')
+
+
+def _trie_pattern(words):
+    """Regex alternation shaped as a prefix trie; greedy, so the longest word wins"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ''
+        body = alternatives[0] if len(alternatives) == 1 and '' not in node else '(?:' + '|'.join(alternatives) + ')'
+        return body + '?' if '' in node else body
+
+    return build(trie)
+
+
+class AspectMatcher:
+    """Multi-keyword matcher built once from an {aspect: [keywords]} dict"""
+
+    def __init__(self, aspects=None):
+        aspects = ASPECTS if aspects is None else aspects
+        self.aspects = list(aspects)
+        self.dtype = np.min_scalar_type((1 << len(self.aspects)) - 1)
+
+        keyword_bits = {}
+        for i, keywords in enumerate(aspects.values()):
+            for kw in keywords:
+                kw = normalize_text(kw)
+                if kw:
+                    keyword_bits[kw] = keyword_bits.get(kw, 0) | (1 << i)
+
+        self._automaton = None
+        self._pattern = None
+        if not keyword_bits:
+            return
+        if AHOCORASICK_AVAILABLE:
+            import ahocorasick
+            self._automaton = ahocorasick.Automaton()
+            for kw, bits in keyword_bits.items():
+                self._automaton.add_word(kw, bits)
+            self._automaton.make_automaton()
+        else:
+            # The regex reports only the longest keyword starting at each position,
+            # so every keyword also carries the bits of the keywords that are its
+            # prefix ('برخورد پیک' -> Delivery + Staff via 'برخورد').
+            self._bits = {
+                kw: self._prefix_bits(kw, keyword_bits) for kw in keyword_bits
+            }
+            self._pattern = re.compile('(?=(' + _trie_pattern(keyword_bits) + '))')
+
+    @staticmethod
+    def _prefix_bits(kw, keyword_bits):
+        bits = 0
+        for end in range(1, len(kw) + 1):
+            bits |= keyword_bits.get(kw[:end], 0)
+        return bits
+
+    def match(self, text):
+        """Bitmask of the aspects mentioned in one comment (0 for empty / missing)"""
+        if text is None or (not isinstance(text, str) and pd.isna(text)):
+            return 0
+        text = normalize_text(str(text))
+        mask = 0
+        if self._automaton is not None:
+            for _, bits in self._automaton.iter(text):
+                mask |= bits
+        elif self._pattern is not None:
+            for kw in set(self._pattern.findall(text)):
+                mask |= self._bits[kw]
+        return mask
+
+    def scan(self, series):
+        """Aspect bitmask for every row; each distinct comment is scanned once"""
+        codes, uniques = pd.factorize(series)
+        masks = np.fromiter((self.match(text) for text in uniques), dtype=self.dtype, count=len(uniques))
+        # Missing values get code -1, which picks the trailing 0
+        return pd.Series(np.append(masks, np.zeros(1, dtype=self.dtype))[codes], index=series.index)
+
+    def bit(self, aspect):
+        return 1 << self.aspects.index(aspect)
+
+    def names(self, mask):
+        """Aspect names for one bitmask, in ASPECTS order"""
+        mask = int(mask)
+        return [aspect for i, aspect in enumerate(self.aspects) if mask >> i & 1]
+
+
+_MATCHER = {}
+
+
+def get_matcher(aspects=None):
+    """Shared matcher for config.ASPECTS (or a custom dict), compiled on first use"""
+    aspects = ASPECTS if aspects is None else aspects
+    key = tuple((name, tuple(keywords)) for name, keywords in aspects.items())
+    if key not in _MATCHER:
+        _MATCHER[key] = AspectMatcher(aspects)
+    return _MATCHER[key]
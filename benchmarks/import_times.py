@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Import-time report - what a cold start of the dashboard costs per module
+
+Every module is imported in a fresh interpreter with `python -X importtime`,
+so numbers are cold (nothing shared between rows). Run from the repo root:
+
+    python benchmarks/import_times.py
+    python benchmarks/import_times.py --json import_times.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What app.py imports before the first tab renders
+APP_STARTUP = [
+    'streamlit', 'pandas', 'plotly.express', 'plotly.graph_objects', 'plotly.subplots',
+    'config', 'analyzer', 'ai_insights', 'data_loader',
+]
+
+# Project modules, then the optional heavy dependencies that are now loaded on first use
+MODULES = [
+    'config', 'analyzer', 'ml_analyzer', 'ai_insights', 'data_loader', 'reports',
+    'streamlit', 'pandas', 'plotly.express',
+    'sklearn.ensemble', 'sklearn.cluster', 'sklearn.decomposition',
+    'mlxtend.frequent_patterns', 'imblearn.over_sampling', 'hazm',
+    'wordcloud', 'matplotlib.pyplot', 'anthropic', 'openpyxl',
+]
+
+_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure(statement, repeat=3):
+    """Cold-import `statement` in a subprocess. Returns (total_ms, {module: cumulative_ms})."""
+    best_total, best_tree = None, {}
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', statement],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            err = proc.stderr.strip().splitlines()
+            return None, {'error': err[-1] if err else 'import failed'}
+        tree = {}
+        total = 0
+        for line in proc.stderr.splitlines():
+            m = _LINE.match(line)
+            if not m:
+                continue
+            cumulative_ms = int(m.group(2)) / 1000
+            depth = len(m.group(3)) // 2
+            tree[m.group(4)] = cumulative_ms
+            if depth == 0:
+                total += cumulative_ms
+        if best_total is None or total < best_total:
+            best_total, best_tree = total, tree
+    return best_total, best_tree
+
+
+def top_level_packages(tree, n=10):
+    """Largest top-level packages pulled in by one import"""
+    packages = {}
+    for name, ms in tree.items():
+        if name == 'error':
+            continue
+        root = name.split('.')[0]
+        if name == root:
+            packages[root] = max(packages.get(root, 0), ms)
+    return sorted(packages.items(), key=lambda x: x[1], reverse=True)[:n]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold import time per module")
+    parser.add_argument('--repeat', type=int, default=3, help="Best of N runs per module")
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {'python': sys.version.split()[0], 'modules': {}, 'app_startup': {}}
+
+    print(f"{'Module':<28}{'Cold import (ms)':>18}")
+    print('-' * 46)
+    for module in MODULES:
+        total, tree = measure(f"import {module}", args.repeat)
+        if total is None:
+            print(f"{module:<28}{'not installed':>18}")
+            results['modules'][module] = {'error': tree.get('error')}
+            continue
+        print(f"{module:<28}{total:>18.1f}")
+        results['modules'][module] = {'ms': round(total, 1), 'top_packages': top_level_packages(tree)}
+
+    statement = '; '.join(f"import {m}" for m in APP_STARTUP)
+    total, tree = measure(statement, args.repeat)
+    print('-' * 46)
+    if total is None:
+        print(f"app.py startup imports failed: {tree.get('error')}")
+    else:
+        print(f"{'app.py startup imports':<28}{total:>18.1f}")
+        print("\nLargest packages at startup:")
+        for name, ms in top_level_packages(tree):
+            print(f"  {name:<26}{ms:>10.1f} ms")
+        heavy = [m.split('.')[0] for m in MODULES[9:]]
+        loaded = sorted({m for m in heavy if m in tree})
+        if loaded:
+            print(f"\nHeavy modules still loaded at startup: {', '.join(loaded)}")
+        results['app_startup'] = {'ms': round(total, 1), 'top_packages': top_level_packages(tree),
+                                  'heavy_loaded': loaded}
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == '__main__':
+    main()
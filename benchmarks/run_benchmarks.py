@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite - ShilaAnalyzer, ShilaMLAnalyzer and report exports
+
+Times the file loaders, every public get_* method, each ML training path and each export on
+synthetic data (see synthetic.py), records tracemalloc peak memory, and writes
+everything to a JSON file so two runs can be compared:
+
+    python benchmarks/run_benchmarks.py --sizes 10000,100000
+    python benchmarks/run_benchmarks.py --sizes 10000 --only analyzer --no-memory
+    python benchmarks/run_benchmarks.py --sizes 100000 --datasets snappfood --only load
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+
+import argparse
+import gc
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from branches import BranchTable
+from config import COLS
+from data_loader import optimize_dtypes
+from synthetic import make_shila_frame, make_snappfood_frame
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DATASETS = {
+    'shila': make_shila_frame,
+    'snappfood': make_snappfood_frame,
+}
+GROUPS = ('load', 'analyzer', 'ml', 'export')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# ML entry points in the order the dashboard calls them
+ML_METHODS = [
+    ('train_detractor_model', {}),
+    ('predict_detractor_risk', {}),
+    ('perform_clustering', {'n_clusters': 5}),
+    ('get_association_rules', {'min_support': 0.01, 'min_confidence': 0.3}),
+    ('detect_anomalies', {'contamination': 0.05}),
+    ('train_churn_model', {}),
+    ('predict_churn_risk', {}),
+]
+
+
+# ==========================================
+# MEASUREMENT
+# ==========================================
+
+def _result_size(result):
+    """Rows (or entries) in whatever an analyzer method returned"""
+    if isinstance(result, (pd.DataFrame, pd.Series, list, dict)):
+        return len(result)
+    if isinstance(result, tuple):
+        return sum(_result_size(r) or 0 for r in result)
+    return None
+
+
+def measure(fn, memory=True):
+    """Run `fn` once. Returns (result, record) with seconds, peak_mb and any error."""
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+    error = None
+    result = None
+    start = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        message = next((line.strip() for line in str(e).splitlines() if line.strip()), '')
+        error = f"{type(e).__name__}: {message}"[:200]
+    elapsed = time.perf_counter() - start
+    peak_mb = None
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = round(peak / 1024 / 1024, 2)
+    record = {'seconds': round(elapsed, 4), 'peak_mb': peak_mb}
+    if isinstance(result, dict) and 'error' in result:
+        error = str(result['error'])
+    if error:
+        record['error'] = error
+    else:
+        record['result_size'] = _result_size(result)
+    return result, record
+
+
+def analyzer_methods(analyzer):
+    """Public get_* methods callable with their defaults"""
+    methods = []
+    for name, fn in inspect.getmembers(analyzer, inspect.ismethod):
+        if not name.startswith('get_'):
+            continue
+        params = inspect.signature(fn).parameters.values()
+        if all(p.default is not inspect.Parameter.empty for p in params):
+            methods.append((name, fn))
+    return methods
+
+
+# ==========================================
+# BENCHMARK GROUPS
+# ==========================================
+
+def bench_analyzer(df, memory=True, skip=()):
+    from analyzer import ShilaAnalyzer
+
+    records = []
+    analyzer, rec = measure(lambda: ShilaAnalyzer(df, COLS, branch_table=BranchTable(None)), memory)
+    records.append({'group': 'analyzer', 'name': '__init__', **rec})
+    if analyzer is None:
+        return records, None
+
+    for name, fn in analyzer_methods(analyzer):
+        if name in skip:
+            continue
+        _, rec = measure(fn, memory)
+        records.append({'group': 'analyzer', 'name': name, **rec})
+        print(f"    {name:<40}{rec['seconds']:>9.3f}s  {rec.get('error', '')}")
+    return records, analyzer
+
+
+def bench_ml(df, memory=True, skip=()):
+    from ml_analyzer import ShilaMLAnalyzer
+
+    records = []
+    ml, rec = measure(lambda: ShilaMLAnalyzer(df, COLS), memory)
+    records.append({'group': 'ml', 'name': '__init__', **rec})
+    if ml is None:
+        return records
+
+    for name, kwargs in ML_METHODS:
+        if name in skip:
+            continue
+        _, rec = measure(lambda: getattr(ml, name)(**kwargs), memory)
+        records.append({'group': 'ml', 'name': name, **rec})
+        print(f"    {name:<40}{rec['seconds']:>9.3f}s  {rec.get('error', '')}")
+    return records
+
+
+def bench_exports(analyzer, df, memory=True, skip=()):
+    from reports import build_excel_report, build_markdown_report, build_json_report
+
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        exports = [
+            ('build_markdown_report', lambda: build_markdown_report(analyzer, df)),
+            ('build_json_report', lambda: build_json_report(analyzer, df)),
+            ('build_excel_report', lambda: build_excel_report(analyzer, df, os.path.join(tmp, 'report.xlsx'))),
+        ]
+        for name, fn in exports:
+            if name in skip:
+                continue
+            _, rec = measure(fn, memory)
+            records.append({'group': 'export', 'name': name, **rec})
+            print(f"    {name:<40}{rec['seconds']:>9.3f}s  {rec.get('error', '')}")
+    return records
+
+
+def bench_load(dataset, df, rows, seed=0, memory=True, skip=()):
+    """Write the dataset as the workbook users upload, then time the loaders on it"""
+    from data_loader import detect_file_format, load_snappfood_file, load_data, load_files
+
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f'{dataset}.xlsx')
+        start = time.perf_counter()
+        if dataset == 'snappfood':
+            from snappfood_workbook import write_snappfood_workbook
+            write_snappfood_workbook(path, rows, seed=seed)
+            loader = ('load_snappfood_file', lambda: load_snappfood_file(path))
+        else:
+            df.to_excel(path, index=False)
+            loader = ('load_data', lambda: load_data(path))
+        print(f"    (workbook written in {time.perf_counter() - start:.1f}s, "
+              f"{os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+
+        for name, fn in [('detect_file_format', lambda: detect_file_format(path)), loader,
+                         ('load_files', lambda: load_files([path]))]:
+            if name in skip:
+                continue
+            _, rec = measure(fn, memory)
+            records.append({'group': 'load', 'name': name, **rec})
+            print(f"    {name:<40}{rec['seconds']:>9.3f}s  {rec.get('error', '')}")
+    return records
+
+
+# ==========================================
+# RUN / COMPARE
+# ==========================================
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(sizes, datasets, groups, memory=True, skip=(), seed=0):
+    results = []
+    for dataset in datasets:
+        for rows in sizes:
+            print(f"\n== {dataset} / {rows:,} rows ==")
+            # Same compact dtypes the dashboard works on after load_files()
+            df = optimize_dtypes(DATASETS[dataset](rows, seed=seed))
+            tag = {'dataset': dataset, 'rows': rows}
+
+            if 'load' in groups:
+                results += [{**tag, **r} for r in bench_load(dataset, df, rows, seed, memory, skip)]
+
+            analyzer = None
+            if 'analyzer' in groups:
+                records, analyzer = bench_analyzer(df, memory, skip)
+                results += [{**tag, **r} for r in records]
+            elif 'export' in groups:
+                from analyzer import ShilaAnalyzer
+                analyzer = ShilaAnalyzer(df, COLS, branch_table=BranchTable(None))
+            if 'ml' in groups:
+                results += [{**tag, **r} for r in bench_ml(df, memory, skip)]
+            if 'export' in groups and analyzer is not None:
+                results += [{**tag, **r} for r in bench_exports(analyzer, df, memory, skip)]
+            del df, analyzer
+            gc.collect()
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'memory_tracked': memory,
+        },
+        'results': results,
+    }
+
+
+def compare(old_path, new_path, threshold=1.2):
+    """Print per-benchmark speed ratios; ratios above `threshold` are flagged"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+
+    key = lambda r: (r['dataset'], r['rows'], r['group'], r['name'])
+    before = {key(r): r for r in old['results']}
+    regressions = 0
+    print(f"{'benchmark':<60}{'old s':>10}{'new s':>10}{'ratio':>8}")
+    for r in new['results']:
+        o = before.get(key(r))
+        if not o or 'error' in o or 'error' in r or not o['seconds']:
+            continue
+        ratio = r['seconds'] / o['seconds']
+        flag = '  <-- slower' if ratio > threshold and r['seconds'] > 0.05 else ''
+        regressions += bool(flag)
+        name = f"{r['dataset']}/{r['rows']}/{r['name']}"
+        print(f"{name:<60}{o['seconds']:>10.3f}{r['seconds']:>10.3f}{ratio:>8.2f}{flag}")
+    print(f"\n{regressions} regression(s) over {threshold:.1f}x")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Shila analyzers on synthetic data")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated row counts (default: 10000,100000,1000000)")
+    parser.add_argument('--datasets', default=','.join(DATASETS), help="shila, snappfood")
+    parser.add_argument('--only', default=','.join(GROUPS), help="Groups to run: load, analyzer, ml, export")
+    parser.add_argument('--skip', default='', help="Comma-separated method names to skip")
+    parser.add_argument('--no-memory', action='store_true', help="Disable tracemalloc (faster, no peak_mb)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON output path (default: benchmarks/results/bench_<timestamp>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(*args.compare) else 0
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    datasets = [d.strip() for d in args.datasets.split(',') if d.strip()]
+    groups = [g.strip() for g in args.only.split(',') if g.strip()]
+    skip = [s.strip() for s in args.skip.split(',') if s.strip()]
+    for d in datasets:
+        if d not in DATASETS:
+            parser.error(f"unknown dataset: {d}")
+    for g in groups:
+        if g not in GROUPS:
+            parser.error(f"unknown group: {g}")
+
+    report = run(sizes, datasets, groups, memory=not args.no_memory, skip=skip, seed=args.seed)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nWrote {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic SnappFood export workbooks (Reviews + Overview sheets)
+
+Writes the same layout data_loader.detect_file_format() and
+load_snappfood_file() read from real vendor-panel exports, so loader
+performance can be profiled without customer data:
+
+    python benchmarks/snappfood_workbook.py sample.xlsx --rows 5000 --branches 12
+
+Order codes depend on the seed, so workbooks written with different seeds hold
+different orders. --start-code sets the first code instead, e.g. to write two
+daily exports that overlap by 1000 orders:
+
+    python benchmarks/snappfood_workbook.py day1.xlsx --rows 3000 --start-code 20000000
+    python benchmarks/snappfood_workbook.py day2.xlsx --rows 3000 --start-code 20002000 --seed 1
+
+Reviews sheet layout (0-based column positions from config.SNAPPFOOD_COLS):
+    row 0-2     report title, vendor row, column headers ('Branch' in column B)
+    row 3...    one review per row, issue flags at SNAPPFOOD_ISSUES positions
+    every page  'Page x of y' row followed by a repeated header row
+    end         'Products Rate' marker in column B, then a per-product table
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import (
+    PRODUCTS, NAMES, _branches, _ratings, _comments, _created_at, _tag_pool, _pick, _comment_pool,
+)
+from config import SNAPPFOOD_COLS, SNAPPFOOD_ISSUES, SNAPPFOOD_POSITIVE_TAGS
+
+N_COLUMNS = max(max(SNAPPFOOD_COLS.values()), max(SNAPPFOOD_ISSUES)) + 1
+
+# Order codes of seed s start at ORDER_CODE_BASE + s * ORDER_CODE_STRIDE
+ORDER_CODE_BASE = 20_000_000
+ORDER_CODE_STRIDE = 10_000_000
+
+HEADERS = {
+    0: 'Vendor Code',
+    SNAPPFOOD_COLS['BRANCH']: 'Branch',
+    2: 'Customer ID',
+    SNAPPFOOD_COLS['CUSTOMER_NAME']: 'Customer Name',
+    4: 'Status',
+    SNAPPFOOD_COLS['REVIEWED_AT']: 'Reviewed At',
+    SNAPPFOOD_COLS['ORDER_CODE']: 'Order Code',
+    SNAPPFOOD_COLS['CREATED_AT']: 'Order Created At',
+    SNAPPFOOD_COLS['RATING']: 'Rate',
+    SNAPPFOOD_COLS['REVIEW_TAG']: 'Review Tag',
+    SNAPPFOOD_COLS['COMMENT']: 'Comment',
+    SNAPPFOOD_COLS['DELIVERY_COMMENT']: 'Delivery Comment',
+    SNAPPFOOD_COLS['ORDER_ITEMS']: 'Order Items',
+}
+HEADERS.update(SNAPPFOOD_ISSUES)
+
+
+def _header_row():
+    return [HEADERS.get(i) for i in range(N_COLUMNS)]
+
+
+def _review_columns(n_rows, n_branches, seed, start_code=None):
+    """Column-wise review data; rows are assembled while streaming to the sheet"""
+    rng = np.random.default_rng(seed)
+    if start_code is None:
+        start_code = ORDER_CODE_BASE + seed * ORDER_CODE_STRIDE
+    ratings = _ratings(rng, n_rows)
+    created = _created_at(rng, n_rows, '2025-03-21', 365)
+    reviewed = created + np.asarray(rng.integers(1800, 3 * 86400, n_rows), dtype='timedelta64[s]')
+    low = ratings <= 3
+
+    # Low ratings carry 1-2 issue flags, high ratings a positive review tag
+    issue_cols = sorted(SNAPPFOOD_ISSUES)
+    issue_a = np.where(low, rng.integers(0, len(issue_cols), n_rows), -1)
+    issue_b = np.where(low & (rng.random(n_rows) < 0.3), rng.integers(0, len(issue_cols), n_rows), -1)
+
+    return {
+        'rng': rng,
+        'issue_cols': issue_cols,
+        'issue_a': issue_a,
+        'issue_b': issue_b,
+        'branch': _branches(rng, n_rows, n_branches),
+        'customer': np.asarray(NAMES, dtype=object)[rng.integers(0, len(NAMES), n_rows)],
+        'created': created.strftime('%d/%m/%Y %H:%M:%S').to_numpy(dtype=object),
+        'reviewed': reviewed.strftime('%d/%m/%Y %H:%M:%S').to_numpy(dtype=object),
+        'order_code': np.arange(start_code, start_code + n_rows, dtype=np.int64),
+        'rating': ratings,
+        'tag': _pick(rng, np.asarray(SNAPPFOOD_POSITIVE_TAGS, dtype=object), ~low & (rng.random(n_rows) < 0.6)),
+        'comment': _comments(rng, ratings, 0.35),
+        'delivery': _pick(rng, _comment_pool(rng, ['پیک دیر رسید', 'پیک مودب بود', 'سریع رسید'], 30, 1),
+                          rng.random(n_rows) < 0.1),
+        'items': _tag_pool(rng, PRODUCTS, 400, 4)[rng.integers(0, 400, n_rows)],
+    }
+
+
+def write_snappfood_workbook(path, n_rows=1000, n_branches=10, seed=0, page_size=500, vendor_code='x7k2pq',
+                             start_code=None):
+    """Write a SnappFood-style export with `n_rows` reviews. Returns `path`.
+
+    Order codes run from start_code (default: derived from the seed) upwards.
+    """
+    from openpyxl import Workbook
+
+    data = _review_columns(n_rows, n_branches, seed, start_code)
+    wb = Workbook(write_only=True)
+
+    # Overview sheet - presence of 'Overview' + 'Reviews' is what marks the format
+    ws = wb.create_sheet('Overview')
+    ws.append(['Vendor Overview'])
+    ws.append(['Vendor ID', vendor_code])
+    ws.append(['Total Reviews', n_rows])
+    ws.append(['Average Rate', round(float(data['rating'].mean()), 2)])
+    ws.append(['Branches', len(set(data['branch']))])
+
+    ws = wb.create_sheet('Reviews')
+    ws.append([None, 'Reviews Report'])
+    ws.append([None, 'Vendor ID', vendor_code])
+    ws.append(_header_row())
+
+    n_pages = max(1, -(-n_rows // page_size)) if page_size else 1
+    for i in range(n_rows):
+        if page_size and i and i % page_size == 0:
+            ws.append([None, f'Page {i // page_size + 1} of {n_pages}'])
+            ws.append(_header_row())
+
+        row = [None] * N_COLUMNS
+        row[0] = vendor_code
+        row[SNAPPFOOD_COLS['BRANCH']] = data['branch'][i]
+        row[2] = int(data['order_code'][i]) % 977_231
+        row[SNAPPFOOD_COLS['CUSTOMER_NAME']] = data['customer'][i]
+        row[4] = 'Published'
+        row[SNAPPFOOD_COLS['REVIEWED_AT']] = data['reviewed'][i]
+        row[SNAPPFOOD_COLS['ORDER_CODE']] = int(data['order_code'][i])
+        row[SNAPPFOOD_COLS['CREATED_AT']] = data['created'][i]
+        row[SNAPPFOOD_COLS['RATING']] = int(data['rating'][i])
+        row[SNAPPFOOD_COLS['REVIEW_TAG']] = data['tag'][i]
+        row[SNAPPFOOD_COLS['COMMENT']] = data['comment'][i]
+        row[SNAPPFOOD_COLS['DELIVERY_COMMENT']] = data['delivery'][i]
+        row[SNAPPFOOD_COLS['ORDER_ITEMS']] = data['items'][i]
+        for flag in (data['issue_a'][i], data['issue_b'][i]):
+            if flag >= 0:
+                row[data['issue_cols'][flag]] = 1
+        ws.append(row)
+
+    # Trailing product table the loader must stop before
+    ws.append([])
+    ws.append([None, 'Products Rate'])
+    ws.append([None, 'Product', 'Rate', 'Count'])
+    rng = data['rng']
+    for product in PRODUCTS:
+        ws.append([None, product, round(float(rng.uniform(3, 5)), 1), int(rng.integers(10, 500))])
+
+    wb.save(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic SnappFood export workbook")
+    parser.add_argument('output', help="Path of the .xlsx file to create")
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--branches', type=int, default=10)
+    parser.add_argument('--page-size', type=int, default=500, help="Rows between repeated page headers (0 = none)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start-code', type=int,
+                        help=f"First order code (default: {ORDER_CODE_BASE:,} + seed x {ORDER_CODE_STRIDE:,})")
+    args = parser.parse_args(argv)
+
+    write_snappfood_workbook(args.output, args.rows, args.branches, args.seed, args.page_size,
+                             start_code=args.start_code)
+    print(f"Wrote {args.output} ({args.rows:,} reviews, {args.branches} branches)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic feedback data for benchmarks - no customer data involved
+
+make_shila_frame()      -> original survey export (Persian columns, Jalali dates, NPS)
+make_snappfood_frame()  -> the frame load_snappfood_file() returns (star ratings, no NPS)
+
+Both are generated vectorized with a fixed seed, so 1M rows take seconds and
+runs are comparable across commits.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import COLS
+
+
+# ==========================================
+# VOCABULARY
+# ==========================================
+
+BRANCHES = [
+    'ونک', 'سعادت آباد', 'تجریش', 'پونک', 'نیاوران', 'جردن', 'شهرک غرب', 'پاسداران',
+    'ستارخان', 'میرداماد', 'اکباتان', 'تهرانپارس', 'پیروزی', 'نارمک', 'شریعتی', 'یوسف آباد',
+]
+
+# Spelling variants the analyzer has to merge (ZWNJ / Arabic letters / missing space)
+BRANCH_VARIANTS = {
+    'سعادت آباد': ['سعادت‌آباد', 'سعادتآباد'],
+    'شهرک غرب': ['شهرک‌غرب'],
+    'تهرانپارس': ['تهران پارس'],
+    'یوسف آباد': ['يوسف آباد'],
+}
+
+PRODUCTS = [
+    'پیتزا پپرونی', 'پیتزا مخصوص', 'پیتزا مرغ و قارچ', 'برگر کلاسیک', 'چیز برگر', 'برگر قارچ',
+    'سالاد سزار', 'سالاد فصل', 'پاستا آلفردو', 'پاستا بلونز', 'ساندویچ مرغ', 'هات داگ',
+    'سیب زمینی سرخ کرده', 'نوشابه', 'دوغ', 'سس سیر', 'مرغ سوخاری', 'استیک',
+]
+
+STRENGTHS = ['کیفیت غذا', 'طعم عالی', 'سرعت ارسال', 'بسته بندی مناسب', 'برخورد پرسنل', 'قیمت مناسب', 'حجم غذا']
+WEAKNESSES = ['تاخیر در ارسال', 'غذا سرد بود', 'بسته بندی ضعیف', 'کیفیت پایین', 'قیمت بالا', 'حجم کم',
+              'برخورد نامناسب پیک', 'اشتباه در سفارش', 'طعم بد', 'بهداشت']
+DELIVERY_ISSUES = ['تاخیر پیک', 'برخورد بد پیک', 'غذا سرد رسید']
+PACKAGING_ISSUES = ['ظرف پاره', 'نشتی سس', 'جعبه له شده']
+PERSONNEL_ISSUES = ['پاسخگو نبودن', 'بی احترامی', 'اشتباه در ثبت']
+
+POSITIVE_PHRASES = [
+    'خیلی خوشمزه بود', 'کیفیت عالی', 'طعم فوق العاده', 'پیک سریع رسید', 'بسته بندی تمیز',
+    'گرم و تازه بود', 'ممنون از پرسنل مودب', 'حجم غذا مناسب بود', 'قیمت منصفانه', 'مثل همیشه عالی',
+]
+NEGATIVE_PHRASES = [
+    'غذا سرد بود', 'پیک خیلی دیر رسید', 'کیفیت افتضاح', 'بدمزه و شور بود', 'بسته بندی پاره بود',
+    'قیمت خیلی گران', 'سس فراموش شده بود', 'پیتزا خمیر بود', 'سفارش اشتباه ارسال شد', 'نان بیات بود',
+    'برخورد پیک بد بود', 'حجم خیلی کم بود', 'ظرف کثیف بود', 'سیب زمینی ماسیده بود',
+]
+NEUTRAL_PHRASES = ['معمولی بود', 'بد نبود', 'قابل قبول', 'سفارش رسید', 'مثل دفعه قبل']
+
+NAMES = ['علی', 'مریم', 'رضا', 'زهرا', 'حسین', 'سارا', 'محمد', 'فاطمه', 'امیر', 'نگار']
+
+
+# ==========================================
+# HELPERS
+# ==========================================
+
+def _branches(rng, n, n_branches, variants=True):
+    names = BRANCHES[:max(1, min(n_branches, len(BRANCHES)))]
+    if n_branches > len(BRANCHES):
+        names = names + [f'شعبه {i}' for i in range(len(BRANCHES) + 1, n_branches + 1)]
+    pool = list(names)
+    if variants:
+        for name in names:
+            pool += BRANCH_VARIANTS.get(name, [])
+    # Zipf-ish weights so some branches dominate like real data
+    weights = 1 / np.arange(1, len(pool) + 1) ** 0.6
+    return np.asarray(pool, dtype=object)[rng.choice(len(pool), n, p=weights / weights.sum())]
+
+
+def _tag_pool(rng, tags, size, max_tags=3):
+    """Pre-build joined tag strings ('a، b') so 1M rows only index into a small pool"""
+    pool = []
+    for _ in range(size):
+        k = rng.integers(1, max_tags + 1)
+        pool.append('، '.join(rng.choice(tags, k, replace=False)))
+    return np.asarray(pool, dtype=object)
+
+
+def _comment_pool(rng, phrases, size, max_phrases=3):
+    pool = []
+    for _ in range(size):
+        k = rng.integers(1, max_phrases + 1)
+        pool.append(' '.join(rng.choice(phrases, k)))
+    return np.asarray(pool, dtype=object)
+
+
+def _pick(rng, pool, mask):
+    """Fill `mask` positions with random pool entries, None elsewhere"""
+    out = np.full(len(mask), None, dtype=object)
+    idx = np.flatnonzero(mask)
+    out[idx] = pool[rng.integers(0, len(pool), len(idx))]
+    return out
+
+
+def _ratings(rng, n):
+    return rng.choice([1, 2, 3, 4, 5], n, p=[0.08, 0.07, 0.12, 0.28, 0.45])
+
+
+def _comments(rng, ratings, comment_rate):
+    n = len(ratings)
+    has_comment = rng.random(n) < comment_rate
+    neg = _comment_pool(rng, NEGATIVE_PHRASES + NEUTRAL_PHRASES[:1], 500)
+    pos = _comment_pool(rng, POSITIVE_PHRASES + NEUTRAL_PHRASES[:1], 500)
+    mid = _comment_pool(rng, NEUTRAL_PHRASES + POSITIVE_PHRASES[:3] + NEGATIVE_PHRASES[:3], 300)
+    out = np.full(n, None, dtype=object)
+    for pool, band in ((neg, ratings <= 2), (mid, ratings == 3), (pos, ratings >= 4)):
+        idx = np.flatnonzero(has_comment & band)
+        out[idx] = pool[rng.integers(0, len(pool), len(idx))]
+    return out
+
+
+def _created_at(rng, n, start, days):
+    # Lunch and dinner peaks
+    hours = rng.choice(np.arange(24), n, p=_HOUR_WEIGHTS)
+    offsets = (rng.integers(0, days, n) * 86400 + hours * 3600 + rng.integers(0, 3600, n))
+    return pd.Timestamp(start) + pd.to_timedelta(offsets, unit='s')
+
+
+_HOUR_WEIGHTS = np.array([2, 1, 0.5, 0.2, 0.1, 0.1, 0.2, 0.5, 1, 2, 3, 6, 10, 11, 8, 4, 3, 4, 7, 11, 12, 10, 6, 3], float)
+_HOUR_WEIGHTS /= _HOUR_WEIGHTS.sum()
+
+
+def _jalali_strings(timestamps):
+    """'YYYY/MM/DD' Jalali strings, computed per unique day"""
+    import jdatetime
+    days = timestamps.normalize()
+    uniq = days.unique()
+    lookup = {d: jdatetime.date.fromgregorian(date=d.date()).strftime('%Y/%m/%d') for d in uniq}
+    return days.map(lookup).to_numpy(dtype=object)
+
+
+# ==========================================
+# FRAMES
+# ==========================================
+
+def make_shila_frame(n_rows, n_branches=10, seed=0, comment_rate=0.45, start='2025-03-21', days=365):
+    """Original Shila survey export with Persian column names from config.COLS"""
+    rng = np.random.default_rng(seed)
+    ratings = _ratings(rng, n_rows)
+
+    # NPS loosely follows rating, ~15% unanswered
+    nps = np.clip(ratings * 2 + rng.integers(-2, 2, n_rows), 0, 10).astype(float)
+    nps[rng.random(n_rows) < 0.15] = np.nan
+
+    created = _created_at(rng, n_rows, start, days)
+    low = ratings <= 3
+
+    df = pd.DataFrame({
+        COLS['RATING']: ratings.astype(float),
+        COLS['FEEDBACK_TYPE']: np.where(low, 'نقاط ضعف', 'نقاط قوت'),
+        COLS['STRENGTH']: _pick(rng, _tag_pool(rng, STRENGTHS, 200), ~low & (rng.random(n_rows) < 0.7)),
+        COLS['WEAKNESS']: _pick(rng, _tag_pool(rng, WEAKNESSES, 300), (low & (rng.random(n_rows) < 0.85)) | (rng.random(n_rows) < 0.05)),
+        COLS['DELIVERY']: _pick(rng, _tag_pool(rng, DELIVERY_ISSUES, 20, 2), low & (rng.random(n_rows) < 0.3)),
+        COLS['PACKAGING']: _pick(rng, _tag_pool(rng, PACKAGING_ISSUES, 20, 2), low & (rng.random(n_rows) < 0.15)),
+        COLS['PERSONNEL']: _pick(rng, _tag_pool(rng, PERSONNEL_ISSUES, 20, 2), low & (rng.random(n_rows) < 0.08)),
+        COLS['NPS']: nps,
+        COLS['COMMENT']: _comments(rng, ratings, comment_rate),
+        COLS['BRANCH']: _branches(rng, n_rows, n_branches),
+        COLS['DATE']: _jalali_strings(created),
+        COLS['PRODUCT']: _pick(rng, _tag_pool(rng, PRODUCTS, 400, 4), rng.random(n_rows) < 0.95),
+        COLS['CREATED_AT']: created,
+    })
+    return df
+
+
+def make_snappfood_frame(n_rows, n_branches=10, seed=0, comment_rate=0.35, start='2025-03-21', days=365):
+    """SnappFood reviews in the standardized shape produced by load_snappfood_file()"""
+    rng = np.random.default_rng(seed)
+    ratings = _ratings(rng, n_rows)
+    created = _created_at(rng, n_rows, start, days)
+
+    comments = _comments(rng, ratings, comment_rate)
+    delivery = _pick(rng, _comment_pool(rng, ['پیک دیر رسید', 'پیک مودب بود', 'سریع رسید'], 30, 1), rng.random(n_rows) < 0.1)
+    full = [
+        (f"{c} | {d}" if d else c) if c else d
+        for c, d in zip(comments, delivery)
+    ]
+
+    df = pd.DataFrame({
+        COLS['CREATED_AT']: created,
+        COLS['BRANCH']: _branches(rng, n_rows, n_branches),
+        COLS['RATING']: ratings.astype(float),
+        COLS['NPS']: None,
+        COLS['WEAKNESS']: None,
+        COLS['STRENGTH']: None,
+        COLS['ORDER_ITEMS']: _tag_pool(rng, PRODUCTS, 400, 4)[rng.integers(0, 400, n_rows)],
+        COLS['DATE']: created,
+        COLS['COMMENT']: np.asarray(full, dtype=object),
+        'order_code': np.arange(10_000_000, 10_000_000 + n_rows),
+        'customer_name': np.asarray(NAMES, dtype=object)[rng.integers(0, len(NAMES), n_rows)],
+    })
+    return df
+
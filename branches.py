@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Branch Names - canonical branch table with persisted aliases
+
+Spellings that differ only in Arabic/Persian letters (ي/ی, ك/ک, ە/ه), spaces or
+half-spaces (ZWNJ) share one key and one canonical name. The table is stored as
+JSON under DATA_DIR, so every file and session maps a spelling the same way and
+a canonical name can be renamed by editing the file:
+
+    {"<key>": {"name": "<canonical name>", "aliases": ["<spelling>", ...]}, ...}
+
+    table = get_branch_table()
+    df[COLS['BRANCH']] = table.normalize(df[COLS['BRANCH']])
+
+Benchmarks and one-off runs pass BranchTable(None) (in memory) to ShilaAnalyzer,
+so synthetic data never decides the real canonical names.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import BRANCH_ALIASES_FILE
+
+# Letters unified before comparing spellings; spaces / ZWNJ are dropped
+_KEY_TABLE = str.maketrans({'ي': 'ی', 'ك': 'ک', 'ە': 'ه', ' ': None, '\u200c': None})
+
+
+def branch_keys(names):
+    """Comparison key of every name (vectorized over an Index / Series of strings)"""
+    return pd.Series(names, dtype=object).astype(str).str.strip().str.translate(_KEY_TABLE).to_numpy(dtype=object)
+
+
+def _is_spaced(name):
+    """Spelled with a space or half-space (preferred, more readable)"""
+    return ' ' in name or '\u200c' in name
+
+
+class BranchTable:
+    """Canonical branch names keyed by spelling-insensitive key; path=None keeps it in memory"""
+
+    def __init__(self, path=BRANCH_ALIASES_FILE):
+        self.path = path
+        self.entries = {}
+        self._aliases = {}
+        self._mtime = None
+        # Shared by every session's analyzer: resolution and saving are serialized
+        self._lock = threading.RLock()
+        self.load()
+
+    # ==========================================
+    # STORAGE
+    # ==========================================
+
+    def load(self):
+        """(Re)read the JSON table if it changed on disk. Unreadable files are reported and ignored."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        with self._lock:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Branch alias load error: {e}")
+                return
+            self.entries = {
+                key: {'name': str(entry['name']), 'aliases': [str(a) for a in entry.get('aliases', [])]}
+                for key, entry in entries.items() if isinstance(entry, dict) and entry.get('name')
+            }
+            self._aliases = {alias: key for key, entry in self.entries.items() for alias in entry['aliases']}
+            self._mtime = mtime
+
+    def save(self):
+        """Write the table atomically (unique temp file in the same folder, then rename)"""
+        if not self.path:
+            return
+        with self._lock:
+            text = json.dumps(self.entries, ensure_ascii=False, indent=2, sort_keys=True)
+            tmp = None
+            try:
+                fd, tmp = tempfile.mkstemp(prefix='.branch_aliases.', suffix='.tmp',
+                                           dir=os.path.dirname(self.path) or '.')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp, self.path)
+                self._mtime = os.path.getmtime(self.path)
+            except OSError as e:
+                print(f"Branch alias save error: {e}")
+                if tmp and os.path.exists(tmp):
+                    os.remove(tmp)
+
+    # ==========================================
+    # RESOLUTION
+    # ==========================================
+
+    def resolve(self, names, counts=None):
+        """Canonical name for each distinct spelling in `names` (in order of appearance).
+
+        New keys take the first spelled-with-space variant, else the most frequent
+        one (`counts`: spelling -> rows). A stored name without a space is replaced
+        by a spaced variant when one shows up. Returns a list aligned with `names`.
+        """
+        with self._lock:
+            return self._resolve([str(n) for n in names], counts)
+
+    def _resolve(self, names, counts):
+        self.load()
+        unknown = [i for i, n in enumerate(names) if n not in self._aliases]
+
+        if unknown:
+            keys = branch_keys([names[i] for i in unknown])
+            groups = {}
+            for i, key in zip(unknown, keys):
+                groups.setdefault(key, []).append(names[i])
+
+            for key, variations in groups.items():
+                entry = self.entries.get(key)
+                spaced = [v for v in variations if _is_spaced(v)]
+                if entry is None:
+                    if spaced:
+                        best = spaced[0]
+                    else:
+                        best = max(variations, key=lambda v: (counts or {}).get(v, 0))
+                    entry = self.entries[key] = {'name': best, 'aliases': []}
+                elif spaced and not _is_spaced(entry['name']):
+                    entry['name'] = spaced[0]
+                for v in variations:
+                    if v not in entry['aliases']:
+                        entry['aliases'].append(v)
+                    self._aliases[v] = key
+            self.save()
+
+        return [self.entries[self._aliases[n]]['name'] for n in names]
+
+    def normalize(self, series):
+        """Branch column with every spelling replaced by its canonical name.
+
+        Each distinct value is resolved once; the rows are remapped through their
+        codes. Categorical columns stay categorical (sorted categories).
+        """
+        codes, uniques = pd.factorize(series)
+        if len(uniques) == 0:
+            return series
+
+        uniques = np.asarray(uniques, dtype=object)
+        counts = dict(zip(uniques, np.bincount(codes[codes >= 0], minlength=len(uniques))))
+        canonical = np.array(self.resolve(uniques, counts), dtype=object)
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories, new_codes = np.unique(canonical, return_inverse=True)
+            row_codes = np.where(codes >= 0, new_codes[np.maximum(codes, 0)], -1)
+            return pd.Series(pd.Categorical.from_codes(row_codes, categories=categories),
+                             index=series.index, name=series.name)
+        return pd.Series(np.append(canonical, np.nan)[codes], index=series.index, name=series.name)
+
+
+_TABLES = {}
+_TABLES_LOCK = threading.Lock()
+
+
+def get_branch_table(path=BRANCH_ALIASES_FILE):
+    """Shared table for `path` (loaded once per process, re-read when the file changes)"""
+    with _TABLES_LOCK:
+        if path not in _TABLES:
+            _TABLES[path] = BranchTable(path)
+        return _TABLES[path]
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Shila Batch Reports - Command-line entry point
+
+Runs the same analysis engine as the dashboard without Streamlit, e.g. from
+cron or CI:
+
+    python cli.py                              # every file in data/uploads
+    python cli.py week1.xlsx week2.xlsx --formats md,json
+
+With --store (or WAREHOUSE_ENABLED set) loaded files are also stored in the
+review warehouse (see warehouse.py), so reports can cover any stored period
+without the original files:
+
+    python cli.py week1.xlsx --store
+    python cli.py --history --since 2025-12-01 --until 2025-12-31 --branch ونک
+"""
+
+import argparse
+import functools
+import os
+import sys
+from datetime import datetime
+
+from config import COLS, DATA_DIR, REPORTS_DIR, NOTEBOOKLM_DIR
+from analyzer import ShilaAnalyzer
+from data_loader import load_files
+from warehouse import get_warehouse, is_snappfood_frame, load_and_store
+from reports import (ChartExportError, build_excel_report, build_markdown_report, build_json_report,
+                     dump_json_report)
+
+FORMATS = ('excel', 'md', 'json')
+
+
+def collect_inputs(paths):
+    """Expand directories into their .csv/.xlsx files (DATA_DIR by default)"""
+    paths = paths or [DATA_DIR]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, f) for f in os.listdir(path)
+                            if f.endswith(('.csv', '.xlsx', '.xls')))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            print(f"Skipping missing input: {path}")
+    return files
+
+
+def run(files, formats=FORMATS, reports_dir=REPORTS_DIR, notebooklm_dir=NOTEBOOKLM_DIR, history=None,
+        workers=None, store=None):
+    """Load `files`, build the requested reports and return their paths.
+
+    The files are stored in the warehouse if store (default: WAREHOUSE_ENABLED).
+    With history={'start', 'end', 'branches'} (any may be None) the reports cover
+    the matching warehouse reviews instead of just `files`.
+    """
+    loader = functools.partial(load_and_store, store=store)
+    df, is_snappfood = load_files(files, loader=loader, workers=workers) if files else (None, False)
+    if history is not None:
+        df = get_warehouse().query(**history)
+        is_snappfood = df is not None and is_snappfood_frame(df)
+    if df is None or df.empty:
+        print("No data loaded")
+        return []
+
+    source = 'warehouse' if history is not None else f"{len(files)} file(s)"
+    print(f"Loaded {source}, {len(df):,} rows ({'SnappFood' if is_snappfood else 'original'} format)")
+    analyzer = ShilaAnalyzer(df, COLS)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    written = []
+
+    if 'excel' in formats:
+        fp = os.path.join(reports_dir, f"full_analysis_{ts}.xlsx")
+        try:
+            try:
+                written.append(build_excel_report(analyzer, df, fp, ts))
+            except ChartExportError as e:
+                # kaleido needs Chrome, which headless servers often lack: keep the tables
+                print(f"Warning: {e}\nWriting the Excel report without charts")
+                written.append(build_excel_report(analyzer, df, fp, ts, charts=False))
+        except Exception as e:
+            print(f"Excel export error: {e}")
+
+    if 'md' in formats:
+        fp = os.path.join(notebooklm_dir, f"shila_report_{ts}.md")
+        with open(fp, 'w', encoding='utf-8') as f:
+            f.write(build_markdown_report(analyzer, df, ts))
+        written.append(fp)
+
+    if 'json' in formats:
+        fp = os.path.join(reports_dir, f"shila_report_{ts}.json")
+        written.append(dump_json_report(build_json_report(analyzer, df, ts), fp))
+
+    for fp in written:
+        print(f"Wrote {fp}")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Shila feedback reports without the dashboard")
+    parser.add_argument('inputs', nargs='*', help=f"Files or folders to load (default: {DATA_DIR})")
+    parser.add_argument('--formats', default=','.join(FORMATS),
+                        help="Comma-separated subset of: excel, md, json")
+    parser.add_argument('--reports-dir', default=REPORTS_DIR, help="Output folder for Excel/JSON")
+    parser.add_argument('--notebooklm-dir', default=NOTEBOOKLM_DIR, help="Output folder for Markdown")
+    parser.add_argument('--workers', type=int, help="Processes for parsing files (default: UPLOAD_WORKERS, 1 = serial)")
+    parser.add_argument('--store', action=argparse.BooleanOptionalAction, default=None,
+                        help="Store the inputs in the review warehouse (default: WAREHOUSE_ENABLED)")
+    parser.add_argument('--history', action='store_true',
+                        help="Report on the stored review history (after storing any inputs)")
+    parser.add_argument('--since', help="With --history: first order date (YYYY-MM-DD)")
+    parser.add_argument('--until', help="With --history: last order date (YYYY-MM-DD)")
+    parser.add_argument('--branch', action='append', help="With --history: only this branch (repeatable)")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    files = collect_inputs(args.inputs)
+    if not files and not args.history:
+        print("No input files found")
+        return 1
+    history = {'start': args.since, 'end': args.until, 'branches': args.branch} if args.history else None
+
+    os.makedirs(args.reports_dir, exist_ok=True)
+    os.makedirs(args.notebooklm_dir, exist_ok=True)
+    return 0 if run(files, formats, args.reports_dir, args.notebooklm_dir, history, args.workers, args.store) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
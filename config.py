@@ -29,6 +29,21 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "outputs")
 REPORTS_DIR = os.path.join(OUTPUT_DIR, "reports")
 NOTEBOOKLM_DIR = os.path.join(OUTPUT_DIR, "notebooklm")
 
+# Canonical branch names and their known spellings (see branches.py)
+BRANCH_ALIASES_FILE = os.path.join(DATA_DIR, "branch_aliases.json")
+
+# Review history: loaded files kept in a local SQLite database (see warehouse.py).
+# It holds customer reviews on disk, so files are only stored when WAREHOUSE_ENABLED is set
+WAREHOUSE_ENABLED = str(get_secret("WAREHOUSE_ENABLED", "")).lower() in ('1', 'true', 'yes')
+WAREHOUSE_PATH = get_secret("WAREHOUSE_PATH", "") or os.path.join(BASE_DIR, "data", "warehouse.sqlite")
+
+# Parsed uploads by content hash, so a re-uploaded file is not parsed again (see upload_registry.py)
+UPLOAD_REGISTRY_DIR = os.path.join(BASE_DIR, "data", "parsed")
+UPLOAD_REGISTRY_MB = float(get_secret("UPLOAD_REGISTRY_MB", "1024") or 1024)
+
+# Worker processes for parsing several uploaded files (0 = one per CPU core, 1 = serial)
+UPLOAD_WORKERS = int(get_secret("UPLOAD_WORKERS", "0") or 0)
+
 # Create directories if they don't exist
 for dir_path in [DATA_DIR, REPORTS_DIR, NOTEBOOKLM_DIR]:
     os.makedirs(dir_path, exist_ok=True)
@@ -39,6 +54,15 @@ for dir_path in [DATA_DIR, REPORTS_DIR, NOTEBOOKLM_DIR]:
 ANTHROPIC_API_KEY = get_secret("ANTHROPIC_API_KEY", "")
 DASHBOARD_PASSWORD = get_secret("DASHBOARD_PASSWORD", "shila2026")  # Default for development
 
+# Per-method timing/memory instrumentation (see perf.py); also enabled by ?perf=1
+PROFILE_ENABLED = str(get_secret("SHILA_PROFILE", "")).lower() in ('1', 'true', 'yes')
+
+# Worker processes for comment tokenization in Text Mining (0 = one per CPU core, 1 = serial)
+TEXT_MINING_WORKERS = int(get_secret("TEXT_MINING_WORKERS", "0") or 0)
+
+# Memory ceiling of the process-wide cache shared by all sessions (see shared_cache.py)
+SHARED_CACHE_MB = float(get_secret("SHARED_CACHE_MB", "512") or 512)
+
 # ==========================================
 # COLUMN MAPPING - UPDATE THESE TO MATCH YOUR DATA
 # ==========================================
@@ -70,6 +94,7 @@ LABELS = {
         'upload_csv': '📁 Upload CSV File',
         'or_select': 'Or select from existing files:',
         'no_files': 'No files in data folder',
+        'use_history': '📚 Review history ({n:,} reviews, {first} – {last})',
         'date_range': '📅 Date Range',
         'branch_filter': '🏪 Branch',
         'product_filter': '🍔 Product',
@@ -125,6 +150,7 @@ LABELS = {
         'upload_csv': '📁 بارگذاری فایل CSV',
         'or_select': 'یا انتخاب از فایل‌های موجود:',
         'no_files': 'فایلی در پوشه وجود ندارد',
+        'use_history': '📚 تاریخچه نظرات ({n:,} نظر، {first} – {last})',
         'date_range': '📅 بازه زمانی',
         'branch_filter': '🏪 شعبه',
         'product_filter': '🍔 محصول',
@@ -188,6 +214,23 @@ ASPECTS = {
     'Accuracy / دقت سفارش': ['اشتباه', 'مغایرت', 'فراموش', 'جابجا', 'نیست', 'کمبود', 'اضافه', 'سس'],
 }
 
+# ==========================================
+# SENTIMENT LEXICON
+# ==========================================
+# Whole-token matches; each distinct word counts once per comment
+SENTIMENT_LEXICON = {
+    'positive': [
+        'عالی', 'خوب', 'عالیه', 'خوشمزه', 'تازه', 'سریع', 'مودب', 'تمیز',
+        'عالی‌بود', 'راضی', 'ممنون', 'متشکر', 'بهترین', 'فوق‌العاده',
+        'محشر', 'دوست‌داشتنی', 'لذیذ', 'گرم', 'مناسب', 'حرفه‌ای',
+    ],
+    'negative': [
+        'بد', 'افتضاح', 'سرد', 'دیر', 'گران', 'کم', 'کثیف', 'خراب',
+        'بی‌کیفیت', 'ناراضی', 'متاسف', 'بدترین', 'زشت', 'خام', 'سوخته',
+        'تاخیر', 'اشتباه', 'بی‌ادب', 'پاره', 'ریخته', 'نامناسب',
+    ],
+}
+
 # ==========================================
 # COLORS
 # ==========================================
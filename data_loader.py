@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""Data Loading - Original survey exports and SnappFood review workbooks"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from config import COLS, SNAPPFOOD_COLS, EXCLUDE_BRANCHES, UPLOAD_WORKERS
+
+
+def _file_name(file):
+    """Uploaded files expose .name, paths from DATA_DIR are plain strings"""
+    return file if isinstance(file, str) else getattr(file, 'name', '')
+
+
+# ==========================================
+# SNAPPFOOD FILE LOADER
+# ==========================================
+
+def load_snappfood_file(uploaded_file):
+    """Load SnappFood format Excel file and convert to standard format (NPS/Pareto/Kano IGNORED).
+
+    uploaded_file may also be a workbook already opened with open_workbook().
+    """
+    c = SNAPPFOOD_COLS
+    df_raw = pd.read_excel(uploaded_file, sheet_name='Reviews', header=None)
+
+    # Find where reviews end
+    reviews_end = len(df_raw)
+    for i in range(len(df_raw)):
+        if i < len(df_raw) and str(df_raw.iloc[i, c['BRANCH']]) == 'Products Rate':
+            reviews_end = i
+            break
+
+    reviews_data = []
+    for i in range(3, reviews_end):
+        row = df_raw.iloc[i]
+
+        # Branch (Anchor B/1)
+        branch = str(row[c['BRANCH']]).strip() if pd.notna(row[c['BRANCH']]) else ""
+        if not branch or branch in ['Branch', 'Vendor ID', 'None', 'nan']: continue
+        if any(kw in branch for kw in ['Vendor', 'Page']): continue
+
+        # Rating (Anchor O/14)
+        try:
+            rating = float(row[c['RATING']]) if pd.notna(row[c['RATING']]) else None
+        except:
+            rating = None
+
+        # Full Timestamp (Column M / Index 12) - "Order Created At"
+        # This contains the '26/12/2025 18:37:39' format
+        timestamp_data = row[c['CREATED_AT']] if pd.notna(row[c['CREATED_AT']]) else None
+
+        # Comments (Anchor U/20 and Y/24)
+        comment = str(row[c['COMMENT']]).strip() if pd.notna(row[c['COMMENT']]) else ""
+        deliv_comment = str(row[c['DELIVERY_COMMENT']]).strip() if pd.notna(row[c['DELIVERY_COMMENT']]) else ""
+        full_comment = f"{comment} | {deliv_comment}".strip(" |")
+
+        record = {
+            COLS['CREATED_AT']: timestamp_data,
+            COLS['BRANCH']: branch,
+            COLS['RATING']: rating,
+            COLS['NPS']: None,       # Ignored
+            COLS['WEAKNESS']: None,  # Ignored for Pareto
+            COLS['STRENGTH']: None,  # Ignored for Kano
+            COLS['ORDER_ITEMS']: str(row[c['ORDER_ITEMS']]) if pd.notna(row[c['ORDER_ITEMS']]) else "",
+            COLS['DATE']: timestamp_data,
+            COLS['COMMENT']: full_comment if full_comment else None,
+            'order_code': row[c['ORDER_CODE']],
+            'customer_name': str(row[c['CUSTOMER_NAME']]).strip() if pd.notna(row[c['CUSTOMER_NAME']]) else "Unknown"
+        }
+        reviews_data.append(record)
+
+    # Final Processing
+    df = pd.DataFrame(reviews_data)
+
+    # Clean up dates immediately
+    if not df.empty:
+        # Convert the standardized column to datetime
+        df[COLS['CREATED_AT']] = pd.to_datetime(df[COLS['CREATED_AT']], dayfirst=True, errors='coerce')
+
+    return df
+
+
+def open_workbook(file):
+    """Open an Excel file once for detection and loading (sheets are parsed only when read)"""
+    return pd.ExcelFile(file)
+
+
+def detect_file_format(uploaded_file):
+    """Detect if file is SnappFood format or original format.
+
+    uploaded_file may be a path, an upload or a workbook from open_workbook();
+    an open workbook is inspected in place (sheet names and header row only).
+    """
+    if not isinstance(uploaded_file, pd.ExcelFile) and _file_name(uploaded_file).endswith('.csv'):
+        return 'original'
+    try:
+        xl = uploaded_file if isinstance(uploaded_file, pd.ExcelFile) else open_workbook(uploaded_file)
+        sheets = xl.sheet_names
+
+        # SnappFood format has these sheets
+        if 'Reviews' in sheets and 'Overview' in sheets:
+            return 'snappfood'
+
+        # Check for original format columns (header row of the first sheet)
+        df_check = xl.parse(sheets[0], nrows=0)
+        cols = [str(c) for c in df_check.columns]
+
+        if any('شعبه' in c for c in cols) or any('میزان رضایت' in c for c in cols):
+            return 'original'
+
+        return 'original'  # Default
+    except:
+        return 'original'
+
+
+def load_data(file):
+    """Load an original-format CSV/Excel export or open workbook (raises on unreadable files)"""
+    if not isinstance(file, pd.ExcelFile) and _file_name(file).endswith('.csv'):
+        return pd.read_csv(file)
+    return pd.read_excel(file)
+
+
+def load_file(file):
+    """Detect the format of a single file and load it. Returns (df, format).
+
+    Workbooks are opened (and decompressed) once; detection and the loader share the handle.
+    """
+    if _file_name(file).endswith('.csv'):
+        return load_data(file), 'original'
+    with open_workbook(file) as xl:
+        file_format = detect_file_format(xl)
+        if file_format == 'snappfood':
+            return load_snappfood_file(xl), file_format
+        return load_data(xl), file_format
+
+
+# ==========================================
+# DTYPE SCHEMA
+# ==========================================
+
+# Repeated strings stored as pandas categoricals (one copy per distinct value)
+CATEGORY_COLS = ['BRANCH', 'FEEDBACK_TYPE', 'STRENGTH', 'WEAKNESS', 'DELIVERY',
+                 'PACKAGING', 'PERSONNEL', 'PRODUCT', 'ORDER_ITEMS']
+
+# 0-10 scores stored as nullable Int8 (missing answers stay <NA>)
+SMALL_INT_COLS = ['RATING', 'NPS']
+
+
+def _is_string_like(series):
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+
+def optimize_dtypes(df, max_category_ratio=0.5):
+    """Replace the object/float64 defaults of a loaded frame with compact dtypes.
+
+    - BRANCH and tag/product columns -> category (if distinct values are at most
+      `max_category_ratio` of the rows; BRANCH always)
+    - RATING / NPS -> Int8 when every value is a whole number in range
+    Comments and dates are left as they are.
+    """
+    if df is None or df.empty:
+        return df
+    df = df.copy(deep=False)
+
+    for key in SMALL_INT_COLS:
+        col = COLS[key]
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if s.isna().all():
+            df[col] = pd.Series(pd.NA, index=s.index, dtype='Int8')
+            continue
+        if not pd.api.types.is_numeric_dtype(s):
+            continue
+        values = s.dropna()
+        if (values % 1 == 0).all() and values.between(-128, 127).all():
+            df[col] = s.astype('Int8')
+
+    for key in CATEGORY_COLS:
+        col = COLS[key]
+        if col not in df.columns or not _is_string_like(df[col]):
+            continue
+        s = df[col]
+        if key == 'BRANCH' or s.nunique() <= max(1, len(s) * max_category_ratio):
+            df[col] = s.astype('category')
+
+    return df
+
+
+def fill_blank(series):
+    """fillna('') that also works on categorical columns (and keeps them categorical)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if '' not in series.cat.categories:
+            series = series.cat.add_categories('')
+    return series.fillna('')
+
+
+# ==========================================
+# COMBINE & FILTER
+# ==========================================
+
+def exclude_branches(df, keywords=None):
+    """Drop rows whose branch matches any of the EXCLUDE_BRANCHES keywords"""
+    keywords = EXCLUDE_BRANCHES if keywords is None else keywords
+    if df is None or df.empty or not keywords or COLS['BRANCH'] not in df.columns:
+        return df
+    pattern = '|'.join(keywords)
+    mask = df[COLS['BRANCH']].astype(str).str.contains(pattern, case=False, na=False)
+    return df[~mask]
+
+
+def order_codes(series):
+    """Order codes as text (Excel reads numeric codes as floats: 123.0 -> '123'), None if missing"""
+    def to_text(code):
+        if code is None or (not isinstance(code, str) and pd.isna(code)):
+            return None
+        if isinstance(code, (float, np.floating)) and float(code).is_integer():
+            code = int(code)
+        return str(code).strip() or None
+    return series.map(to_text, na_action=None).astype(object)
+
+
+def row_keys(df):
+    """Identity of every row of one loaded file, for dropping overlaps between files.
+
+    SnappFood rows are keyed by order code. Rows without one (original-format
+    surveys) are keyed by a hash of their contents, numbered among identical rows
+    of the file: a survey row repeated in two exports matches, while identical
+    answers within one export are all kept.
+    """
+    keys = order_codes(df['order_code']) if 'order_code' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    missing = keys.isna().to_numpy()
+    if missing.any():
+        content = df.loc[missing, sorted(c for c in df.columns if c != 'order_code')]
+        hashes = pd.util.hash_pandas_object(content, index=False)
+        nth = hashes.groupby(hashes, sort=False).cumcount()
+        keys[missing] = [f"row:{h:016x}:{n}" for h, n in zip(hashes, nth)]
+    return keys
+
+
+def combine_frames(frames):
+    """Concatenate loaded files, drop overlapping orders and excluded branches, compact dtypes"""
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+
+    # Remove rows already loaded from an earlier file (safety check for overlapping files).
+    # The first copy wins, as in the review warehouse
+    keys = pd.concat([row_keys(f) for f in frames], ignore_index=True)
+    df = df[~keys.duplicated().to_numpy()]
+
+    return optimize_dtypes(exclude_branches(df))
+
+
+# ==========================================
+# PARALLEL LOADING
+# ==========================================
+
+def upload_workers(workers=None, files=None):
+    """Worker processes for parsing: UPLOAD_WORKERS (0 = one per CPU core), at most one per file"""
+    workers = UPLOAD_WORKERS if workers is None else workers
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    return min(workers, len(files)) if files is not None else workers
+
+
+def _load_in_worker(file):
+    """load_file() in a pool process; uploads arrive as (name, bytes)"""
+    if isinstance(file, tuple):
+        name, data = file
+        file = io.BytesIO(data)
+        file.name = name
+    return load_file(file)
+
+
+def _safe_load(file):
+    try:
+        return load_file(file)
+    except Exception as e:
+        return e
+
+
+def load_file_batch(files, workers=None, progress=None):
+    """load_file() over several files, parsed concurrently in a ProcessPoolExecutor
+    (openpyxl and the SnappFood row loop are pure Python, so threads would not help).
+
+    Returns one (df, format) per file, in order, or the exception that file raised,
+    so one bad file does not stop the others. progress(done, total, name, error)
+    is called as each file finishes. Runs serially with one worker or one file,
+    and falls back to serial parsing if the pool cannot be started.
+    """
+    results = [None] * len(files)
+    workers = upload_workers(workers, files)
+
+    def finish(i, result):
+        results[i] = result
+        if progress is not None:
+            done = sum(r is not None for r in results)
+            progress(done, len(files), _file_name(files[i]), result if isinstance(result, Exception) else None)
+
+    if workers > 1:
+        try:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(_load_in_worker, f if isinstance(f, str) else (_file_name(f), f.getvalue())): i
+                    for i, f in enumerate(files)
+                }
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = e
+                    finish(futures[future], result)
+            return results
+        except Exception as e:
+            print(f"Parallel loading error, loading serially: {e}")
+
+    for i, file in enumerate(files):
+        if results[i] is None:
+            finish(i, _safe_load(file))
+    return results
+
+
+def load_files(files, loader=load_file_batch, workers=None, progress=None):
+    """Load several files of any supported format into one DataFrame.
+
+    Returns (df, is_snappfood). Unreadable files are reported and skipped; the
+    rest are concatenated and deduplicated once. `loader(files, workers, progress)`
+    returns one (df, format) or exception per file (load_file_batch, or
+    warehouse.load_and_store to also reuse and store parsed files).
+    """
+    frames = []
+    is_snappfood = False
+    for file, result in zip(files, loader(files, workers=workers, progress=progress)):
+        if isinstance(result, Exception):
+            print(f"Load error ({_file_name(file)}): {result}")
+            continue
+        df, file_format = result
+        is_snappfood = is_snappfood or file_format == 'snappfood'
+        frames.append(df)
+    return combine_frames(frames), is_snappfood
@@ -9,48 +9,36 @@ from collections import Counter
 import warnings
 warnings.filterwarnings('ignore')
 
-# ML Imports
-try:
-    from sklearn.model_selection import train_test_split, cross_val_score
-    from sklearn.preprocessing import StandardScaler, LabelEncoder
-    from sklearn.ensemble import RandomForestClassifier, IsolationForest, GradientBoostingClassifier
-    from sklearn.cluster import KMeans, DBSCAN
-    from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, precision_recall_fscore_support
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.decomposition import PCA
-    ML_AVAILABLE = True
-except ImportError:
-    ML_AVAILABLE = False
+from data_loader import fill_blank
 
-try:
-    from mlxtend.frequent_patterns import apriori, association_rules
-    from mlxtend.preprocessing import TransactionEncoder
-    MLXTEND_AVAILABLE = True
-except ImportError:
-    MLXTEND_AVAILABLE = False
+# ML Imports
+# sklearn / mlxtend / imblearn take seconds to import, so only check that they
+# are installed here and import them inside the methods that use them.
+from importlib.util import find_spec
 
-try:
-    from imblearn.over_sampling import SMOTE
-    IMBLEARN_AVAILABLE = True
-except ImportError:
-    IMBLEARN_AVAILABLE = False
+ML_AVAILABLE = find_spec('sklearn') is not None
+MLXTEND_AVAILABLE = find_spec('mlxtend') is not None
+IMBLEARN_AVAILABLE = find_spec('imblearn') is not None
 
 
 class ShilaMLAnalyzer:
     """Machine Learning Analyzer for Shila QFD Dashboard"""
     
-    def __init__(self, df, config_cols):
+    def __init__(self, df, config_cols, copy=True):
         """
         Initialize ML Analyzer
         
         Args:
             df: DataFrame with customer feedback data
             config_cols: Column configuration from config.py
+            copy: False to share the caller's column data (the dashboard's frame is never mutated)
         """
-        self.df = df.copy()
+        self.df = df.copy() if copy else df.copy(deep=False)
         self.COLS = config_cols
         self.models = {}
         self.scalers = {}
+        # Model inputs that don't depend on the slider parameters (features, elbow, PCA, encodings)
+        self._prepared = {}
         
     # ==========================================
     # 1. DETRACTOR PREDICTION MODEL
@@ -61,14 +49,17 @@ class ShilaMLAnalyzer:
         if not ML_AVAILABLE:
             return None, None, None
         
-        df = self.df.copy()
+        from sklearn.preprocessing import LabelEncoder
+        
+        # Shallow copy: only new columns are added, self.df's columns are shared
+        df = self.df.copy(deep=False)
         
         # Target: Is Detractor (NPS 0-6)
         nps_col = self.COLS.get('NPS')
         if not nps_col or nps_col not in df.columns:
             return None, None, None
         
-        df['is_detractor'] = (df[nps_col] <= 6).astype(int)
+        df['is_detractor'] = (df[nps_col] <= 6).fillna(False).astype(int)
         
         # Features
         features = []
@@ -84,7 +75,7 @@ class ShilaMLAnalyzer:
         branch_col = self.COLS.get('BRANCH')
         if branch_col and branch_col in df.columns:
             le = LabelEncoder()
-            df['branch_encoded'] = le.fit_transform(df[branch_col].fillna('Unknown'))
+            df['branch_encoded'] = le.fit_transform(df[branch_col].astype(object).fillna('Unknown'))
             features.append(df['branch_encoded'])
             feature_names.append('branch')
         
@@ -105,9 +96,9 @@ class ShilaMLAnalyzer:
         weakness_col = self.COLS.get('WEAKNESS')
         if weakness_col and weakness_col in df.columns:
             # Count issues
-            df['issue_count'] = df[weakness_col].fillna('').apply(
+            df['issue_count'] = fill_blank(df[weakness_col]).apply(
                 lambda x: len(str(x).split('،')) if pd.notna(x) and str(x).strip() else 0
-            )
+            ).astype(int)
             features.append(df['issue_count'])
             feature_names.append('issue_count')
             
@@ -116,16 +107,16 @@ class ShilaMLAnalyzer:
                           'زمان آماده سازی سفارش', 'بسته‌بندی نامناسب']
             for issue in common_issues:
                 col_name = f'has_{issue[:10]}'
-                df[col_name] = df[weakness_col].fillna('').str.contains(issue, na=False).astype(int)
+                df[col_name] = fill_blank(df[weakness_col]).str.contains(issue, na=False).astype(int)
                 features.append(df[col_name])
                 feature_names.append(col_name)
         
         # Strength flags
         strength_col = self.COLS.get('STRENGTH')
         if strength_col and strength_col in df.columns:
-            df['strength_count'] = df[strength_col].fillna('').apply(
+            df['strength_count'] = fill_blank(df[strength_col]).apply(
                 lambda x: len(str(x).split('،')) if pd.notna(x) and str(x).strip() else 0
-            )
+            ).astype(int)
             features.append(df['strength_count'])
             feature_names.append('strength_count')
         
@@ -144,6 +135,11 @@ class ShilaMLAnalyzer:
         if not ML_AVAILABLE:
             return {'error': 'scikit-learn not installed'}
         
+        from sklearn.model_selection import train_test_split, cross_val_score
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import confusion_matrix, accuracy_score, precision_recall_fscore_support
+        
         X, y, feature_names = self.prepare_classification_features()
         
         if X is None:
@@ -162,6 +158,7 @@ class ShilaMLAnalyzer:
         # Handle imbalanced data
         if IMBLEARN_AVAILABLE:
             try:
+                from imblearn.over_sampling import SMOTE
                 smote = SMOTE(random_state=42)
                 X_train_balanced, y_train_balanced = smote.fit_resample(X_train_scaled, y_train)
             except:
@@ -200,8 +197,8 @@ class ShilaMLAnalyzer:
         cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='f1')
         
         # Store model
-        self.models['detractor'] = model
         self.scalers['detractor'] = scaler
+        self.models['detractor'] = model
         
         return {
             'accuracy': round(accuracy, 3),
@@ -220,6 +217,7 @@ class ShilaMLAnalyzer:
     def predict_detractor_risk(self, top_n=100):
         """Predict which customers are at risk of being detractors"""
         if 'detractor' not in self.models:
+            # Memoized on shared instances, so concurrent sessions fit the model once
             self.train_detractor_model()
         
         if 'detractor' not in self.models:
@@ -236,7 +234,7 @@ class ShilaMLAnalyzer:
         probabilities = model.predict_proba(X_scaled)[:, 1]
         
         # Add risk scores to dataframe
-        result = self.df.copy()
+        result = self.df.copy(deep=False)
         result['detractor_risk'] = probabilities
         result['risk_level'] = pd.cut(
             probabilities, 
@@ -267,33 +265,33 @@ class ShilaMLAnalyzer:
         if not ML_AVAILABLE:
             return None
         
-        df = self.df.copy()
+        df = self.df
         features = []
         
         # Rating
         rating_col = self.COLS.get('RATING')
         if rating_col and rating_col in df.columns:
-            features.append(df[rating_col].fillna(3).values.reshape(-1, 1))
+            features.append(df[rating_col].fillna(3).to_numpy(dtype=float).reshape(-1, 1))
         
         # NPS
         nps_col = self.COLS.get('NPS')
         if nps_col and nps_col in df.columns:
-            features.append(df[nps_col].fillna(5).values.reshape(-1, 1))
+            features.append(df[nps_col].fillna(5).to_numpy(dtype=float).reshape(-1, 1))
         
         # Issue count
         weakness_col = self.COLS.get('WEAKNESS')
         if weakness_col and weakness_col in df.columns:
-            issue_counts = df[weakness_col].fillna('').apply(
+            issue_counts = fill_blank(df[weakness_col]).apply(
                 lambda x: len(str(x).split('،')) if str(x).strip() else 0
-            ).values.reshape(-1, 1)
+            ).to_numpy(dtype=int).reshape(-1, 1)
             features.append(issue_counts)
         
         # Strength count
         strength_col = self.COLS.get('STRENGTH')
         if strength_col and strength_col in df.columns:
-            strength_counts = df[strength_col].fillna('').apply(
+            strength_counts = fill_blank(df[strength_col]).apply(
                 lambda x: len(str(x).split('،')) if str(x).strip() else 0
-            ).values.reshape(-1, 1)
+            ).to_numpy(dtype=int).reshape(-1, 1)
             features.append(strength_counts)
         
         if not features:
@@ -302,33 +300,43 @@ class ShilaMLAnalyzer:
         X = np.hstack(features)
         return X
     
+    def _scaled_clustering_features(self):
+        """Standardized clustering features (prepared once, shared by clustering and anomaly detection)"""
+        if 'scaled' not in self._prepared:
+            from sklearn.preprocessing import StandardScaler
+            X = self.prepare_clustering_features()
+            self._prepared['scaled'] = None if X is None else StandardScaler().fit_transform(X)
+        return self._prepared['scaled']
+    
     def perform_clustering(self, n_clusters=5):
         """Perform K-Means clustering to find customer segments"""
         if not ML_AVAILABLE:
             return {'error': 'scikit-learn not installed'}
         
-        X = self.prepare_clustering_features()
-        if X is None:
-            return {'error': 'Could not prepare features'}
+        from sklearn.cluster import KMeans
+        from sklearn.decomposition import PCA
         
-        # Scale features
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+        X_scaled = self._scaled_clustering_features()
+        if X_scaled is None:
+            return {'error': 'Could not prepare features'}
         
-        # Find optimal number of clusters (Elbow method)
-        inertias = []
-        k_range = range(2, min(10, len(X) // 100 + 2))
-        for k in k_range:
-            kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-            kmeans.fit(X_scaled)
-            inertias.append(kmeans.inertia_)
+        # Find optimal number of clusters (Elbow method; independent of n_clusters)
+        if 'elbow' not in self._prepared:
+            inertias = []
+            k_range = range(2, min(10, len(X_scaled) // 100 + 2))
+            for k in k_range:
+                kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+                kmeans.fit(X_scaled)
+                inertias.append(kmeans.inertia_)
+            self._prepared['elbow'] = (k_range, inertias)
+        k_range, inertias = self._prepared['elbow']
         
         # Train final model
         kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
         clusters = kmeans.fit_predict(X_scaled)
         
         # Analyze clusters
-        df = self.df.copy()
+        df = self.df.copy(deep=False)
         df['cluster'] = clusters
         
         cluster_stats = []
@@ -344,14 +352,14 @@ class ShilaMLAnalyzer:
             # Rating stats
             rating_col = self.COLS.get('RATING')
             if rating_col and rating_col in cluster_data.columns:
-                stats['avg_rating'] = round(cluster_data[rating_col].mean(), 2)
+                stats['avg_rating'] = round(cluster_data[rating_col].astype(float).mean(), 2)
             
             # NPS stats
             nps_col = self.COLS.get('NPS')
             if nps_col and nps_col in cluster_data.columns:
-                stats['avg_nps'] = round(cluster_data[nps_col].mean(), 2)
-                stats['promoter_pct'] = round((cluster_data[nps_col] >= 9).mean() * 100, 1)
-                stats['detractor_pct'] = round((cluster_data[nps_col] <= 6).mean() * 100, 1)
+                stats['avg_nps'] = round(cluster_data[nps_col].astype(float).mean(), 2)
+                stats['promoter_pct'] = round((cluster_data[nps_col] >= 9).fillna(False).mean() * 100, 1)
+                stats['detractor_pct'] = round((cluster_data[nps_col] <= 6).fillna(False).mean() * 100, 1)
             
             cluster_stats.append(stats)
         
@@ -364,8 +372,9 @@ class ShilaMLAnalyzer:
         cluster_df['cluster_name'] = names[:len(cluster_df)]
         
         # PCA for visualization
-        pca = PCA(n_components=2)
-        X_pca = pca.fit_transform(X_scaled)
+        if 'pca' not in self._prepared:
+            self._prepared['pca'] = PCA(n_components=2).fit_transform(X_scaled)
+        X_pca = self._prepared['pca']
         
         return {
             'cluster_stats': cluster_df.to_dict('records'),
@@ -388,28 +397,39 @@ class ShilaMLAnalyzer:
         if not MLXTEND_AVAILABLE:
             return {'error': 'mlxtend not installed. Run: pip install mlxtend'}
         
+        from mlxtend.frequent_patterns import apriori, association_rules
+        from mlxtend.preprocessing import TransactionEncoder
+        
         weakness_col = self.COLS.get('WEAKNESS')
         if not weakness_col or weakness_col not in self.df.columns:
             return {'error': 'Weakness column not found'}
         
-        # Extract issues as transactions
-        transactions = []
-        for _, row in self.df.iterrows():
-            issues = str(row.get(weakness_col, '')).replace('،', ',').split(',')
-            issues = [i.strip() for i in issues if i.strip()]
-            if issues:
-                transactions.append(issues)
-        
-        if len(transactions) < 100:
+        # Extract and encode issues as transactions (once; only the thresholds change between calls)
+        if 'transactions' not in self._prepared:
+            transactions = []
+            for _, row in self.df.iterrows():
+                issues = str(row.get(weakness_col, '')).replace('،', ',').split(',')
+                issues = [i.strip() for i in issues if i.strip()]
+                if issues:
+                    transactions.append(issues)
+            
+            df_encoded = None
+            if len(transactions) >= 100:
+                te = TransactionEncoder()
+                te_ary = te.fit_transform(transactions)
+                df_encoded = pd.DataFrame(te_ary, columns=te.columns_)
+            self._prepared['itemsets'] = {}
+            self._prepared['transactions'] = (len(transactions), df_encoded)
+        n_transactions, df_encoded = self._prepared['transactions']
+        
+        if df_encoded is None:
             return {'error': 'Not enough data for association rules'}
         
-        # Encode transactions
-        te = TransactionEncoder()
-        te_ary = te.fit_transform(transactions)
-        df_encoded = pd.DataFrame(te_ary, columns=te.columns_)
-        
-        # Find frequent itemsets
-        frequent_itemsets = apriori(df_encoded, min_support=min_support, use_colnames=True)
+        # Find frequent itemsets (per min_support; min_confidence only filters the rules)
+        itemsets = self._prepared['itemsets']
+        if min_support not in itemsets:
+            itemsets[min_support] = apriori(df_encoded, min_support=min_support, use_colnames=True)
+        frequent_itemsets = itemsets[min_support]
         
         if len(frequent_itemsets) == 0:
             return {'error': 'No frequent itemsets found. Try lowering min_support.'}
@@ -440,14 +460,14 @@ class ShilaMLAnalyzer:
             top_itemsets.append({
                 'items': items,
                 'support': round(row['support'], 3),
-                'count': int(row['support'] * len(transactions))
+                'count': int(row['support'] * n_transactions)
             })
         
         return {
             'rules': rules_list,
             'frequent_itemsets': top_itemsets,
-            'total_transactions': len(transactions),
-            'unique_items': len(te.columns_)
+            'total_transactions': n_transactions,
+            'unique_items': len(df_encoded.columns)
         }
     
     # ==========================================
@@ -459,13 +479,11 @@ class ShilaMLAnalyzer:
         if not ML_AVAILABLE:
             return {'error': 'scikit-learn not installed'}
         
-        X = self.prepare_clustering_features()
-        if X is None:
-            return {'error': 'Could not prepare features'}
+        from sklearn.ensemble import IsolationForest
         
-        # Scale features
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+        X_scaled = self._scaled_clustering_features()
+        if X_scaled is None:
+            return {'error': 'Could not prepare features'}
         
         # Isolation Forest
         iso_forest = IsolationForest(
@@ -477,7 +495,7 @@ class ShilaMLAnalyzer:
         anomaly_scores = iso_forest.decision_function(X_scaled)
         
         # -1 = anomaly, 1 = normal
-        df = self.df.copy()
+        df = self.df.copy(deep=False)
         df['is_anomaly'] = (anomaly_labels == -1).astype(int)
         df['anomaly_score'] = -anomaly_scores  # Higher = more anomalous
         
@@ -495,13 +513,13 @@ class ShilaMLAnalyzer:
         # Compare anomalies vs normal
         rating_col = self.COLS.get('RATING')
         if rating_col and rating_col in df.columns:
-            anomaly_stats['anomaly_avg_rating'] = round(anomalies[rating_col].mean(), 2)
-            anomaly_stats['normal_avg_rating'] = round(normal[rating_col].mean(), 2)
+            anomaly_stats['anomaly_avg_rating'] = round(anomalies[rating_col].astype(float).mean(), 2)
+            anomaly_stats['normal_avg_rating'] = round(normal[rating_col].astype(float).mean(), 2)
         
         nps_col = self.COLS.get('NPS')
         if nps_col and nps_col in df.columns:
-            anomaly_stats['anomaly_avg_nps'] = round(anomalies[nps_col].mean(), 2)
-            anomaly_stats['normal_avg_nps'] = round(normal[nps_col].mean(), 2)
+            anomaly_stats['anomaly_avg_nps'] = round(anomalies[nps_col].astype(float).mean(), 2)
+            anomaly_stats['normal_avg_nps'] = round(normal[nps_col].astype(float).mean(), 2)
         
         # Anomaly types
         anomaly_types = []
@@ -568,7 +586,9 @@ class ShilaMLAnalyzer:
         if not ML_AVAILABLE:
             return None, None
         
-        df = self.df.copy()
+        from sklearn.preprocessing import LabelEncoder
+        
+        df = self.df.copy(deep=False)
         
         # Create churn proxy: Low rating + Low NPS + Multiple issues
         rating_col = self.COLS.get('RATING')
@@ -579,13 +599,13 @@ class ShilaMLAnalyzer:
             return None, None
         
         # Churn signals
-        df['low_rating'] = (df[rating_col] <= 2).astype(int)
-        df['low_nps'] = (df[nps_col] <= 6).astype(int)
+        df['low_rating'] = (df[rating_col] <= 2).fillna(False).astype(int)
+        df['low_nps'] = (df[nps_col] <= 6).fillna(False).astype(int)
         
         if weakness_col and weakness_col in df.columns:
-            df['issue_count'] = df[weakness_col].fillna('').apply(
+            df['issue_count'] = fill_blank(df[weakness_col]).apply(
                 lambda x: len(str(x).split('،')) if str(x).strip() else 0
-            )
+            ).astype(int)
             df['has_issues'] = (df['issue_count'] > 0).astype(int)
         else:
             df['issue_count'] = 0
@@ -608,7 +628,7 @@ class ShilaMLAnalyzer:
         branch_col = self.COLS.get('BRANCH')
         if branch_col and branch_col in df.columns:
             le = LabelEncoder()
-            features['branch_encoded'] = le.fit_transform(df[branch_col].fillna('Unknown'))
+            features['branch_encoded'] = le.fit_transform(df[branch_col].astype(object).fillna('Unknown'))
         
         return features, df['likely_churn']
     
@@ -617,6 +637,11 @@ class ShilaMLAnalyzer:
         if not ML_AVAILABLE:
             return {'error': 'scikit-learn not installed'}
         
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.ensemble import GradientBoostingClassifier
+        from sklearn.metrics import confusion_matrix, accuracy_score, precision_recall_fscore_support
+        
         X, y = self.prepare_churn_features()
         
         if X is None:
@@ -655,8 +680,8 @@ class ShilaMLAnalyzer:
         }).sort_values('importance', ascending=False)
         
         # Store model
-        self.models['churn'] = model
         self.scalers['churn'] = scaler
+        self.models['churn'] = model
         
         return {
             'accuracy': round(accuracy, 3),
@@ -672,6 +697,7 @@ class ShilaMLAnalyzer:
     def predict_churn_risk(self, top_n=100):
         """Predict churn risk for customers"""
         if 'churn' not in self.models:
+            # Memoized on shared instances, so concurrent sessions fit the model once
             self.train_churn_model()
         
         if 'churn' not in self.models:
@@ -687,7 +713,7 @@ class ShilaMLAnalyzer:
         X_scaled = scaler.transform(X)
         probabilities = model.predict_proba(X_scaled)[:, 1]
         
-        result = self.df.copy()
+        result = self.df.copy(deep=False)
         result['churn_risk'] = probabilities
         result['churn_level'] = pd.cut(
             probabilities,
@@ -722,7 +748,7 @@ class ShilaMLAnalyzer:
         # Quick stats
         nps_col = self.COLS.get('NPS')
         if nps_col and nps_col in self.df.columns:
-            summary['detractor_rate'] = round((self.df[nps_col] <= 6).mean() * 100, 1)
-            summary['promoter_rate'] = round((self.df[nps_col] >= 9).mean() * 100, 1)
+            summary['detractor_rate'] = round((self.df[nps_col] <= 6).fillna(False).mean() * 100, 1)
+            summary['promoter_rate'] = round((self.df[nps_col] >= 9).fillna(False).mean() * 100, 1)
         
         return summary
\ No newline at end of file
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Performance Instrumentation for Shila Dashboard
+
+Opt-in timing/memory recorder for analyzer methods, ML models and tab renders.
+Enable with SHILA_PROFILE=1 (env var or Streamlit secret) or by opening the
+dashboard with ?perf=1. When disabled every hook is a no-op.
+
+    profiler = Profiler(enabled=True)
+    profiler.instrument(analyzer, 'analyzer')     # wraps get_* / train_* ...
+    ml = profiler.instrument(shared_ml, 'ml', shared=True)   # timed view, shared_ml untouched
+    with profiler.section('tab:Overview'):
+        ...
+    profiler.dump('perf.json')
+"""
+
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from config import PROFILE_ENABLED
+
+# Methods wrapped by Profiler.instrument()
+INSTRUMENTED_PREFIXES = ('get_', 'train_', 'predict_', 'perform_', 'detect_', 'prepare_')
+
+# tracemalloc is process-wide: one profiler (session) measures memory at a time.
+# Sections that start while another profiler is measuring record time only
+_TRACEMALLOC_LOCK = threading.Lock()
+_tracemalloc_owner = None
+
+
+class Profiler:
+    """Collects wall time, call count, rows and tracemalloc peak per named section"""
+
+    def __init__(self, enabled=PROFILE_ENABLED, track_memory=True):
+        self.enabled = enabled
+        self.track_memory = track_memory
+        self.stats = {}
+        self._stack = []
+        self._owns_tracemalloc = False
+
+    # ==========================================
+    # RECORDING
+    # ==========================================
+
+    @contextmanager
+    def section(self, name, rows=None):
+        """Time a block. Nested sections are recorded separately and also count toward their parent."""
+        if not self.enabled:
+            yield
+            return
+
+        memory = self.track_memory and self._start_tracemalloc()
+        frame = {'name': name, 'peak': 0, 'base': 0}
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent['peak'] = max(parent['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['base'] = current
+        self._stack.append(frame)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            peak_bytes = None
+            if memory:
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame['peak'])
+                peak_bytes = max(peak - frame['base'], 0)
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+                tracemalloc.reset_peak()
+                if not self._stack:
+                    self._stop_tracemalloc()
+            self._record(name, elapsed, rows, peak_bytes, depth=len(self._stack))
+
+    def _record(self, name, elapsed, rows, peak_bytes, depth):
+        s = self.stats.setdefault(name, {
+            'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'last_s': 0.0,
+            'rows': None, 'peak_mb': None, 'depth': depth,
+        })
+        s['calls'] += 1
+        s['total_s'] += elapsed
+        s['max_s'] = max(s['max_s'], elapsed)
+        s['last_s'] = elapsed
+        s['depth'] = min(s['depth'], depth)
+        if rows is not None:
+            s['rows'] = rows
+        if peak_bytes is not None:
+            peak_mb = peak_bytes / 1024 / 1024
+            s['peak_mb'] = peak_mb if s['peak_mb'] is None else max(s['peak_mb'], peak_mb)
+
+    def _start_tracemalloc(self):
+        """Whether this section measures memory: outermost sections claim tracemalloc
+        unless another profiler holds it, nested ones follow their outermost section"""
+        global _tracemalloc_owner
+        with _TRACEMALLOC_LOCK:
+            if _tracemalloc_owner is None and not self._stack:
+                _tracemalloc_owner = self
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._owns_tracemalloc = True
+            return _tracemalloc_owner is self
+
+    def _stop_tracemalloc(self):
+        global _tracemalloc_owner
+        with _TRACEMALLOC_LOCK:
+            if _tracemalloc_owner is not self:
+                return
+            _tracemalloc_owner = None
+            # Only stop tracing we started ourselves (benchmarks may be tracing too)
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+
+    def timed(self, name, rows=None):
+        """Decorator form of section()"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.section(name, rows() if callable(rows) else rows):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instrument(self, obj, label=None, prefixes=INSTRUMENTED_PREFIXES, shared=False):
+        """Wrap the public analysis methods of one analyzer instance. Returns obj.
+
+        shared=True is for objects other sessions use too (e.g. a cached ML analyzer):
+        obj is left as is and a proxy that times the same methods is returned instead.
+        """
+        if not self.enabled:
+            return obj
+        label = label or type(obj).__name__
+        if shared:
+            return _TimedProxy(obj, self, label, prefixes)
+        if getattr(obj, '_perf_instrumented', None) is self:
+            return obj
+        for attr in dir(type(obj)):
+            if not attr.startswith(prefixes):
+                continue
+            method = getattr(obj, attr)
+            if callable(method):
+                rows = (lambda o=obj: len(o.df)) if hasattr(obj, 'df') else None
+                setattr(obj, attr, self.timed(f'{label}.{attr}', rows)(method))
+        obj._perf_instrumented = self
+        return obj
+
+    # ==========================================
+    # REPORTING
+    # ==========================================
+
+    def reset(self):
+        self.stats = {}
+
+    def to_frame(self):
+        """One row per section, slowest total first"""
+        if not self.stats:
+            return pd.DataFrame(columns=['section', 'calls', 'total_s', 'avg_s', 'max_s', 'last_s', 'rows', 'peak_mb'])
+        rows = []
+        for name, s in self.stats.items():
+            rows.append({
+                'section': name,
+                'calls': s['calls'],
+                'total_s': round(s['total_s'], 4),
+                'avg_s': round(s['total_s'] / s['calls'], 4),
+                'max_s': round(s['max_s'], 4),
+                'last_s': round(s['last_s'], 4),
+                'rows': s['rows'],
+                'peak_mb': round(s['peak_mb'], 2) if s['peak_mb'] is not None else None,
+            })
+        df = pd.DataFrame(rows).sort_values('total_s', ascending=False).reset_index(drop=True)
+        df['rows'] = df['rows'].astype('Int64')
+        return df
+
+    def to_dict(self):
+        return {
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'track_memory': self.track_memory,
+            'sections': {name: dict(s) for name, s in self.stats.items()},
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def dump(self, fp):
+        with open(fp, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+        return fp
+
+
+class _TimedProxy:
+    """One profiler's view of a shared object: prefixed methods are timed, all else is the object's"""
+
+    def __init__(self, obj, profiler, label, prefixes):
+        self._obj = obj
+        self._profiler = profiler
+        self._label = label
+        self._prefixes = prefixes
+
+    def __getattr__(self, attr):
+        value = getattr(self._obj, attr)
+        if not attr.startswith(self._prefixes) or not callable(value):
+            return value
+        rows = (lambda o=self._obj: len(o.df)) if hasattr(self._obj, 'df') else None
+        return self._profiler.timed(f'{self._label}.{attr}', rows)(value)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Result Cache - per-analyzer memoization and background prefetch for dashboard tabs
+
+An analyzer's data never changes after it is built, so each get_* result can be
+computed once and reused: revisiting a tab, the exports and the AI summary all
+read the same results. prefetch() computes the analytics of a tab the user is
+likely to open next on a background thread.
+
+    analyzer = memoize(ShilaAnalyzer(df, COLS))
+    analyzer.get_kano_analysis()                        # computed
+    analyzer.get_kano_analysis()                        # cached (copy)
+    prefetch(analyzer, [('get_pareto_analysis', {})])   # warmed in the background
+
+With a shared cache and a namespace (the dataset's content digest), results are
+stored process-wide, so other sessions' analyzers of the same data reuse them:
+
+    memoize(analyzer, cache=get_shared_cache(), namespace=('analyzer', digest))
+"""
+
+import copy
+import functools
+import inspect
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Methods memoized by memoize()
+MEMOIZED_PREFIXES = ('get_',)
+
+# pandas >= 3 always copies on write, so a shallow frame copy already keeps a
+# caller's edits off the cached frame (older pandas gets a real copy)
+_COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3
+
+
+def _copy_result(value):
+    """Copy of a cached result that a caller may modify.
+
+    Containers are rebuilt and frames / arrays copied, which covers how the tabs
+    use results: app.py renames and adds columns on returned frames, sorts them
+    and rewrites dict entries (e.g. translated labels). Anything else (fitted
+    models, strings, numbers) is shared and must not be modified.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        return value.copy(deep=not _COPY_ON_WRITE)
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, dict):
+        result = copy.copy(value)
+        for key, item in value.items():
+            result[key] = _copy_result(item)
+        return result
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    if isinstance(value, tuple):
+        items = [_copy_result(item) for item in value]
+        return value._make(items) if hasattr(value, '_make') else tuple(items)
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _call_key(signature, name, args, kwargs):
+    """Hashable key of one call with defaults applied (None if an argument is unhashable)"""
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    key = (name, tuple(bound.arguments.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def memoize(obj, prefixes=MEMOIZED_PREFIXES, cache=None, namespace=None):
+    """Cache the results of obj's public analysis methods. Returns obj.
+
+    Results live on the instance, or in `cache` (a shared_cache.SharedCache)
+    under `namespace` when both are given. Hits return a copy (see _copy_result),
+    so callers may modify the frames and containers they get. Concurrent calls with
+    the same arguments compute once (per-key locks), while other calls run in
+    parallel, so prefetch() threads never block the script thread on unrelated
+    results. Exceptions are not cached.
+    """
+    if getattr(obj, '_memo', None) is not None:
+        return obj
+    obj._memo = {}
+    obj._memo_lock = threading.RLock()
+    obj._memo_key_locks = {}
+    obj._memo_compute = {}
+    obj._memo_signatures = {}
+    obj._memo_cache = cache if namespace is not None else None
+    obj._memo_namespace = namespace
+
+    for attr in dir(type(obj)):
+        if not attr.startswith(prefixes):
+            continue
+        method = getattr(obj, attr)
+        if not callable(method):
+            continue
+        signature = inspect.signature(method)
+
+        def compute(*args, _name=attr, _method=method, _signature=signature, **kwargs):
+            key = _call_key(_signature, _name, args, kwargs)
+            if key is None:
+                return _method(*args, **kwargs), False
+            if obj._memo_cache is not None:
+                return obj._memo_cache.get_or_compute((obj._memo_namespace, key),
+                                                      lambda: _method(*args, **kwargs)), True
+            with obj._memo_lock:
+                if key in obj._memo:
+                    return obj._memo[key], True
+                lock = obj._memo_key_locks.setdefault(key, threading.Lock())
+            with lock:
+                with obj._memo_lock:
+                    if key in obj._memo:
+                        return obj._memo[key], True
+                try:
+                    result = _method(*args, **kwargs)
+                    with obj._memo_lock:
+                        obj._memo[key] = result
+                finally:
+                    with obj._memo_lock:
+                        obj._memo_key_locks.pop(key, None)
+            return result, True
+
+        def wrapper(*args, _compute=compute, **kwargs):
+            result, cached = _compute(*args, **kwargs)
+            return _copy_result(result) if cached else result
+
+        obj._memo_compute[attr] = compute
+        obj._memo_signatures[attr] = signature
+        setattr(obj, attr, functools.wraps(method)(wrapper))
+    return obj
+
+
+def is_cached(obj, name, **kwargs):
+    """Whether obj.<name>(**kwargs) has a memoized result"""
+    signatures = getattr(obj, '_memo_signatures', {})
+    if name not in signatures:
+        return False
+    key = _call_key(signatures[name], name, (), kwargs)
+    if obj._memo_cache is not None:
+        return (obj._memo_namespace, key) in obj._memo_cache
+    return key in obj._memo
+
+
+def prefetch(obj, calls):
+    """Compute memoized calls [(method name, kwargs), ...] on a daemon thread.
+
+    Calls that are already cached are skipped. Returns the thread, or None when
+    there is nothing to do. Errors are reported and otherwise ignored; the
+    visible tab will raise them again when it makes the call itself.
+    """
+    if getattr(obj, '_memo', None) is None:
+        return None
+    pending = [(name, kwargs) for name, kwargs in calls if not is_cached(obj, name, **kwargs)]
+    if not pending:
+        return None
+
+    def run():
+        for name, kwargs in pending:
+            try:
+                obj._memo_compute[name](**kwargs)
+            except Exception as e:
+                print(f"Prefetch error ({name}): {e}")
+
+    thread = threading.Thread(target=run, name='prefetch', daemon=True)
+    thread.start()
+    return thread
+
+
+def clear(obj):
+    """Drop every memoized result of obj"""
+    if getattr(obj, '_memo', None) is None:
+        return
+    with obj._memo_lock:
+        obj._memo.clear()
+        if obj._memo_cache is not None:
+            obj._memo_cache.discard(lambda key: key[0] == obj._memo_namespace)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Shared Cache - process-wide LRU cache shared by every dashboard session
+
+Several managers usually open the same files. Entries are keyed by content
+(file bytes digest), so parsed datasets, analyzer results and trained models are
+computed once per process and then served to every session. Entry sizes are
+estimated when stored; least recently used entries are evicted above the
+memory ceiling (SHARED_CACHE_MB).
+
+    cache = get_shared_cache()
+    key = ('dataset', content_digest(uploaded_files))
+    df, is_snappfood = cache.get_or_compute(key, lambda: load_files(uploaded_files))
+    cache.stats()       # {'entries': 3, 'mb': 41.2, 'hit_rate': 0.83, ...}
+"""
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config import SHARED_CACHE_MB
+
+# Bytes read per update() while hashing a file
+DIGEST_CHUNK = 1 << 20
+
+
+def content_digest(files):
+    """sha1 over the bytes of one or more files (paths or uploaded file objects)"""
+    if not isinstance(files, (list, tuple)):
+        files = [files]
+    h = hashlib.sha1()
+    for file in files:
+        if isinstance(file, str):
+            with open(file, 'rb') as f:
+                for chunk in iter(lambda: f.read(DIGEST_CHUNK), b''):
+                    h.update(chunk)
+        else:
+            h.update(file.getvalue())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def estimate_size(obj, _seen=None):
+    """Approximate memory held by obj in bytes (frames, arrays and containers are walked)"""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, 'indptr') and hasattr(obj, 'data'):  # scipy sparse
+        return sum(getattr(obj, part).nbytes for part in ('data', 'indices', 'indptr'))
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_size(v, seen) for v in obj)
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        return sys.getsizeof(obj) + estimate_size(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+class SharedCache:
+    """Thread-safe LRU mapping with a memory ceiling (max_mb) and hit statistics"""
+
+    def __init__(self, max_mb=SHARED_CACHE_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()     # key -> (value, size)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _hit(self, key):
+        """Value of a present key, marked most recently used (call with the lock held)"""
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key][0]
+
+    def get(self, key, default=None):
+        """Cached value of key (marked most recently used), or default"""
+        with self._lock:
+            if key in self._entries:
+                return self._hit(key)
+            self.misses += 1
+        return default
+
+    def get_or_compute(self, key, compute):
+        """Cached value of key, or compute() stored under it.
+
+        Concurrent callers of the same key wait for one computation instead of
+        repeating it; other keys are not blocked meanwhile. Exceptions are not cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._hit(key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    return self._hit(key)
+                self.misses += 1
+            try:
+                value = compute()
+                self.put(key, value)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+        return value
+
+    def put(self, key, value, size=None):
+        """Store value (size estimated unless given) and evict down to the ceiling.
+
+        Values larger than the whole ceiling are returned to the caller but not kept.
+        """
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def discard(self, predicate):
+        """Drop every entry whose key matches predicate(key)"""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'mb': round(self.bytes / 1024 / 1024, 1),
+            'max_mb': round(self.max_bytes / 1024 / 1024, 1),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_shared_cache():
+    """The process-wide cache (created on first use)"""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = SharedCache()
+    return _CACHE
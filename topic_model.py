@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Topic Modeling - NMF / online LDA over the analyzer's sparse document-term matrix
+
+Fitted models are kept in the shared cache (see shared_cache.py) by a
+fingerprint of the comment set, so reruns, new sessions on the same file and
+the exports reuse one fit.
+
+    model = fit_topic_model(dtm, vocab, fingerprint(dtm, vocab), n_topics=5, method='nmf')
+    model['top_words'][0]          # ['تاخیر', 'پیک', ...]
+    model['doc_topic']             # (distinct comment x topic) weights
+"""
+
+import hashlib
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from shared_cache import get_shared_cache
+
+SKLEARN_AVAILABLE = find_spec('sklearn') is not None
+
+TOPIC_METHODS = ('nmf', 'lda')
+
+# Above this many distinct comments NMF switches to MiniBatchNMF and LDA to online updates
+MINIBATCH_THRESHOLD = 20_000
+BATCH_SIZE = 2048
+# Passes over the corpus for online LDA (each pass costs about as much as a batch iteration)
+ONLINE_EPOCHS = 5
+
+# Terms must appear in at least MIN_DF comments and at most MAX_DF of them
+MIN_DF = 2
+MAX_DF = 0.95
+
+
+def fingerprint(dtm, vocab):
+    """Stable hash of a document-term matrix and its vocabulary (the model's whole input)"""
+    dtm = dtm.tocsr()
+    h = hashlib.sha1()
+    for part in (dtm.indptr, dtm.indices, dtm.data):
+        h.update(np.ascontiguousarray(part, dtype=np.int64).tobytes())
+    hashed = pd.util.hash_pandas_object(pd.Series(vocab, dtype=object), index=False)
+    h.update(hashed.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _select_terms(dtm):
+    """Columns kept for modeling (MIN_DF / MAX_DF document frequency filter)"""
+    doc_freq = np.asarray((dtm > 0).sum(axis=0)).ravel()
+    n_docs = max(dtm.shape[0], 1)
+    return np.flatnonzero((doc_freq >= MIN_DF) & (doc_freq <= MAX_DF * n_docs))
+
+
+def fit_topic_model(dtm, vocab, key, n_topics=5, method='nmf', n_words=10, random_state=0):
+    """Fit (or fetch from cache) a topic model on a (document x term) count matrix.
+
+    NMF runs on TF-IDF weights, LDA on raw counts. Returns a dict with
+    'top_words' (per topic), 'topic_words' (term weights per topic) and
+    'doc_topic' (row-normalized document-topic weights, float32), or None when
+    there are too few documents/terms.
+    """
+    if method not in TOPIC_METHODS:
+        raise ValueError(f"Unknown topic model: {method}")
+    cache_key = ('topic_model', key, method, n_topics, n_words, random_state)
+    return get_shared_cache().get_or_compute(
+        cache_key, lambda: _fit(dtm, vocab, n_topics, method, n_words, random_state))
+
+
+def _fit(dtm, vocab, n_topics, method, n_words, random_state):
+    terms = _select_terms(dtm)
+    X = dtm[:, terms]
+    nonempty = np.flatnonzero(np.diff(X.tocsr().indptr) > 0)
+    if len(terms) < n_topics or len(nonempty) < n_topics:
+        return None
+    X = X[nonempty]
+
+    large = X.shape[0] > MINIBATCH_THRESHOLD
+    if method == 'nmf':
+        from sklearn.feature_extraction.text import TfidfTransformer
+        from sklearn.decomposition import NMF, MiniBatchNMF
+        X = TfidfTransformer().fit_transform(X)
+        if large:
+            model = MiniBatchNMF(n_components=n_topics, batch_size=BATCH_SIZE, init='nndsvda',
+                                 random_state=random_state)
+        else:
+            model = NMF(n_components=n_topics, init='nndsvda', max_iter=400, random_state=random_state)
+    else:
+        from sklearn.decomposition import LatentDirichletAllocation
+        model = LatentDirichletAllocation(
+            n_components=n_topics,
+            learning_method='online' if large else 'batch',
+            batch_size=BATCH_SIZE,
+            max_iter=ONLINE_EPOCHS if large else 10,
+            random_state=random_state,
+        )
+
+    weights = model.fit_transform(X)
+    doc_topic = np.zeros((dtm.shape[0], n_topics), dtype=np.float32)
+    totals = weights.sum(axis=1, keepdims=True)
+    doc_topic[nonempty] = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+
+    topic_words = model.components_
+    top_words = [
+        [vocab[terms[i]] for i in np.argsort(-row)[:n_words] if row[i] > 0]
+        for row in topic_words
+    ]
+
+    return {
+        'method': method,
+        'top_words': top_words,
+        'topic_words': topic_words,
+        'terms': terms,
+        'doc_topic': doc_topic,
+    }
+
+
+def clear_cache():
+    get_shared_cache().discard(lambda key: key[0] == 'topic_model')
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Upload Registry - parsed files kept on disk, keyed by content hash
+
+Managers re-upload the same daily exports again and again. Each distinct file
+is parsed once: its loaded frame and detected format are pickled under
+UPLOAD_REGISTRY_DIR, and any later upload with the same bytes (in any session,
+also after a restart) is read back instead of going through format detection
+and the loaders again. Recently read files are also held in the shared
+in-memory cache. Least recently used files are pruned above UPLOAD_REGISTRY_MB.
+
+    registry = get_upload_registry()
+    df, file_format = registry.load(uploaded_file)     # parsed only the first time
+    results = registry.load_batch(uploaded_files)      # new files parsed in a process pool
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from config import UPLOAD_REGISTRY_DIR, UPLOAD_REGISTRY_MB
+from data_loader import _file_name, load_file_batch
+from shared_cache import content_digest, get_shared_cache
+
+# Bump when data_loader's output changes, so files are parsed again
+REGISTRY_VERSION = 1
+
+INDEX_FILE = 'index.json'
+
+
+class UploadRegistry:
+    """Parsed frames on disk by file digest, with an LRU size ceiling (max_mb)"""
+
+    def __init__(self, directory=UPLOAD_REGISTRY_DIR, max_mb=UPLOAD_REGISTRY_MB, cache=None):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.cache = cache
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._read_index()
+        with self._lock:
+            if self._prune():
+                self._write_index()
+
+    # ==========================================
+    # INDEX
+    # ==========================================
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def _read_index(self):
+        """{digest: {'name', 'format', 'rows', 'bytes', 'version', 'stored_at', 'used_at'}}"""
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Entries whose frame is gone or was written by an older loader are parsed again
+        return {d: e for d, e in index.items()
+                if e.get('version') == REGISTRY_VERSION and os.path.exists(self._path(d))}
+
+    def _write_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+    def _prune(self):
+        """Delete least recently used frames above the ceiling (call with the lock held).
+        Returns whether anything was deleted."""
+        total = sum(e['bytes'] for e in self._index.values())
+        pruned = False
+        for digest, entry in sorted(self._index.items(), key=lambda item: item[1]['used_at']):
+            if total <= self.max_bytes:
+                break
+            pruned = True
+            total -= entry['bytes']
+            del self._index[digest]
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+        return pruned
+
+    # ==========================================
+    # LOOKUP / STORE
+    # ==========================================
+
+    def __contains__(self, digest):
+        return digest in self._index
+
+    def get(self, digest):
+        """(df, file_format) of a registered file, or None"""
+        with self._lock:
+            entry = self._index.get(digest)
+            if entry is None:
+                return None
+            try:
+                df = pd.read_pickle(self._path(digest))
+            except Exception as e:
+                print(f"Upload registry error ({entry['name']}): {e}")
+                del self._index[digest]
+                return None
+            entry['used_at'] = datetime.now().isoformat()
+            self._write_index()
+        return df, entry['format']
+
+    def put(self, digest, name, df, file_format):
+        """Register a parsed file (kept only if it fits under the ceiling)"""
+        with self._lock:
+            path = self._path(digest)
+            df.to_pickle(path)
+            now = datetime.now().isoformat()
+            self._index[digest] = {
+                'name': os.path.basename(name), 'format': file_format, 'rows': len(df),
+                'bytes': os.path.getsize(path), 'version': REGISTRY_VERSION,
+                'stored_at': now, 'used_at': now,
+            }
+            self._prune()
+            self._write_index()
+
+    def _lookup(self, digest):
+        """(df, format) from memory, else from disk (then kept in memory), else None"""
+        key = ('parsed', digest)
+        if self.cache is not None:
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+        result = self.get(digest)
+        if result is not None and self.cache is not None:
+            self.cache.put(key, result)
+        return result
+
+    def _store(self, digest, name, result):
+        try:
+            self.put(digest, name, *result)
+        except Exception as e:
+            print(f"Upload registry error ({name}): {e}")
+        if self.cache is not None:
+            self.cache.put(('parsed', digest), result)
+
+    def load_batch(self, files, digests=None, workers=None, progress=None):
+        """data_loader.load_file_batch() that parses only files not seen before.
+
+        Registered files are resolved first; the rest (each distinct content once)
+        are parsed in the process pool and registered. Returns one (df, format) or
+        exception per file, in order; progress(done, total, name, error) as for
+        load_file_batch, with registered files reported first.
+        """
+        digests = digests or [content_digest(f) for f in files]
+        results = [self._lookup(digest) for digest in digests]
+
+        new = {}                                    # digest -> index of its first file
+        for i, (digest, result) in enumerate(zip(digests, results)):
+            if result is None:
+                new.setdefault(digest, i)
+        resolved = [i for i, digest in enumerate(digests) if digest not in new]
+        if progress is not None:
+            for done, i in enumerate(resolved, 1):
+                progress(done, len(files), _file_name(files[i]), None)
+
+        parse = list(new.values())
+        repeats = len(files) - len(resolved) - len(parse)      # copies of a new file in this batch
+
+        def parse_progress(done, total, name, error):
+            progress(len(resolved) + done + (repeats if done == total else 0), len(files), name, error)
+
+        parsed = load_file_batch([files[i] for i in parse], workers, parse_progress if progress is not None else None)
+        for i, result in zip(parse, parsed):
+            if not isinstance(result, Exception):
+                self._store(digests[i], _file_name(files[i]), result)
+            for j, digest in enumerate(digests):
+                if digest == digests[i]:
+                    results[j] = result
+        return results
+
+    def load(self, file, digest=None):
+        """data_loader.load_file() that parses each distinct file only once. Returns (df, format).
+
+        Parse errors are raised as by load_file and nothing is registered.
+        """
+        result = self.load_batch([file], [digest or content_digest(file)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def files(self):
+        """Registered files, most recently used first"""
+        rows = [dict(entry, digest=digest) for digest, entry in self._index.items()]
+        return pd.DataFrame(rows).sort_values('used_at', ascending=False, ignore_index=True) if rows else pd.DataFrame()
+
+    def stats(self):
+        return {
+            'files': len(self._index),
+            'mb': round(sum(e['bytes'] for e in self._index.values()) / 1024 / 1024, 1),
+            'max_mb': round(self.max_bytes / 1024 / 1024, 1),
+        }
+
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_upload_registry():
+    """The process-wide registry (backed by the shared in-memory cache)"""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = UploadRegistry(cache=get_shared_cache())
+    return _REGISTRY
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Review Warehouse - local SQLite history of every loaded file
+
+Each file is stored once (keyed by its content digest) and its reviews are
+keyed like data_loader.combine_frames() dedups them: by order_code, or by row
+contents for original-format surveys. Overlapping daily exports therefore never
+duplicate a review, and the first stored copy wins, as the first uploaded file
+does in a session. Storing is off unless WAREHOUSE_ENABLED is set. order_code,
+branch and order date are indexed, and range queries return frames that go
+straight into ShilaAnalyzer:
+
+    wh = get_warehouse()
+    wh.ingest(df, content_digest(path), path, file_format)       # no-op if already stored
+    df = wh.query(start='2025-12-01', end='2025-12-31', branches=['ونک'])
+    analyzer = ShilaAnalyzer(df, COLS)
+"""
+
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from branches import branch_keys
+from config import COLS, WAREHOUSE_ENABLED, WAREHOUSE_PATH
+from data_loader import exclude_branches, optimize_dtypes, order_codes, row_keys
+from shared_cache import content_digest
+from upload_registry import get_upload_registry
+
+JDATETIME_AVAILABLE = find_spec('jdatetime') is not None
+
+# Rows written per executemany() batch
+INGEST_BATCH = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    digest TEXT PRIMARY KEY,
+    name TEXT,
+    format TEXT,
+    rows INTEGER,
+    loaded_at TEXT
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    row_key TEXT PRIMARY KEY,
+    order_code TEXT,
+    branch TEXT,
+    branch_key TEXT,
+    order_date TEXT,
+    file_digest TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_order_code ON reviews(order_code);
+CREATE INDEX IF NOT EXISTS idx_reviews_branch ON reviews(branch_key, order_date);
+CREATE INDEX IF NOT EXISTS idx_reviews_date ON reviews(order_date);
+"""
+
+# A review stored before keeps its first copy (see data_loader.combine_frames)
+_INSERT = """
+INSERT INTO reviews (row_key, order_code, branch, branch_key, order_date, file_digest, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(row_key) DO NOTHING
+"""
+
+
+# ==========================================
+# ROW ENCODING
+# ==========================================
+
+def _json_default(value):
+    """Timestamps are tagged so they come back as timestamps (not strings)"""
+    if isinstance(value, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return {'$ts': value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def _json_hook(obj):
+    return pd.Timestamp(obj['$ts']) if len(obj) == 1 and '$ts' in obj else obj
+
+
+def _jalali_to_iso(value):
+    """'1404/09/25' -> '2025-12-16' (None if unparseable)"""
+    match = re.match(r'(\d{4})[/\-](\d{1,2})[/\-](\d{1,2})', str(value).strip())
+    if not match:
+        return None
+    import jdatetime
+    try:
+        return jdatetime.date(*map(int, match.groups())).togregorian().isoformat()
+    except ValueError:
+        return None
+
+
+def order_dates(df):
+    """Gregorian 'YYYY-MM-DD' of every row: the order timestamp, else the Persian survey date"""
+    dates = pd.Series(None, index=df.index, dtype=object)
+    created_col, date_col = COLS['CREATED_AT'], COLS['DATE']
+    if created_col in df.columns:
+        created = df[created_col]
+        if not pd.api.types.is_datetime64_any_dtype(created):
+            # ISO text first ('2025-12-26 18:37'), then SnappFood's day-first '26/12/2025 18:37:39'
+            iso = pd.to_datetime(created, format='ISO8601', errors='coerce')
+            created = iso.fillna(pd.to_datetime(created.where(iso.isna()), dayfirst=True, errors='coerce'))
+        dates = created.dt.strftime('%Y-%m-%d').astype(object).where(created.notna(), None)
+    if date_col in df.columns and JDATETIME_AVAILABLE:
+        missing = dates.isna() & df[date_col].notna()
+        if missing.any():
+            raw = df.loc[missing, date_col].astype(str)
+            lookup = {v: _jalali_to_iso(v) for v in raw.unique()}
+            dates.loc[missing] = raw.map(lookup)
+    return dates
+
+
+def _iso_day(value):
+    return None if value is None else pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+# ==========================================
+# WAREHOUSE
+# ==========================================
+
+class Warehouse:
+    """SQLite store of reviews, one row per order (or survey row); safe to share between threads"""
+
+    def __init__(self, path=WAREHOUSE_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+    def has_file(self, digest):
+        with self._lock:
+            return self._con.execute("SELECT 1 FROM files WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def ingest(self, df, digest, name='', file_format='original'):
+        """Store the rows of one loaded file. Returns the number of new reviews
+        (0 when a file with the same contents was stored before)."""
+        # Cheap early-out; the INSERT OR IGNORE below is what settles concurrent stores
+        if df is None or self.has_file(digest):
+            return 0
+
+        codes = order_codes(df['order_code']) if 'order_code' in df.columns else pd.Series(None, index=df.index, dtype=object)
+        keys = row_keys(df)
+        branches = df[COLS['BRANCH']].astype(object).where(df[COLS['BRANCH']].notna(), None) \
+            if COLS['BRANCH'] in df.columns else pd.Series(None, index=df.index, dtype=object)
+        branch_key = pd.Series(branch_keys(branches.fillna('')), index=df.index).where(branches.notna(), None)
+        dates = order_dates(df)
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+
+        rows = (
+            (key, code, branch, bkey, date, digest, json.dumps(record, ensure_ascii=False, default=_json_default))
+            for key, code, branch, bkey, date, record in zip(keys, codes, branches, branch_key, dates, records)
+        )
+        with self._lock, self._con:
+            # Claim the file first, in the same transaction as its rows: a session (or
+            # process) storing the same file at the same time inserts nothing
+            claimed = self._con.execute(
+                "INSERT OR IGNORE INTO files (digest, name, format, rows, loaded_at) VALUES (?, ?, ?, ?, ?)",
+                (digest, os.path.basename(name), file_format, len(df), datetime.datetime.now().isoformat(timespec='seconds')))
+            if claimed.rowcount == 0:
+                return 0
+            before = self._con.total_changes
+            while True:
+                batch = [row for _, row in zip(range(INGEST_BATCH), rows)]
+                if not batch:
+                    break
+                self._con.executemany(_INSERT, batch)
+            return self._con.total_changes - before
+
+    def query(self, start=None, end=None, branches=None):
+        """Stored reviews with order date in [start, end] (inclusive; dates, Timestamps or
+        'YYYY-MM-DD') of the given branches (any spelling), prepared like an upload.
+
+        Returns None when nothing matches.
+        """
+        where, params = [], []
+        if start is not None:
+            where.append("order_date >= ?")
+            params.append(_iso_day(start))
+        if end is not None:
+            where.append("order_date <= ?")
+            params.append(_iso_day(end))
+        if branches:
+            keys = list(dict.fromkeys(branch_keys(list(branches))))
+            where.append(f"branch_key IN ({', '.join('?' * len(keys))})")
+            params += keys
+        sql = "SELECT data FROM reviews" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY rowid"
+
+        with self._lock:
+            data = [row[0] for row in self._con.execute(sql, params)]
+        if not data:
+            return None
+        df = pd.DataFrame.from_records([json.loads(d, object_hook=_json_hook) for d in data])
+        # Columns that held only timestamps when stored go back to datetime64
+        for col in df.columns[df.dtypes == object]:
+            values = df[col].dropna()
+            if len(values) and values.map(type).eq(pd.Timestamp).all():
+                df[col] = pd.to_datetime(df[col])
+        return optimize_dtypes(exclude_branches(df))
+
+    def files(self):
+        """Stored files, oldest first"""
+        with self._lock:
+            return pd.read_sql_query("SELECT name, format, rows, loaded_at, digest FROM files ORDER BY loaded_at", self._con)
+
+    def stats(self):
+        """{'files', 'reviews', 'first_date', 'last_date'}"""
+        with self._lock:
+            n_files = self._con.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            n_rows, first, last = self._con.execute(
+                "SELECT COUNT(*), MIN(order_date), MAX(order_date) FROM reviews").fetchone()
+        return {'files': n_files, 'reviews': n_rows, 'first_date': first, 'last_date': last}
+
+    def version(self):
+        """Changes whenever a file is stored (for cache keys of query results)"""
+        with self._lock:
+            return self._con.execute("SELECT COUNT(*), MAX(loaded_at) FROM files").fetchone()
+
+
+def is_snappfood_frame(df):
+    """Whether a queried frame holds SnappFood reviews (they carry no NPS answers)"""
+    return COLS['NPS'] not in df.columns or df[COLS['NPS']].isna().all()
+
+
+_WAREHOUSE = None
+_WAREHOUSE_LOCK = threading.Lock()
+
+
+def get_warehouse(path=WAREHOUSE_PATH):
+    """The process-wide warehouse (opened on first use)"""
+    global _WAREHOUSE
+    with _WAREHOUSE_LOCK:
+        if _WAREHOUSE is None or _WAREHOUSE.path != path:
+            _WAREHOUSE = Warehouse(path)
+    return _WAREHOUSE
+
+
+def load_and_store(files, workers=None, progress=None, store=None):
+    """data_loader.load_file_batch() that also stores every loaded file in the warehouse
+    (store=None: only if WAREHOUSE_ENABLED).
+
+    Files seen before are read from the upload registry instead of being parsed.
+    Storage errors are reported, not raised: the files are still returned to the caller.
+    """
+    digests = [content_digest(f) for f in files]
+    results = get_upload_registry().load_batch(files, digests, workers, progress)
+    if not (WAREHOUSE_ENABLED if store is None else store):
+        return results
+    for file, digest, result in zip(files, digests, results):
+        if isinstance(result, Exception):
+            continue
+        name = file if isinstance(file, str) else getattr(file, 'name', '')
+        try:
+            get_warehouse().ingest(result[0], digest, name, result[1])
+        except Exception as e:
+            print(f"Warehouse error ({name}): {e}")
+    return results
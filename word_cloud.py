@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Word Cloud Rendering - cached PNGs for the Text Mining tab
+
+The font is looked up once per process, each Persian word is reshaped for
+right-to-left display once, and rendered images are kept in the shared cache
+(see shared_cache.py) keyed by the word frequencies plus render options, so
+reruns and other sessions reuse the same PNG.
+
+    png = render_word_cloud(analyzer.get_word_frequency(min_freq=5, top_n=100))
+"""
+
+import functools
+import hashlib
+import io
+import json
+import os
+import platform
+
+from shared_cache import get_shared_cache
+
+# Fonts with Persian/Arabic glyphs, first existing file wins
+FONT_CANDIDATES = {
+    'Windows': [
+        'C:/Windows/Fonts/Vazirmatn-Regular.ttf',
+        'C:/Windows/Fonts/tahoma.ttf',       # Tahoma (best for Persian)
+        'C:/Windows/Fonts/arial.ttf',        # Arial
+        'C:/Windows/Fonts/segoeui.ttf',      # Segoe UI
+        'C:/Windows/Fonts/times.ttf',        # Times New Roman
+        'C:/Windows/Fonts/calibri.ttf',      # Calibri
+    ],
+    'Darwin': [
+        '/Library/Fonts/Arial.ttf',
+        '/System/Library/Fonts/Helvetica.ttc',
+    ],
+    'Linux': [
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+        '/usr/share/fonts/truetype/freefont/FreeSans.ttf',
+        '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+    ],
+}
+
+DEFAULT_OPTIONS = {
+    'width': 800,
+    'height': 400,
+    'background_color': 'white',
+    'colormap': 'viridis',
+    'max_words': 100,
+    'prefer_horizontal': 0.7,
+    'min_font_size': 10,
+}
+
+
+@functools.lru_cache(maxsize=1)
+def find_font():
+    """Path of the first available Persian-capable font for this OS, or None"""
+    candidates = FONT_CANDIDATES.get(platform.system(), FONT_CANDIDATES['Linux'])
+    for font in candidates:
+        if os.path.exists(font):
+            return font
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def reshape_word(word):
+    """Join Persian letters and reorder for RTL display (unchanged if that fails)"""
+    try:
+        import arabic_reshaper
+        from bidi.algorithm import get_display
+        return get_display(arabic_reshaper.reshape(word))
+    except Exception:
+        return word
+
+
+def _cache_key(word_freq, options, font_path):
+    payload = json.dumps([sorted(word_freq.items()), sorted(options.items()), font_path],
+                         ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def render_word_cloud(word_freq, **options):
+    """PNG bytes of the word cloud for {word: frequency}. Raises if wordcloud is missing."""
+    options = {**DEFAULT_OPTIONS, **options}
+    font_path = find_font()
+    key = ('word_cloud', _cache_key(word_freq, options, font_path))
+    return get_shared_cache().get_or_compute(key, lambda: _render(word_freq, options, font_path))
+
+
+def _render(word_freq, options, font_path):
+    from wordcloud import WordCloud
+
+    reshaped_freq = {}
+    for word, freq in word_freq.items():
+        reshaped_freq[reshape_word(word)] = freq
+
+    wc = WordCloud(font_path=font_path, **options).generate_from_frequencies(reshaped_freq)
+    buffer = io.BytesIO()
+    wc.to_image().save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def clear_cache():
+    get_shared_cache().discard(lambda key: key[0] == 'word_cloud')
+    reshape_word.cache_clear()
+    find_font.cache_clear()